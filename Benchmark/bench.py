@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# bench.py
+# 离线、可复现的入库流程基准：
+#   - 数据：仓库中已有的 CSV 作为 fixture。Spider/*/*.csv（四个博物馆的爬虫输出）用于合并、去重、三元组阶段，
+#     Neo4j/*.csv（约 1.5 万条三元组，与 DataModeling/*.csv 相同）用于核对与 Neo4j 加载阶段；
+#     --scale 10 / 100 时按确定的规则生成 10 倍、100 倍的合成数据（复制行并改写名称与链接，介绍按固定步长轮换），
+#     同样的 fixture 每次生成同样的文件，缓存在 --workdir 下；
+#   - 阶段：combine（合并）、dedup（近重复检测）、triples（model.py 生成三元组）、
+#     validate（admin_import.py 生成离线导入文件并与逐行脚本的结果核对）、
+#     neo4j_load（bulk_load.py）、mysql_load（mysql.py）。两个数据库阶段需要 --neo4j-uri / --mysql-host
+#     指向本地替身库（例如 docker 启动的 neo4j、mysql），未指定时记为 skipped；
+#   - 每个阶段在单独的子进程中运行，计时只包含阶段本身，峰值 RSS 互不影响；
+#   - 结果写成 JSON（提交号、机器信息、fixture 哈希、每个阶段的行数、秒数、行/秒、峰值 RSS），
+#     compare 子命令比较两次结果，吞吐量下降超过阈值时以非零状态退出。
+#
+# 用法：python bench.py run --scale 1 10
+#       python bench.py run --scale 1 --neo4j-uri bolt://127.0.0.1:7687 --mysql-host 127.0.0.1
+#       python bench.py compare results/旧.json results/新.json --threshold 0.1
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "Benchmark", "results")
+WORKDIR = os.path.join(tempfile.gettempdir(), "knowledge_map_bench")
+
+MUSEUM_FIXTURES = sorted(glob.glob(os.path.join(ROOT, "Spider", "*", "*.csv")))
+TRIPLE_FIXTURES = sorted(glob.glob(os.path.join(ROOT, "Neo4j", "*.csv")))
+STAGES = ["combine", "dedup", "triples", "validate", "neo4j_load", "mysql_load"]
+DEPENDS = {"dedup": "combine", "triples": "dedup", "mysql_load": "combine"}  # 其余阶段直接读取 fixture
+DESCRIPTION_STRIDE = 7919  # 第 k 份副本的介绍取自第 (i + k * 步长) 行，避免副本之间互为近重复
+
+
+def fixture_hash(paths):
+    sha = hashlib.sha1()
+    for path in paths:
+        sha.update(os.path.relpath(path, ROOT).encode("utf-8"))
+        with open(path, "rb") as f:
+            sha.update(hashlib.sha1(f.read()).digest())
+    return sha.hexdigest()
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                             cwd=ROOT, text=True).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+# ---------------- 合成数据 ----------------
+
+def copy_suffix(k):
+    return "" if k == 0 else f" (copy {k})"
+
+
+def scale_museum_file(path, out_path, scale):
+    """复制 scale 份：名称加副本后缀，详情链接加查询参数，介绍、年代按固定步长轮换；作者保持不变"""
+    sys.path.insert(0, os.path.join(ROOT, "DataModeling"))
+    import numpy as np
+    import pandas as pd
+    from combine import MUSEUM_COLUMN_MAPS, detect_encoding
+
+    df = pd.read_csv(path, dtype=str, encoding=detect_encoding(path))
+    # 按 combine.py 的映射找到各规范列对应的源列，整理后的文件和爬虫原始输出都适用
+    mapping = MUSEUM_COLUMN_MAPS.get(os.path.basename(path), {})
+    source = {}
+    for col in df.columns:
+        source.setdefault(mapping.get(col, col), col)
+    name_col, link_col = source.get("藏品名称", df.columns[0]), source.get("详情链接")
+    rotate = [source[c] for c in ("介绍", "年代") if c in source]
+    copies = []
+    for k in range(scale):
+        copy = df.copy()
+        if k:
+            copy[name_col] = copy[name_col].fillna("") + copy_suffix(k)
+            if link_col is not None:
+                links = copy[link_col].fillna("")
+                copy[link_col] = links + np.where(links.str.contains("?", regex=False), "&", "?") + f"bench_copy={k}"
+            for i, col in enumerate(rotate):
+                copy[col] = np.roll(df[col].values, (k * DESCRIPTION_STRIDE + i) % max(len(df), 1))
+        copies.append(copy)
+    pd.concat(copies, ignore_index=True).to_csv(out_path, index=False, encoding="utf-8-sig")
+
+
+def scale_triple_file(path, out_path, scale):
+    """三元组按主体复制 scale 份，各文件使用相同的后缀，主体之间的对应关系保持不变"""
+    import pandas as pd
+
+    df = pd.read_csv(path, dtype=str, encoding="utf-8-sig")
+    copies = [df.assign(主体=df["主体"] + copy_suffix(k).replace(" ", "_")) for k in range(scale)]
+    pd.concat(copies, ignore_index=True).to_csv(out_path, index=False, encoding="utf-8-sig")
+
+
+def prepare(workdir, scale):
+    """生成（或复用）该倍数的数据目录，返回 {museums, triples} 路径"""
+    base = os.path.join(workdir, f"scale-{scale}")
+    dirs = {"museums": os.path.join(base, "museums"), "triples": os.path.join(base, "fixture_triples")}
+    marker = os.path.join(base, "fixtures.sha1")
+    digest = fixture_hash(MUSEUM_FIXTURES + TRIPLE_FIXTURES)
+    if os.path.exists(marker) and open(marker).read() == digest:
+        return dirs
+    for d in dirs.values():
+        os.makedirs(d, exist_ok=True)
+    for path in MUSEUM_FIXTURES:
+        scale_museum_file(path, os.path.join(dirs["museums"], os.path.basename(path)), scale)
+    for path in TRIPLE_FIXTURES:
+        scale_triple_file(path, os.path.join(dirs["triples"], os.path.basename(path)), scale)
+    with open(marker, "w") as f:
+        f.write(digest)
+    return dirs
+
+
+# ---------------- 各阶段（在子进程中执行） ----------------
+
+def count_rows(path):
+    import pandas as pd
+    return sum(len(chunk) for chunk in pd.read_csv(path, dtype=str, usecols=[0], chunksize=100000,
+                                                   encoding="utf-8-sig"))
+
+
+def stage_paths(workdir, scale):
+    base = os.path.join(workdir, f"scale-{scale}")
+    return {
+        "museums": os.path.join(base, "museums"),
+        "fixture_triples": os.path.join(base, "fixture_triples"),
+        "merged": os.path.join(base, "merged_artifacts.csv"),
+        "deduped": os.path.join(base, "deduped_artifacts.csv"),
+        "triples": os.path.join(base, "triples"),
+        "aliases": os.path.join(base, "author_aliases.json"),
+        "import": os.path.join(base, "import"),
+    }
+
+
+def run_stage(stage, workdir, scale, neo4j_uri=None, mysql_host=None, mysql_port=None):
+    """返回 (处理的行数, 说明)；在计时范围内调用"""
+    paths = stage_paths(workdir, scale)
+    sys.path.insert(0, os.path.join(ROOT, "DataModeling"))
+    if stage == "combine":
+        from combine import merge_csv_files
+        merge_csv_files(paths["merged"], sorted(glob.glob(os.path.join(paths["museums"], "*.csv"))))
+        return count_rows(paths["merged"]), ""
+    if stage == "dedup":
+        import dedup
+        dedup.main(paths["merged"], paths["deduped"])
+        return count_rows(paths["deduped"]), ""
+    if stage == "triples":
+        import model
+        if os.path.exists(paths["aliases"]):
+            os.remove(paths["aliases"])
+        model.main(paths["deduped"], paths["triples"], alias_path=paths["aliases"])
+        return sum(count_rows(p) for p in glob.glob(os.path.join(paths["triples"], "*.csv"))), ""
+
+    sys.path.insert(0, os.path.join(ROOT, "Neo4j"))
+    if stage == "validate":
+        from admin_import import verify_import_files, write_import_files
+        projects, people, writers = write_import_files(paths["import"], paths["fixture_triples"])
+        problems = verify_import_files(paths["import"], paths["fixture_triples"])
+        if problems:
+            raise RuntimeError(f"核对失败，共 {len(problems)} 处差异：{problems[0]}")
+        return len(projects) + len(people) + len(writers), "节点与关系数"
+    if stage == "neo4j_load":
+        from neo4j import GraphDatabase
+        from bulk_load import (AUTHOR_CSV, NEO4J_AUTH, PROJECT_CQL, WRITER_CQL, ensure_indexes, project_rows,
+                               run_batches, writer_rows)
+        driver = GraphDatabase.driver(neo4j_uri, auth=NEO4J_AUTH)
+        try:
+            ensure_indexes(driver)
+            writers = writer_rows(os.path.join(paths["fixture_triples"], AUTHOR_CSV))
+            props = project_rows(paths["fixture_triples"])
+            run_batches(driver, WRITER_CQL, writers, desc="导入作者关系")
+            run_batches(driver, PROJECT_CQL, props, desc="写入藏品属性")
+        finally:
+            driver.close()
+        return len(writers) + len(props), ""
+    if stage == "mysql_load":
+        sys.path.insert(0, os.path.join(ROOT, "MySQL"))
+        from mysql import DB_CONFIG, get_engine, import_csv_to_mysql
+        engine = get_engine(host=mysql_host, port=mysql_port or DB_CONFIG["port"])
+        count = import_csv_to_mysql(paths["merged"], engine=engine)
+        engine.dispose()
+        if count is None:
+            raise RuntimeError("MySQL 导入失败")
+        return count, ""
+    raise ValueError(f"未知的阶段: {stage}")
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def stage_main(args):
+    """子进程入口：执行一个阶段，最后一行输出 JSON 结果"""
+    import contextlib
+    import io
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            rows, note = run_stage(args.stage, args.workdir, args.scale, args.neo4j_uri, args.mysql_host,
+                                   args.mysql_port)
+        result = {"status": "ok", "rows": rows, "note": note}
+    except Exception as e:
+        result = {"status": "failed", "rows": 0, "note": f"{type(e).__name__}: {e}"}
+    seconds = time.perf_counter() - start
+    result.update(seconds=round(seconds, 4),
+                  rows_per_second=round(result["rows"] / seconds, 1) if seconds and result["rows"] else 0,
+                  peak_rss_mb=round(peak_rss_mb(), 1), baseline_rss_mb=round(baseline, 1))
+    print(json.dumps(result, ensure_ascii=False))
+
+
+# ---------------- 调度与报告 ----------------
+
+def run_main(args):
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit, "dirty": dirty, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        "fixtures": fixture_hash(MUSEUM_FIXTURES + TRIPLE_FIXTURES), "results": [],
+    }
+    stages = args.stage or STAGES
+    for scale in args.scale:
+        start = time.perf_counter()
+        prepare(args.workdir, scale)
+        print(f"× {scale}：合成数据就绪（{time.perf_counter() - start:.1f} 秒）")
+        failed = set()
+        for stage in stages:
+            entry = {"scale": scale, "stage": stage}
+            if stage == "neo4j_load" and not args.neo4j_uri or stage == "mysql_load" and not args.mysql_host:
+                entry.update(status="skipped", note="未指定本地数据库")
+            elif DEPENDS.get(stage) in failed:
+                entry.update(status="skipped", note="上游阶段失败")
+            else:
+                command = [sys.executable, os.path.abspath(__file__), "stage", stage, "--workdir", args.workdir,
+                           "--scale", str(scale)]
+                for flag, value in (("--neo4j-uri", args.neo4j_uri), ("--mysql-host", args.mysql_host),
+                                    ("--mysql-port", args.mysql_port)):
+                    if value:
+                        command += [flag, str(value)]
+                proc = subprocess.run(command, capture_output=True, text=True)
+                lines = proc.stdout.strip().splitlines()
+                try:
+                    entry.update(json.loads(lines[-1]))
+                except (IndexError, ValueError):
+                    entry.update(status="failed", note=proc.stderr.strip().splitlines()[-1:] or "子进程没有输出结果")
+            if entry["status"] == "failed" or DEPENDS.get(stage) in failed:
+                failed.add(stage)
+            report["results"].append(entry)
+            print_entry(entry)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+    return 1 if any(r["status"] == "failed" for r in report["results"]) else 0
+
+
+def print_entry(e):
+    if e["status"] != "ok":
+        print(f"  {e['stage']:<11} {e['status']}  {e.get('note', '')}")
+        return
+    print(f"  {e['stage']:<11} {e['rows']:>9} 行  {e['seconds']:>8.2f} 秒  {e['rows_per_second']:>10.0f} 行/秒  "
+          f"峰值 RSS {e['peak_rss_mb']:.0f} MB")
+
+
+def compare_main(args):
+    """比较两次结果中相同倍数、相同阶段的吞吐量，下降超过 threshold 记为回退"""
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if base.get("fixtures") != new.get("fixtures"):
+        print("注意：两次运行使用的 fixture 不同，结果不可直接比较")
+    old = {(r["scale"], r["stage"]): r for r in base["results"] if r["status"] == "ok"}
+    regressions = 0
+    print(f"{(base.get('commit') or '?')[:10]} -> {(new.get('commit') or '?')[:10]}")
+    for r in new["results"]:
+        before = old.get((r["scale"], r["stage"]))
+        if r["status"] != "ok" or before is None or not before["rows_per_second"]:
+            continue
+        ratio = r["rows_per_second"] / before["rows_per_second"]
+        flag = ""
+        if ratio < 1 - args.threshold:
+            flag = "  ← 回退"
+            regressions += 1
+        print(f"  ×{r['scale']:<4} {r['stage']:<11} {before['rows_per_second']:>10.0f} -> {r['rows_per_second']:>10.0f} 行/秒"
+              f"（{ratio:.2f} 倍），峰值 RSS {before['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MB{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="入库流程的离线基准")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="运行基准")
+    run.add_argument("--scale", type=int, nargs="+", default=[1, 10], help="数据倍数，可给多个")
+    run.add_argument("--stage", action="append", choices=STAGES, help="只运行指定的阶段，可重复")
+    run.add_argument("--workdir", default=WORKDIR, help="合成数据与中间结果目录")
+    run.add_argument("--output", default=None, help="结果 JSON，默认 Benchmark/results/<提交号>-<时间>.json")
+    run.add_argument("--neo4j-uri", help="本地替身 Neo4j，例如 bolt://127.0.0.1:7687")
+    run.add_argument("--mysql-host", help="本地替身 MySQL，例如 127.0.0.1")
+    run.add_argument("--mysql-port", type=int)
+
+    stage = sub.add_parser("stage", help=argparse.SUPPRESS)
+    stage.add_argument("stage", choices=STAGES)
+    stage.add_argument("--workdir", required=True)
+    stage.add_argument("--scale", type=int, required=True)
+    stage.add_argument("--neo4j-uri")
+    stage.add_argument("--mysql-host")
+    stage.add_argument("--mysql-port", type=int)
+
+    compare = sub.add_parser("compare", help="比较两次结果")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.1, help="吞吐量下降超过该比例记为回退")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        if args.output is None:
+            commit, _ = git_commit()
+            args.output = os.path.join(RESULTS_DIR, f"{(commit or 'unknown')[:10]}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        sys.exit(run_main(args))
+    if args.command == "stage":
+        stage_main(args)
+    else:
+        sys.exit(compare_main(args))
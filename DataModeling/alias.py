@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# alias.py
+# 作者别名表：把“作者”列中的原始字符串（清洗后的形式，如 Wen_Zhao）映射到规范人物。
+#   - person：真实作者，按规范化词元（去掉重音、大小写、标点和括号中的别名，保持原有词序）归并拼写变体，
+#             括号中注明的别名（如 Wang_Jiqian_(C._C._Wang)）也归并到同一人物；词序不同的姓名（Wang_Fu 与 Fu_Wang）
+#             视为不同的人。同一人物的所有写法共用出现次数最多的写法作为规范名，以及同一个人物ID；
+#   - culture：Chinese、China、Chinese,_for_American_market 这类文化/产地标签，不再生成 people 节点，
+#              而是作为藏品的 culture 属性；
+#   - unknown：Artist-maker_unknown、Unidentified_artist 等占位值，不生成任何关系。
+# 别名表只构建一次并缓存为 JSON，之后按原始字符串 O(1) 查表，遇到新写法时先按词元键查找再追加。
+#
+# 构建缓存：python alias.py --input merged_artifacts.csv
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from itertools import dropwhile
+
+import pandas as pd
+
+ALIAS_PATH = "author_aliases.json"
+
+UNKNOWN_WORDS = {"unknown", "unidentified", "various", "anonymous"}
+CULTURE_WORDS = {
+    "china", "chinese", "tibet", "tibetan", "mongolia", "mongolian", "korea", "korean",
+    "japan", "japanese", "asia", "asian", "turkestan", "macao", "canton",
+}
+# 文化标签开头可能出现的修饰词，如 probably_Chinese、North_China、Eastern_Tibetan_or_Chinese
+LEADING_QUALIFIERS = {
+    "probably", "possibly", "eastern", "western", "north", "northern", "south", "southern",
+    "northeast", "northwest", "southeast", "southwest", "central",
+}
+PARENTHESIS = re.compile(r"\(([^)]*)\)")
+NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def tokens(text):
+    """去重音、转小写后按非字母数字切分"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return [t for t in NON_ALNUM.split(text) if t]
+
+
+def classify(name):
+    """返回 (类别, 词元键列表)；人物的第一个键来自括号外的主名，其余来自括号内的别名"""
+    if set(tokens(name)) & UNKNOWN_WORDS:
+        return "unknown", []
+    main_tokens = tokens(PARENTHESIS.sub(" ", name))
+    leading = list(dropwhile(lambda t: t in LEADING_QUALIFIERS, main_tokens))
+    if leading and leading[0] in CULTURE_WORDS:
+        return "culture", []
+    if not main_tokens:
+        return "unknown", []
+    keys = [" ".join(main_tokens)]
+    # 括号里的地名（如 Guangzhou_(Canton)）不能作为别名，否则会把同一地点的不同作坊归并到一起
+    keys += [" ".join(tokens(alias)) for alias in PARENTHESIS.findall(name)
+             if tokens(alias) and classify(alias)[0] == "person"]
+    return "person", keys
+
+
+def person_id(key):
+    return "P" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+class AliasTable:
+    """entries: 原始字符串 -> {kind, name, id}；keys: 词元键 -> 规范名"""
+
+    def __init__(self, entries=None, keys=None):
+        self.entries = entries or {}
+        self.keys = keys or {}
+
+    @classmethod
+    def build(cls, names):
+        """从全部作者取值构建；names 为可重复的序列，出现次数多的写法优先成为规范名"""
+        table = cls()
+        counts = pd.Series(names).dropna().value_counts()
+        table.extend(counts.index)
+        return table
+
+    def extend(self, names):
+        """把表中没有的写法加入别名表，返回新增数量"""
+        added = 0
+        for name in names:
+            if name in self.entries:
+                continue
+            kind, keys = classify(name)
+            if kind == "culture":
+                self.entries[name] = {"kind": kind, "name": name.replace("_", " ")}
+            elif kind == "unknown":
+                self.entries[name] = {"kind": kind, "name": None}
+            else:
+                canonical = next((self.keys[k] for k in keys if k in self.keys), name)
+                for k in keys:
+                    self.keys.setdefault(k, canonical)
+                # 规范名总是先于其变体加入表中，变体沿用它的人物ID，同一人物只有一个ID
+                pid = person_id(keys[0]) if canonical == name else self.entries[canonical]["id"]
+                self.entries[name] = {"kind": kind, "name": canonical, "id": pid}
+            added += 1
+        return added
+
+    def apply(self, series):
+        """批量查表：返回 (类别, 规范名) 两个与输入等长的 Series，每个不同的取值只查一次"""
+        self.extend(series.dropna().unique())
+        kinds = {name: entry["kind"] for name, entry in self.entries.items()}
+        names = {name: entry["name"] for name, entry in self.entries.items()}
+        return series.map(kinds), series.map(names)
+
+    def person_ids(self, series):
+        """批量查人物ID，非人物取值为空"""
+        self.extend(series.dropna().unique())
+        return series.map({name: entry.get("id") for name, entry in self.entries.items()})
+
+    @classmethod
+    def load(cls, path=ALIAS_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["entries"], data["keys"])
+
+    def save(self, path=ALIAS_PATH):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries, "keys": self.keys}, f, ensure_ascii=False, indent=0)
+        os.replace(tmp, path)
+
+
+def load_or_build(path=ALIAS_PATH, names=None):
+    """有缓存时直接读取（并补充新的写法），否则用 names 构建"""
+    if os.path.exists(path):
+        table = AliasTable.load(path)
+        if names is not None:
+            table.extend(pd.Series(names).dropna().unique())
+        return table
+    return AliasTable.build([] if names is None else names)
+
+
+if __name__ == "__main__":
+    from model import clean_names
+    from store import read_table
+
+    parser = argparse.ArgumentParser(description="构建作者别名表缓存")
+    parser.add_argument("--input", default="merged_artifacts.csv")
+    parser.add_argument("--output", default=ALIAS_PATH)
+    args = parser.parse_args()
+
+    authors = clean_names(read_table(args.input, ["作者"])["作者"])
+    table = AliasTable.build(authors)
+    table.save(args.output)
+    kinds = pd.Series([e["kind"] for e in table.entries.values()]).value_counts()
+    people = len({e["id"] for e in table.entries.values() if e["kind"] == "person"})
+    print(f"✔ 已生成 {args.output}：{len(table.entries)} 种写法，人物 {people} 位，"
+          f"文化标签 {kinds.get('culture', 0)} 种，未知 {kinds.get('unknown', 0)} 种")
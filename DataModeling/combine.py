@@ -1,36 +1,111 @@
 #!/usr/bin/env python3
 # merge_four_csvs.py
+# 把各博物馆爬虫输出的 CSV 按声明式的列映射统一为 mysql.py 所需的规范列，再流式合并：
+# 编码只根据文件开头的一小段字节判断，读写都按块进行，内存占用与博物馆数量和文件大小无关。
+# 输出路径以 .parquet 结尾时写出 Parquet，供后续阶段按列读取。
+
+import argparse
+import codecs
+import os
 
 import pandas as pd
 
+from store import TableWriter
+
+# 规范列：mysql.py 导入的六列，加上 model.py 生成作者关系所需的“作者”
+CANONICAL_COLUMNS = ["藏品名称", "作者", "藏品来源", "年代", "介绍", "图片链接", "详情链接"]
+
+# 每个博物馆文件的列名 -> 规范列名；与规范列同名的列不需要写出。
+# 同时列出仓库中整理后的 CSV 和爬虫脚本原始输出的列名，两种文件都能直接合并。
+MUSEUM_COLUMN_MAPS = {
+    # 纳尔逊-阿特金斯艺术博物馆
+    "chinese_artifacts_1.csv": {
+        "文物名字": "藏品名称", "入藏信息": "藏品来源",
+        "文物图片链接": "图片链接", "详情页面URL": "详情链接",
+    },
+    # 大都会艺术博物馆
+    "metmuseum_final.csv": {
+        "标题": "藏品名称", "艺术家": "作者", "描述": "介绍",
+        "图片URL": "图片链接", "链接": "详情链接",
+    },
+    # 圣地亚哥艺术博物馆
+    "museum_artifact_details.csv": {
+        "名称": "藏品名称", "创作日期": "年代", "入藏信息": "藏品来源", "详细描述": "介绍",
+    },
+    # 费城艺术博物馆
+    "Philamuseum_final.csv": {
+        "时间": "年代", "描述": "介绍", "摘要": "介绍", "信用信息": "藏品来源",
+    },
+}
+
+DEFAULT_FILES = list(MUSEUM_COLUMN_MAPS)
+CHUNKSIZE = 5000
+PREFIX_BYTES = 64 * 1024
+
+
+def detect_encoding(path, prefix_bytes=PREFIX_BYTES):
+    """只读取文件开头一段判断编码：带 BOM 为 utf-8-sig，能按 UTF-8 解码为 utf-8，否则为 gb18030"""
+    with open(path, "rb") as f:
+        prefix = f.read(prefix_bytes)
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # 增量解码器允许末尾被截断的多字节字符
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def column_plan(path, header):
+    """根据映射表得到 {规范列: 源列}；多个源列映射到同一规范列时取表头中靠前的一个"""
+    mapping = MUSEUM_COLUMN_MAPS.get(os.path.basename(path), {})
+    plan = {}
+    for col in header:
+        target = mapping.get(col, col)
+        if target in CANONICAL_COLUMNS and target not in plan:
+            plan[target] = col
+    dropped = [col for col in header if col not in plan.values()]
+    if dropped:
+        print(f"  {path} 未映射的列将被忽略：{dropped}")
+    return plan
+
+
+def iter_canonical_chunks(path, encoding, chunksize=CHUNKSIZE):
+    """按块读取一个博物馆文件，并转换为规范列"""
+    header = pd.read_csv(path, dtype=str, encoding=encoding, nrows=0).columns
+    plan = column_plan(path, header)
+    reader = pd.read_csv(path, dtype=str, encoding=encoding,
+                         usecols=list(plan.values()), chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk.rename(columns={src: dst for dst, src in plan.items()})
+        yield chunk.reindex(columns=CANONICAL_COLUMNS)
+
+
+def merge_csv_files(output_path="merged_artifacts.csv", files=None, chunksize=CHUNKSIZE):
+    # 1. 列出要合并的 CSV 文件
+    files = files or DEFAULT_FILES
+
+    # 2. 逐个文件、逐块转换为规范列后追加写出；CSV 使用 utf-8-sig 以保证 Excel 打开时中文正常
+    total = 0
+    with TableWriter(output_path, CANONICAL_COLUMNS) as writer:
+        for fp in files:
+            count = 0
+            encoding = detect_encoding(fp)
+            for chunk in iter_canonical_chunks(fp, encoding, chunksize):
+                writer.write(chunk)
+                count += len(chunk)
+            print(f"已读取：{fp} （{count} 条记录，编码 {encoding}）")
+            total += count
 
-def merge_csv_files(output_path="merged_artifacts.csv"):
-    # 1. 列出要合并的四个 CSV 文件
-    files = [
-        "chinese_artifacts_1.csv",
-        "metmuseum_final.csv",
-        "museum_artifact_details.csv",
-        "Philamuseum_final.csv"
-    ]
-
-    # 2. 依次读取，遇到编码问题时使用 gb18030
-    dfs = []
-    for fp in files:
-        try:
-            df = pd.read_csv(fp, dtype=str, encoding="utf-8")
-        except UnicodeDecodeError:
-            df = pd.read_csv(fp, dtype=str, encoding="gb18030")
-        dfs.append(df)
-        print(f"已读取：{fp} （{len(df)} 条记录）")
-
-    # 3. 按列名对齐，纵向合并
-    merged = pd.concat(dfs, axis=0, ignore_index=True, sort=False)
-    print(f"合并后总记录数：{len(merged)}，共 {len(merged.columns)} 列")
-
-    # 4. 保存为新的 CSV，使用 utf-8-sig 以保证 Excel 打开时中文正常
-    merged.to_csv(output_path, index=False, encoding="utf-8-sig")
+    print(f"合并后总记录数：{total}，共 {len(CANONICAL_COLUMNS)} 列")
     print(f"已生成合并文件：{output_path}")
 
 
 if __name__ == "__main__":
-    merge_csv_files()
+    parser = argparse.ArgumentParser(description="按规范列流式合并各博物馆 CSV")
+    parser.add_argument("files", nargs="*", help=f"要合并的文件，默认 {DEFAULT_FILES}")
+    parser.add_argument("--output", default="merged_artifacts.csv", help="以 .parquet 结尾时输出 Parquet")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+    merge_csv_files(args.output, args.files, args.chunksize)
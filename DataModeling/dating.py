@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# dating.py
+# 年代解析：把 “Qing Dynasty (1644-1911)”、“ca. 570 C.E.”、“late 18th–early 19th century”、“1960s”
+# 这类自由文本转换成 year_start / year_end 整数（公元前为负数）和朝代标签。
+#   - 只解析不重复的取值，再按原列映射回去；每一类写法（世纪、年代、具体年份、朝代名）各用一次
+#     str.extractall 对整列提取，起止年份用向量运算得到，同一取值的多个片段取并集；
+#   - 没有写出年份、只有朝代或年号的取值，按 DYNASTIES 查表得到年份范围；
+#   - IntervalIndex 是静态的中心区间树，重叠查询与点查询都是 O(log n + k)。
+#
+# 查看解析覆盖率并查询某段时间的藏品：python dating.py --input merged_artifacts.csv --overlap 1600 1700
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# 朝代/年号（小写） -> (朝代标签, 起始年, 结束年)
+DYNASTIES = {
+    "neolithic": ("Neolithic", -7000, -1700),
+    "xia": ("Xia", -2070, -1600),
+    "shang": ("Shang", -1600, -1046),
+    "western zhou": ("Western Zhou", -1046, -771),
+    "eastern zhou": ("Eastern Zhou", -770, -256),
+    "spring and autumn": ("Spring and Autumn", -770, -476),
+    "warring states": ("Warring States", -475, -221),
+    "zhou": ("Zhou", -1046, -256),
+    "qin": ("Qin", -221, -206),
+    "western han": ("Western Han", -206, 9),
+    "eastern han": ("Eastern Han", 25, 220),
+    "han": ("Han", -206, 220),
+    "three kingdoms": ("Three Kingdoms", 220, 280),
+    "six dynasties": ("Six Dynasties", 220, 589),
+    "western jin": ("Western Jin", 265, 317),
+    "eastern jin": ("Eastern Jin", 317, 420),
+    "northern wei": ("Northern Wei", 386, 534),
+    "eastern wei": ("Eastern Wei", 534, 550),
+    "western wei": ("Western Wei", 535, 557),
+    "northern qi": ("Northern Qi", 550, 577),
+    "northern zhou": ("Northern Zhou", 557, 581),
+    "northern dynasties": ("Northern Dynasties", 386, 581),
+    "southern dynasties": ("Southern Dynasties", 420, 589),
+    "sui": ("Sui", 581, 618),
+    "tang": ("Tang", 618, 907),
+    "five dynasties": ("Five Dynasties", 907, 960),
+    "liao": ("Liao", 907, 1125),
+    "northern song": ("Northern Song", 960, 1127),
+    "southern song": ("Southern Song", 1127, 1279),
+    "song": ("Song", 960, 1279),
+    "jin": ("Jin", 1115, 1234),
+    "yuan": ("Yuan", 1271, 1368),
+    "ming": ("Ming", 1368, 1644),
+    "qing": ("Qing", 1644, 1911),
+    "republican period": ("Republican", 1912, 1949),
+    # 明清年号
+    "hongwu": ("Ming", 1368, 1398),
+    "yongle": ("Ming", 1403, 1424),
+    "xuande": ("Ming", 1426, 1435),
+    "chenghua": ("Ming", 1465, 1487),
+    "hongzhi": ("Ming", 1488, 1505),
+    "zhengde": ("Ming", 1506, 1521),
+    "jiajing": ("Ming", 1522, 1566),
+    "longqing": ("Ming", 1567, 1572),
+    "wanli": ("Ming", 1573, 1620),
+    "chongzhen": ("Ming", 1628, 1644),
+    "shunzhi": ("Qing", 1644, 1661),
+    "kangxi": ("Qing", 1662, 1722),
+    "yongzheng": ("Qing", 1723, 1735),
+    "qianlong": ("Qing", 1736, 1795),
+    "jiaqing": ("Qing", 1796, 1820),
+    "daoguang": ("Qing", 1821, 1850),
+    "xianfeng": ("Qing", 1851, 1861),
+    "tongzhi": ("Qing", 1862, 1874),
+    "guangxu": ("Qing", 1875, 1908),
+    "xuantong": ("Qing", 1909, 1911),
+}
+
+# 世纪/年代前的限定词 -> 在该时间段内所占的比例范围
+MODIFIERS = {
+    "early": (0.0, 1 / 3), "mid": (1 / 3, 2 / 3), "late": (2 / 3, 1.0),
+    "first half": (0.0, 0.5), "second half": (0.5, 1.0),
+    "first quarter": (0.0, 0.25), "second quarter": (0.25, 0.5),
+    "third quarter": (0.5, 0.75), "fourth quarter": (0.75, 1.0), "last quarter": (0.75, 1.0),
+}
+MODIFIER = (r"(?:(early|mid|late|(?:first|second) half|(?:first|second|third|fourth|last) quarter)"
+            r"(?: of)?(?: the)?[\s-]*)?")
+ORDINAL = r"(?:st|nd|rd|th)"
+# “18th–19th century”中的 18th 也是世纪，因此前瞻允许中间隔着另一个世纪和连接词
+CENTURY = (MODIFIER + rf"(\d{{1,2}}){ORDINAL}(?=(?:[\s,/-]|or\b|and\b|early|mid|late|half|quarter|"
+           rf"\d{{1,2}}{ORDINAL})*centur(?:y|ies)(?:\s*(bce|ce)\b)?)")
+DECADE = MODIFIER + r"\b(\d{3})0s\b"
+YEAR = r"(?<![\d.])(\d{1,4})(?:\s*(bce|ce)\b)?(?:\s*-\s*(\d{1,4})(?!\d)(?:\s*(bce|ce)\b)?)?(?![\d.])"
+DYNASTY = r"\b(" + "|".join(sorted(DYNASTIES, key=len, reverse=True)) + r")\b"
+
+NORMALIZE = [
+    (r"[‐-―−]", "-"),
+    (r"(\d(?:st|nd|rd|th)?)\s+to\s+(?=\d)", r"\1-"),
+    (r"\bmid(?=\d)", "mid "),
+    (r"\b1st half", "first half"),
+    (r"\b2nd half", "second half"),
+    (r"\b(ca?)\.(?=\d)", r"\1. "),
+    (r"\b(?:b\.?\s?c\.?\s?e\.?|b\.?\s?c\.?)(?![a-z])", " bce "),
+    (r"\b(?:c\.\s?e\.?|ce|a\.\s?d\.?|ad)(?![a-z])", " ce "),
+    (r"\s+", " "),
+]
+
+
+def normalize(values):
+    values = values.str.lower()
+    for pattern, repl in NORMALIZE:
+        values = values.str.replace(pattern, repl, regex=True)
+    return values
+
+
+def _modify(matches, mod_col, start, length):
+    """按限定词把 [start, start + length) 缩小到其中的一部分"""
+    lo = matches[mod_col].map(lambda m: MODIFIERS[m][0] if isinstance(m, str) else 0.0).to_numpy()
+    hi = matches[mod_col].map(lambda m: MODIFIERS[m][1] if isinstance(m, str) else 1.0).to_numpy()
+    return start + np.floor(lo * length).astype(np.int64), start + np.ceil(hi * length).astype(np.int64) - 1
+
+
+def _centuries(values):
+    m = values.str.extractall(CENTURY)
+    m.columns = ["mod", "n", "era"]
+    n = m["n"].astype(np.int64).to_numpy()
+    # 公元 18 世纪为 1701–1800，公元前 3 世纪为 -300–-201
+    bce = (m["era"] == "bce").to_numpy()
+    first = np.where(bce, -n * 100, (n - 1) * 100 + 1)
+    start, end = _modify(m, "mod", first, 100)
+    return pd.DataFrame({"start": start, "end": end}, index=m.index)
+
+
+def _decades(values):
+    m = values.str.extractall(DECADE)
+    m.columns = ["mod", "d"]
+    start, end = _modify(m, "mod", m["d"].astype(np.int64).to_numpy() * 10, 10)
+    return pd.DataFrame({"start": start, "end": end}, index=m.index)
+
+
+def _years(values):
+    # 先去掉世纪、年代和其他序数词（如 2nd edition、10th year of ...），剩下的数字才是年份
+    values = (values.str.replace(CENTURY, " ", regex=True)
+                    .str.replace(DECADE, " ", regex=True)
+                    .str.replace(rf"\d+{ORDINAL}\b", " ", regex=True))
+    m = values.str.extractall(YEAR)
+    m.columns = ["a", "a_era", "b", "b_era"]
+    a_digits = m["a"].str.len().to_numpy()
+    b_digits = m["b"].str.len().fillna(0).astype(np.int64).to_numpy()
+    has_era = (m["a_era"].notna() | m["b_era"].notna()).to_numpy()
+    # 一两位的孤立数字多半不是年份（Sep-77、75 km），除非带有纪元
+    keep = (a_digits >= 3) | (b_digits >= 3) | has_era
+    m, a_digits, b_digits = m[keep], a_digits[keep], b_digits[keep]
+
+    a = m["a"].astype(np.int64).to_numpy()
+    b = m["b"].fillna(m["a"]).astype(np.int64).to_numpy()
+    # 1785–90 这类省略写法补全为 1790
+    short = (b_digits > 0) & (b_digits < a_digits) & m["b_era"].isna().to_numpy()
+    scale = 10 ** b_digits
+    expanded = a - a % scale + b
+    b = np.where(short, np.where(expanded < a, expanded + scale, expanded), b)
+    # 区间末尾的纪元同时作用于起点（1100–771 BCE）
+    b_bce = (m["b_era"] == "bce").to_numpy() | (m["b"].isna() & (m["a_era"] == "bce")).to_numpy()
+    a_bce = (m["a_era"] == "bce").to_numpy() | (m["a_era"].isna() & b_bce).to_numpy()
+    a, b = np.where(a_bce, -a, a), np.where(b_bce, -b, b)
+    return pd.DataFrame({"start": np.minimum(a, b), "end": np.maximum(a, b)}, index=m.index)
+
+
+def parse_dates(series):
+    """返回与 series 等索引的 DataFrame：year_start、year_end（Int64，无法解析为空）和 dynasty"""
+    uniques = pd.Series(series.dropna().unique(), dtype=object)
+    values = normalize(uniques)
+
+    spans = pd.concat([_centuries(values), _decades(values), _years(values)])
+    bounds = spans.groupby(level=0).agg({"start": "min", "end": "max"})
+
+    dyn = values.str.extractall(DYNASTY)[0].map(DYNASTIES)
+    dyn = pd.DataFrame(dyn.tolist(), index=dyn.index, columns=["dynasty", "start", "end"])
+    labels = dyn["dynasty"].groupby(level=0).first()
+    # 只有朝代或年号、没有年份的取值按查表结果补全
+    fallback = dyn.groupby(level=0).agg({"start": "min", "end": "max"})
+    bounds = bounds.combine_first(fallback.drop(index=bounds.index, errors="ignore"))
+
+    parsed = pd.DataFrame({
+        "year_start": bounds["start"].reindex(uniques.index).astype("Int64"),
+        "year_end": bounds["end"].reindex(uniques.index).astype("Int64"),
+        "dynasty": labels.reindex(uniques.index),
+    })
+    parsed.index = uniques
+    result = parsed.reindex(series.to_numpy())
+    result.index = series.index
+    return result
+
+
+class IntervalIndex:
+    """静态中心区间树。每个节点保存跨过中心点的区间（分别按起点升序、终点降序排列），
+    完全在中心点左侧或右侧的区间分别进入左右子树；查询时每个节点用二分定位，只访问 O(log n) 个节点。
+    """
+
+    def __init__(self, starts, ends, labels=None):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.labels = np.arange(len(self.starts)) if labels is None else np.asarray(labels)
+        self.nodes = []
+        self.root = self._build(np.arange(len(self.starts)))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _build(self, idx):
+        if len(idx) == 0:
+            return -1
+        s, e = self.starts[idx], self.ends[idx]
+        center = np.median(np.concatenate([s, e]))
+        here = idx[(s <= center) & (e >= center)]
+        by_start = here[np.argsort(self.starts[here], kind="stable")]
+        by_end = here[np.argsort(-self.ends[here], kind="stable")]
+        node = len(self.nodes)
+        self.nodes.append(None)
+        left = self._build(idx[e < center])
+        right = self._build(idx[s > center])
+        self.nodes[node] = (center, by_start, self.starts[by_start], by_end, -self.ends[by_end], left, right)
+        return node
+
+    def overlap(self, lo, hi):
+        """返回与闭区间 [lo, hi] 有交集的所有区间的标签"""
+        found, stack = [], [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            center, by_start, sorted_starts, by_end, neg_ends, left, right = self.nodes[node]
+            if hi < center:
+                # 本节点的区间都覆盖 center > hi，只需起点 <= hi
+                found.append(by_start[:np.searchsorted(sorted_starts, hi, side="right")])
+                stack.append(left)
+            elif lo > center:
+                found.append(by_end[:np.searchsorted(neg_ends, -lo, side="right")])
+                stack.append(right)
+            else:
+                found.append(by_start)
+                stack.extend((left, right))
+        if not found:
+            return self.labels[:0]
+        return self.labels[np.concatenate(found)]
+
+    def stab(self, year):
+        """返回包含 year 的所有区间的标签"""
+        return self.overlap(year, year)
+
+    @classmethod
+    def from_frame(cls, parsed, labels):
+        """用 parse_dates 的结果建索引，跳过无法解析的行"""
+        mask = parsed["year_start"].notna().to_numpy()
+        return cls(parsed["year_start"].to_numpy()[mask], parsed["year_end"].to_numpy()[mask],
+                   np.asarray(labels)[mask])
+
+
+if __name__ == "__main__":
+    from store import read_table
+
+    parser = argparse.ArgumentParser(description="解析年代并按时间段查询藏品")
+    parser.add_argument("--input", default="merged_artifacts.csv")
+    parser.add_argument("--overlap", nargs=2, type=int, metavar=("START", "END"), help="查询与该时间段重叠的藏品")
+    args = parser.parse_args()
+
+    df = read_table(args.input, ["藏品名称", "年代"])
+    parsed = parse_dates(df["年代"])
+    has_date = df["年代"].notna()
+    ok = parsed["year_start"].notna()
+    print(f"年代非空 {int(has_date.sum())} 条，解析出年份 {int(ok.sum())} 条，"
+          f"识别出朝代 {int(parsed['dynasty'].notna().sum())} 条")
+    unparsed = df.loc[has_date & ~ok, "年代"].value_counts()
+    if len(unparsed):
+        print(f"未能解析的写法（前 10 种）：{list(unparsed.index[:10])}")
+    if args.overlap:
+        index = IntervalIndex.from_frame(parsed, df["藏品名称"])
+        hits = index.overlap(*args.overlap)
+        print(f"与 {args.overlap[0]}–{args.overlap[1]} 重叠的藏品 {len(hits)} 件，例如：{list(hits[:5])}")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# dedup.py
+# 位于 combine.py 与 model.py 之间的近重复检测：为每条藏品分配规范实体ID（实体ID 列），
+# model.py 对同一实体只生成一次三元组，加载脚本也就不会重复 MERGE。
+#   1. 分块：详情链接去掉会话参数（jsessionid、ctx、idx）后相同的记录，直接视为同一实体；
+#   2. MinHash/LSH：对规范化后的标题、介绍和尺寸数字取特征集合，计算 MinHash 签名并分段分桶，
+#      只有落在同一个桶里的记录才比较估计的 Jaccard 相似度，整体接近线性时间。
+# 同一个博物馆内详情链接不同的记录是不同的藏品（例如同名的多件 Chair Rug），任何一个实体都不会同时包含它们；
+# 只有标题而没有介绍、尺寸的记录证据不足，只参与精确分块。
+# 实体ID 由实体的内容决定，与记录在合并文件中的位置无关：记录先按（规范化链接，内容键）排序后再聚类，
+# 有详情链接的实体取其中最小的链接，没有链接的取成员中最小的内容键（“名称、来源、年代、介绍、图片链接”的 SHA1），
+# combine 的输入顺序变化时结果完全相同，行数变化也不会改变其余实体的ID。
+# 输入按 CHUNKSIZE 行分块读取：每条记录的特征集合算出签名后即丢弃，内存中只保留签名（只为能参与模糊匹配的记录保存）、
+# 链接、域名和内容键的摘要；输出时再分块读一遍输入，逐块加上实体ID 列写出，整张表不会同时留在内存中。
+
+import argparse
+import hashlib
+import re
+import sys
+import zlib
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+from store import TableWriter, iter_chunks, table_columns
+
+NUM_PERM = 128
+BANDS = 16            # 16 段 × 8 行，相似度约 0.7 以上的记录大概率进入同一个桶
+THRESHOLD = 0.8       # 估计 Jaccard 相似度达到该值才认为是近重复
+MIN_FEATURES = 5      # 特征总数太少时不参与模糊匹配
+MERSENNE = 4294967311  # 大于 2^32 的素数，a * h + b 不会超出 uint64
+SEED = 1
+CHUNKSIZE = 20000     # 每次读取并计算签名的行数
+KEY_COLUMNS = ["藏品名称", "藏品来源", "年代", "介绍", "图片链接"]
+
+SESSION_PARAMS = re.compile(r";jsessionid=[^?&#]*|(?<=[?&])(?:ctx|idx)=[^&#]*&?", re.IGNORECASE)
+DIMENSION = re.compile(r"(\d+(?:\.\d+)?)\s*cm", re.IGNORECASE)
+NON_WORD = re.compile(r"\W+")
+
+
+def normalize_link(series):
+    """去掉详情链接中的会话参数，得到稳定的分块键"""
+    return (series.fillna("")
+                  .str.replace(SESSION_PARAMS, "", regex=True)
+                  .str.rstrip("?&")
+                  .str.strip())
+
+
+def normalize_text(series):
+    return series.fillna("").str.lower().str.replace(NON_WORD, " ", regex=True).str.strip()
+
+
+def features(title, description):
+    """标题取字符 3-gram，介绍取相邻词对，尺寸取以 cm 计的数字"""
+    feats = set()
+    compact = title.replace(" ", "")
+    feats.update("t:" + compact[i:i + 3] for i in range(max(len(compact) - 2, 0)))
+    words = description.split()
+    feats.update(f"d:{a} {b}" for a, b in zip(words, words[1:]))
+    feats.update("m:" + value for value in DIMENSION.findall(description))
+    return feats
+
+
+def is_usable(feats):
+    """特征足够多、且不只有标题特征的记录才参与模糊匹配"""
+    return len(feats) >= MIN_FEATURES and any(not x.startswith("t:") for x in feats)
+
+
+def permutations(num_perm=NUM_PERM, seed=SEED):
+    """MinHash 的 num_perm 组哈希参数 (a, b)"""
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint64)
+    b = rng.randint(0, 2 ** 32, size=num_perm, dtype=np.int64).astype(np.uint64)
+    return a, b
+
+
+def minhash(feats, a, b):
+    """一个非空特征集合的签名（长度为 num_perm 的 uint64 数组）"""
+    h = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint64, count=len(feats))
+    return ((np.outer(h, a) + b) % MERSENNE).min(axis=0)
+
+
+def minhash_signatures(feature_sets, num_perm=NUM_PERM, seed=SEED):
+    """返回 (n, num_perm) 的 uint64 签名矩阵；没有特征的行签名全为最大值"""
+    a, b = permutations(num_perm, seed)
+    sigs = np.full((len(feature_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, feats in enumerate(feature_sets):
+        if feats:
+            sigs[i] = minhash(feats, a, b)
+    return sigs
+
+
+class UnionFind:
+    """并查集；每个集合记录 {博物馆域名: 详情链接}，同一域名下链接不同的两个集合不能合并。
+    只有一条记录的集合不单独保存字典，直接由 hosts、links 得到"""
+
+    def __init__(self, hosts, links):
+        self.parent = list(range(len(links)))
+        self.hosts = hosts
+        self.links = links
+        self.merged = {}  # 代表 -> 多条记录合并后的 {域名: 链接}
+
+    def sources(self, root):
+        if root in self.merged:
+            return self.merged[root]
+        return {self.hosts[root]: self.links[root]} if self.links[root] else {}
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x == y:
+            return True
+        a, b = self.sources(x), self.sources(y)
+        if any(a[h] != link for h, link in b.items() if h in a):
+            return False
+        # 以较早出现的记录作为代表
+        root, child = min(x, y), max(x, y)
+        self.parent[child] = root
+        self.merged[root] = {**a, **b}
+        self.merged.pop(child, None)
+        return True
+
+
+def column(df, name):
+    return df[name] if name in df.columns else pd.Series("", index=df.index, dtype=object)
+
+
+def content_keys(df):
+    """没有详情链接时用于生成实体ID的内容键：规范化后的名称、来源、年代、介绍与图片链接的 SHA1（十六进制）"""
+    parts = [normalize_text(column(df, name)) for name in KEY_COLUMNS]
+    return np.array([hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest() for values in zip(*parts)],
+                    dtype="S40")
+
+
+def scan(chunks, num_perm=NUM_PERM):
+    """逐块计算聚类所需的数据，返回 (规范化链接, 域名, 内容键, 可参与模糊匹配的行, 这些行的签名)；
+    每条记录的特征集合算出签名后即丢弃"""
+    a, b = permutations(num_perm)
+    links, hosts, keys, usable, sigs = [], [], [], [], [np.empty((0, num_perm), dtype=np.uint64)]
+    for chunk in chunks:
+        chunk_links = normalize_link(column(chunk, "详情链接")).to_numpy()
+        links.append(chunk_links)
+        hosts.append(np.array([sys.intern(urlsplit(url).netloc) for url in chunk_links], dtype=object))
+        keys.append(content_keys(chunk))
+        titles = normalize_text(column(chunk, "藏品名称"))
+        descriptions = normalize_text(column(chunk, "介绍"))
+        mask, chunk_sigs = [], []
+        for title, description in zip(titles, descriptions):
+            feats = features(title, description)
+            mask.append(is_usable(feats))
+            if mask[-1]:
+                chunk_sigs.append(minhash(feats, a, b))
+        usable.append(np.array(mask, dtype=bool))
+        sigs.append(np.array(chunk_sigs, dtype=np.uint64).reshape(-1, num_perm))
+    if not links:
+        return (np.empty(0, dtype=object), np.empty(0, dtype=object), np.empty(0, dtype="S40"),
+                np.empty(0, dtype=bool), sigs[0])
+    return (np.concatenate(links), np.concatenate(hosts), np.concatenate(keys), np.concatenate(usable),
+            np.concatenate(sigs))
+
+
+def cluster(links, hosts, keys, usable, sigs, threshold=THRESHOLD, bands=BANDS, num_perm=NUM_PERM):
+    """返回 (实体ID 数组, 被合并的记录数)，顺序与输入相同。
+
+    聚类时同一博物馆的不同链接不能合并，结果与处理顺序有关，因此先按（规范化链接，内容键）排成固定顺序。
+    """
+    n = len(links)
+    order = np.lexsort((keys, links))
+    # 签名只为可参与模糊匹配的记录保存，sig_rows[i] 是排序后第 i 条记录的签名行号（-1 表示没有）
+    sig_rows = np.full(n, -1, dtype=np.int64)
+    sig_rows[usable] = np.arange(len(sigs))
+    sig_rows, links, hosts, keys = sig_rows[order], links[order], hosts[order], keys[order]
+    uf = UnionFind(hosts, links)
+
+    # 1. 精确分块：规范化后的详情链接相同
+    first_seen = {}
+    for i, link in enumerate(links):
+        if link:
+            uf.union(first_seen.setdefault(link, i), i)
+
+    # 2. MinHash/LSH：每个桶内只与桶中第一条记录比较，比较次数与记录数成线性关系
+    candidates = np.flatnonzero(sig_rows >= 0)
+    rows = num_perm // bands
+    for band in range(bands):
+        buckets = defaultdict(list)
+        block = sigs[:, band * rows:(band + 1) * rows]
+        for i in candidates:
+            buckets[block[sig_rows[i]].tobytes()].append(i)
+        for members in buckets.values():
+            head = sigs[sig_rows[members[0]]]
+            for i in members[1:]:
+                if np.mean(sigs[sig_rows[i]] == head) >= threshold:
+                    uf.union(members[0], i)
+
+    roots = [uf.find(i) for i in range(n)]
+    # 每个实体取成员中最小的链接，没有链接时取最小的内容键
+    cluster_keys = {}
+    for i, r in enumerate(roots):
+        sources = uf.sources(r)
+        if sources:
+            cluster_keys[r] = min(sources.values())
+        else:
+            key = "content:" + keys[i].decode("ascii")
+            cluster_keys[r] = min(cluster_keys.get(r, key), key)
+    ids = np.empty(n, dtype=object)
+    ids[order] = [hashlib.sha1(cluster_keys[r].encode("utf-8")).hexdigest()[:16] for r in roots]
+    return ids, n - len(set(roots))
+
+
+def assign_entity_ids(df, threshold=THRESHOLD, bands=BANDS, num_perm=NUM_PERM):
+    """返回与 df 等长的实体ID Series，以及被合并的记录数"""
+    ids, merged = cluster(*scan([df], num_perm), threshold, bands, num_perm)
+    return pd.Series(ids, index=df.index, name="实体ID"), merged
+
+
+def main(input_path="merged_artifacts.csv", output_path="deduped_artifacts.csv", threshold=THRESHOLD,
+         chunksize=CHUNKSIZE):
+    columns = table_columns(input_path)
+    needed = [c for c in ["详情链接"] + KEY_COLUMNS if c in columns]
+    ids, merged = cluster(*scan(iter_chunks(input_path, chunksize, needed)), threshold)
+    start = 0
+    with TableWriter(output_path, columns if "实体ID" in columns else columns + ["实体ID"]) as writer:
+        for chunk in iter_chunks(input_path, chunksize):
+            chunk["实体ID"] = ids[start:start + len(chunk)]
+            start += len(chunk)
+            writer.write(chunk)
+    print(f"共 {len(ids)} 条记录，识别出 {len(set(ids))} 个实体，合并近重复记录 {merged} 条")
+    print(f"已生成：{output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MinHash/LSH 近重复藏品检测，输出带实体ID的合并文件")
+    parser.add_argument("--input", default="merged_artifacts.csv")
+    parser.add_argument("--output", default="deduped_artifacts.csv")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    args = parser.parse_args()
+    main(args.input, args.output, args.threshold, args.chunksize)
@@ -2,56 +2,109 @@
 # export_triples_no_prefix.py
 # 本脚本从 merged_artifacts.csv 读取数据，生成“作者”三列三元组和其他属性两列文件，
 # 并且去掉主体前的 “文物/” 前缀，只保留清洗后的藏品名称。
+# 名称清洗以整列向量化的方式只做一次，各个输出表都由这一列加上布尔掩码得到；
+# 输入超出内存时可用 --chunksize 分块读取、逐块追加写出。
+# 输入可以是 CSV 或 Parquet（只读取用到的列），--format parquet 时输出 Parquet 供加载脚本按列读取。
+# 输入带有 dedup.py 生成的实体ID 列时，同一实体只保留第一条记录。
+# 作者经 alias.py 的别名表规范化：拼写变体归并为同一人物，Chinese 这类文化标签写入 文化 表，
+# 未知作者不生成关系；别名表缓存在 author_aliases.json，--no-aliases 时保持原始作者字符串。
 
-import pandas as pd
+import argparse
 import os
 
-def main():
-    # 1. 读取合并好的 CSV（与脚本同目录）
-    df = pd.read_csv("merged_artifacts.csv", dtype=str, encoding="utf-8-sig")
-    # 2. 输出目录
-    out_dir = "三元组"
-    os.makedirs(out_dir, exist_ok=True)
-    # 3. 处理“作者”——实体–关系–实体，三列格式
+import pandas as pd
+
+from alias import ALIAS_PATH, load_or_build
+from store import TableWriter, iter_chunks, read_table, table_columns
+
+属性列表 = ["年代", "介绍", "图片链接", "详情链接"]
+
+
+def clean_names(series):
+    """向量化清洗：去掉首尾空白，空格替换为下划线，“/”替换为“-”；空值保持为空"""
+    return (series.str.strip()
+                  .str.replace(' ', '_', regex=False)
+                  .str.replace('/', '-', regex=False))
+
+
+def extract_tables(df, aliases=None):
+    """从一批藏品数据生成 {文件名: DataFrame}，只包含输入中存在的列；给定别名表时另外生成 文化 表"""
+    if "藏品名称" in df.columns:
+        名称 = df["藏品名称"]
+    else:
+        名称 = pd.Series(pd.NA, index=df.index, dtype=object)
+    # 去掉“文物/”前缀，直接用清洗后的名称作为主体
+    主体 = clean_names(名称)
+    有名称 = 名称.notna()
+
+    tables = {}
+    # 处理“作者”——实体–关系–实体，三列格式
     if "作者" in df.columns:
-        triples = []
-        for _, row in df.iterrows():
-            名称 = row.get("藏品名称")
-            作者 = row.get("作者")
-            if pd.isna(名称) or pd.isna(作者):
-                continue
-            # 清洗名称和作者文本
-            名称_clean = 名称.strip().replace(' ', '_').replace('/', '-')
-            作者_clean = 作者.strip().replace(' ', '_').replace('/', '-')
-            # 去掉“文物/”前缀，直接用清洗后的名称作为主体
-            subj = 名称_clean
-            pred = "作者"
-            obj  = f"{作者_clean}"
-            triples.append((subj, pred, obj))
-        # 保存 author.csv
-        author_df = pd.DataFrame(triples, columns=["主体", "关系", "对象"])
-        author_df.to_csv(os.path.join(out_dir, "作者.csv"),
-                         index=False, encoding="utf-8-sig")
-        print(f"✔ 已生成 作者.csv （共 {len(triples)} 条）")
-    # 4. 处理属性——实体–属性，二列格式
-    属性列表 = ["年代", "介绍", "图片链接", "详情链接"]
+        mask = 有名称 & df["作者"].notna()
+        对象 = clean_names(df.loc[mask, "作者"])
+        if aliases is None:
+            tables["作者"] = pd.DataFrame({"主体": 主体[mask], "关系": "作者", "对象": 对象})
+        else:
+            类别, 规范名 = aliases.apply(对象)
+            人物, 文化 = 类别 == "person", 类别 == "culture"
+            tables["作者"] = pd.DataFrame({"主体": 主体[mask][人物], "关系": "作者", "对象": 规范名[人物]})
+            tables["文化"] = pd.DataFrame({"主体": 主体[mask][文化], "文化": 规范名[文化]})
+    # 处理属性——实体–属性，二列格式
     for col in 属性列表:
         if col not in df.columns:
             continue
-        records = []
-        for _, row in df.iterrows():
-            名称 = row.get("藏品名称")
-            值   = row.get(col)
-            if pd.isna(名称) or pd.isna(值):
-                continue
-            名称_clean = 名称.strip().replace(' ', '_').replace('/', '-')
-            # 去掉“文物/”前缀，直接用清洗后的名称作为主体
-            records.append((名称_clean, 值.strip()))
-        # 保存每个属性的 CSV，列名：主体, 属性名
-        out_path = os.path.join(out_dir, f"{col}.csv")
-        out_df = pd.DataFrame(records, columns=["主体", col])
-        out_df.to_csv(out_path, index=False, encoding="utf-8-sig")
-        print(f"✔ 已生成 {col}.csv （共 {len(records)} 条）")
+        mask = 有名称 & df[col].notna()
+        tables[col] = pd.DataFrame({"主体": 主体[mask], col: df.loc[mask, col].str.strip()})
+    return tables
+
+
+def main(input_path="merged_artifacts.csv", out_dir="三元组", chunksize=None, fmt="csv", alias_path=ALIAS_PATH):
+    # 1. 输出目录
+    os.makedirs(out_dir, exist_ok=True)
+    # 2. 读取合并好的数据（与脚本同目录），分块模式下每块单独处理
+    columns = ["藏品名称", "作者"] + 属性列表 + ["实体ID"]
+    available = [c for c in columns if c in table_columns(input_path)]
+    if chunksize:
+        chunks = iter_chunks(input_path, chunksize, available)
+    else:
+        chunks = [read_table(input_path, available)]
+    # 别名表：没有缓存且一次读入全部数据时按出现次数构建，分块模式下随数据逐块补充
+    aliases = None
+    if alias_path and "作者" in available:
+        names = None if chunksize else clean_names(chunks[0]["作者"])
+        aliases = load_or_build(alias_path, names)
+    # 3. 生成各表并逐块写出
+    writers, counts = {}, {}
+    seen = set()
+    try:
+        for chunk in chunks:
+            if "实体ID" in chunk.columns:
+                keep = ~chunk["实体ID"].duplicated() & ~chunk["实体ID"].isin(seen)
+                seen.update(chunk["实体ID"])
+                chunk = chunk[keep]
+            for name, table in extract_tables(chunk, aliases).items():
+                if name not in writers:
+                    path = os.path.join(out_dir, f"{name}.{fmt}")
+                    writers[name] = TableWriter(path, table.columns)
+                    counts[name] = 0
+                writers[name].write(table)
+                counts[name] += len(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    if aliases is not None:
+        aliases.save(alias_path)
+    for name, count in counts.items():
+        print(f"✔ 已生成 {name}.{fmt} （共 {count} 条）")
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="从合并后的藏品 CSV 生成三元组")
+    parser.add_argument("--input", default="merged_artifacts.csv")
+    parser.add_argument("--out-dir", default="三元组")
+    parser.add_argument("--chunksize", type=int, help="分块读取的行数，输入超出内存时使用")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="三元组文件格式")
+    parser.add_argument("--aliases", default=ALIAS_PATH, help="作者别名表缓存路径")
+    parser.add_argument("--no-aliases", action="store_true", help="不做作者规范化，保留原始作者字符串")
+    args = parser.parse_args()
+    main(args.input, args.out_dir, args.chunksize, args.format, None if args.no_aliases else args.aliases)
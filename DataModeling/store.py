@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# store.py
+# 流水线各阶段之间的中间数据存储。路径以 .parquet 结尾时使用 Parquet（字符串列字典编码），
+# 读取时内存映射文件并且只解码需要的列；其他路径仍按 utf-8-sig CSV 读写，方便人工查看。
+#
+# 把已有的 Parquet 导出为 CSV：python store.py 三元组/作者.parquet [输出.csv]
+
+import os
+import sys
+
+import pandas as pd
+
+PARQUET_SUFFIX = ".parquet"
+
+
+def is_parquet(path):
+    return str(path).endswith(PARQUET_SUFFIX)
+
+
+class TableWriter:
+    """按块追加写出一张表，所有列都按字符串存储；即使没有写入任何数据，关闭时也会生成只有表头的文件"""
+
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self._writer = None
+        self._started = False
+
+    def _schema(self):
+        import pyarrow as pa
+        return pa.schema([(col, pa.string()) for col in self.columns])
+
+    def write(self, df):
+        df = df.reindex(columns=self.columns)
+        if is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, self._schema(), use_dictionary=True)
+            self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema(), preserve_index=False))
+        else:
+            df.to_csv(self.path, index=False, header=not self._started, mode="a" if self._started else "w",
+                      encoding="utf-8" if self._started else "utf-8-sig")
+        self._started = True
+
+    def close(self):
+        if not self._started:
+            self.write(pd.DataFrame(columns=self.columns))
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def table_columns(path):
+    """只读取表头，返回列名列表"""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(path, memory_map=True).names
+    return list(pd.read_csv(path, dtype=str, encoding="utf-8-sig", nrows=0).columns)
+
+
+def read_table(path, columns=None):
+    """读取整张表（只读取 columns 中的列）"""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return pd.read_csv(path, dtype=str, encoding="utf-8-sig", usecols=columns)
+
+
+def iter_chunks(path, chunksize, columns=None):
+    """按块读取，Parquet 逐批解码，CSV 逐块解析"""
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, dtype=str, encoding="utf-8-sig", usecols=columns, chunksize=chunksize)
+
+
+def export_csv(path, csv_path=None):
+    """把 Parquet 导出为 utf-8-sig CSV，返回 CSV 路径"""
+    csv_path = csv_path or os.path.splitext(path)[0] + ".csv"
+    read_table(path).to_csv(csv_path, index=False, encoding="utf-8-sig")
+    return csv_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("用法：python store.py 文件.parquet [输出.csv]")
+    print(f"已导出：{export_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)}")
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# image_store.py
+# 图片链接检查与本地缩略图库。图片链接来自四个博物馆各自的 CDN（images.metmuseum.org、iiif.micr.io、
+# collection.sdmart.org、art.nelson-atkins.org），原先写入图谱和 MySQL 前只检查是否以 http 开头：
+#   - fetch：用 asyncio/aiohttp 批量检查链接，按 CDN 域名限制并发和每秒请求数（沿用 crawl_engine.py 的限速方式）；
+#     新链接直接 GET，校验状态码和图片格式后生成缩略图（有 Pillow 时缩放为 THUMB_SIZE 的 JPEG，否则保存原图）；
+#   - 缩略图按内容的 SHA1 存在 thumbnails/ab/<sha1>.<扩展名>，不同链接得到相同图片时只保存一份；
+#   - 检查结果保存在 SQLite 索引中，已有缩略图的链接不再下载；--recheck-days 指定天数后，超过该时间的链接
+#     用 HEAD 复查是否仍然有效，失效（404 等）的记为 dead，网络错误记为 error，下次运行重试；
+#     CDN 失效或暂时不可用时仍保留已有的本地缩略图；
+#   - apply：把本地缩略图地址（THUMB_BASE_URL + 相对路径）和检查状态写回 Neo4j 的 project 节点（thumb、image_status）
+#     和 MySQL 的 artifacts 表（缩略图、图片状态），前端直接使用本地副本，不再请求博物馆的 CDN。
+# 存储目录、索引和地址前缀可由环境变量 IMAGE_STORE_DIR、IMAGE_INDEX、THUMB_BASE_URL 修改。
+#
+# 用法：python image_store.py fetch --input ../DataModeling/deduped_artifacts.csv
+#       python image_store.py fetch --input ../Neo4j/图片链接.csv --recheck-days 30
+#       python image_store.py apply neo4j --input ../Neo4j/图片链接.csv [--uri bolt://127.0.0.1:7687]
+#       python image_store.py apply mysql [--host 127.0.0.1 --port 3306]
+#       python image_store.py stats
+#       python image_store.py serve --port 8767     （本地开发时提供 THUMB_BASE_URL 下的缩略图）
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import io
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import aiohttp
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "Spider"))
+from crawl_engine import BACKOFF, HEADERS, MAX_RETRIES, RETRY_STATUS, HostPolicy, RateLimiter
+import metrics
+
+MEDIA_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.environ.get("IMAGE_STORE_DIR", os.path.join(MEDIA_DIR, "thumbnails"))
+INDEX_PATH = os.environ.get("IMAGE_INDEX", os.path.join(MEDIA_DIR, "image_index.db"))
+THUMB_BASE_URL = os.environ.get("THUMB_BASE_URL", "/thumbnails/")
+DEFAULT_INPUT = os.path.join(ROOT, "Neo4j", "图片链接.csv")
+LINK_COLUMN = "图片链接"
+
+THUMB_SIZE = 300        # 缩略图最长边（像素），与费城 IIIF 链接中的 ^300 一致
+THUMB_QUALITY = 85
+TIMEOUT = 30
+WORKERS = 64            # 同时处理的链接数，实际并发再由各域名的上限约束
+MAX_BYTES = 20 * 1024 * 1024  # 原图大小上限，超过的记为 too_large，不下载
+
+# 图片 CDN 与详情页不是同一个域名，单独设置礼貌性上限
+DEFAULT_POLICY = HostPolicy(concurrency=4, rate=4.0)
+HOST_POLICIES = {
+    "images.metmuseum.org": HostPolicy(concurrency=8, rate=8.0),
+    "iiif.micr.io": HostPolicy(concurrency=8, rate=8.0),
+    "collection.sdmart.org": HostPolicy(concurrency=4, rate=2.0),
+    "art.nelson-atkins.org": HostPolicy(concurrency=4, rate=2.0),
+}
+
+# 纳尔逊的图片链接带有抓取时的会话 ID，请求时去掉（索引仍以原链接为键，与图谱和 MySQL 中的值对应）
+SESSION_ID = re.compile(r";jsessionid=[^?#/]*", re.IGNORECASE)
+IMAGE_SIGNATURES = {
+    b"\xff\xd8\xff": ".jpg", b"\x89PNG\r\n\x1a\n": ".png", b"GIF87a": ".gif", b"GIF89a": ".gif",
+}
+CONTENT_TYPE_EXT = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+IMAGE_CHECKS = metrics.counter("image_checks_total", "图片链接检查结果（ok / dead / not_image / too_large / error）",
+                               ["host", "result"])
+
+
+def request_url(url):
+    return SESSION_ID.sub("", url)
+
+
+async def read_body(resp, limit=MAX_BYTES):
+    """读取完整的响应体；声明的或实际的大小超过 limit 时返回 None"""
+    if resp.content_length is not None and resp.content_length > limit:
+        return None
+    chunks, size = [], 0
+    async for chunk in resp.content.iter_chunked(64 * 1024):
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def sniff_extension(content, content_type=""):
+    """按文件头判断图片格式，返回扩展名；不是图片时返回 None"""
+    for signature, ext in IMAGE_SIGNATURES.items():
+        if content.startswith(signature):
+            return ext
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return ".webp"
+    return CONTENT_TYPE_EXT.get(content_type) if content_type.startswith("image/") else None
+
+
+@functools.lru_cache(maxsize=None)
+def pillow():
+    """Pillow 是可选依赖；没有安装时保存原图"""
+    try:
+        from PIL import Image
+    except ImportError:
+        print("未安装 Pillow，缩略图将保存原图")
+        return None
+    return Image
+
+
+def make_thumbnail(content, ext):
+    """返回 (缩略图内容, 扩展名)；图片无法解码时返回 (None, None)"""
+    Image = pillow()
+    if Image is None:
+        return content, ext
+    try:
+        with Image.open(io.BytesIO(content)) as img:
+            img.thumbnail((THUMB_SIZE, THUMB_SIZE))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, "JPEG", quality=THUMB_QUALITY, optimize=True)
+    except Exception:
+        return None, None
+    return out.getvalue(), ".jpg"
+
+
+class ThumbnailStore:
+    """按内容 SHA1 寻址的缩略图目录，put() 返回相对路径，内容相同的图片只写一次"""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+
+    def put(self, content, ext):
+        digest = hashlib.sha1(content).hexdigest()
+        rel = f"{digest[:2]}/{digest}{ext}"
+        path = os.path.join(self.root, rel)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        return rel
+
+    def path(self, rel):
+        return os.path.join(self.root, rel)
+
+
+class ImageIndex:
+    """链接 -> 检查状态与缩略图路径"""
+
+    def __init__(self, path=INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS images (url TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                          "http_status INTEGER, thumb TEXT, source_sha1 TEXT, source_bytes INTEGER, "
+                          "checked_at REAL, error TEXT)")
+
+    def entries(self):
+        return {row[0]: row[1:] for row in self.conn.execute("SELECT url, status, thumb, checked_at FROM images")}
+
+    def save(self, url, status, http_status=None, thumb=None, source_sha1=None, source_bytes=None, error=None):
+        """thumb 为 None 时保留原有的缩略图"""
+        self.conn.execute(
+            "INSERT INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO UPDATE SET "
+            "status = excluded.status, http_status = excluded.http_status, "
+            "thumb = coalesce(excluded.thumb, images.thumb), "
+            "source_sha1 = coalesce(excluded.source_sha1, images.source_sha1), "
+            "source_bytes = coalesce(excluded.source_bytes, images.source_bytes), "
+            "checked_at = excluded.checked_at, error = excluded.error",
+            (url, status, http_status, thumb, source_sha1, source_bytes, time.time(), error))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def read_links(paths, column=LINK_COLUMN):
+    """从 CSV 中读取不重复的 http 图片链接（保持首次出现的顺序）"""
+    links = []
+    for path in paths:
+        df = pd.read_csv(path, encoding="utf-8-sig", usecols=[column], dtype=str)
+        links.extend(df[column].dropna().str.strip())
+    return [url for url in dict.fromkeys(links) if url.startswith("http")]
+
+
+def plan(links, entries, recheck_days=None):
+    """返回 [(链接, 方法)]：没有缩略图的链接 GET；设置 recheck_days 时，已有缩略图但超过期限的链接 HEAD 复查"""
+    now = time.time()
+    work = []
+    for url in links:
+        status, thumb, checked_at = entries.get(url, (None, None, None))
+        if thumb is None:
+            # 从未检查、网络错误的链接每次重试；失效的链接只在复查期限到了之后重试
+            if status in (None, "error") or recheck_days is not None and now - checked_at > recheck_days * 86400:
+                work.append((url, "GET"))
+        elif recheck_days is not None and now - checked_at > recheck_days * 86400:
+            work.append((url, "HEAD"))
+    return work
+
+
+class ImageChecker:
+    """使用方式：async with ImageChecker(index, store) as checker: await checker.run(work)"""
+
+    def __init__(self, index, store, policies=HOST_POLICIES, default_policy=DEFAULT_POLICY,
+                 max_retries=MAX_RETRIES, timeout=TIMEOUT, workers=WORKERS):
+        self.index = index
+        self.store = store
+        self.policies = policies
+        self.default_policy = default_policy
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.workers = workers
+        self.session = None
+        self._hosts = {}
+        self.stats = Counter()
+
+    async def __aenter__(self):
+        per_host = max([p.concurrency for p in self.policies.values()] + [self.default_policy.concurrency])
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=per_host, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector, headers=HEADERS, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _host(self, host):
+        if host not in self._hosts:
+            policy = self.policies.get(host, self.default_policy)
+            self._hosts[host] = (asyncio.Semaphore(policy.concurrency), RateLimiter(policy.rate))
+        return self._hosts[host]
+
+    async def request(self, url, method):
+        """返回 (状态码, Content-Type, 内容)；多次失败时状态码为 None，内容为错误说明；
+        GET 的响应体超过 MAX_BYTES 时内容为 None"""
+        host = urlsplit(url).netloc
+        semaphore, limiter = self._host(host)
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            async with semaphore:
+                await limiter.wait()
+                start = time.perf_counter()
+                try:
+                    async with self.session.request(method, request_url(url)) as resp:
+                        # 部分服务器不支持 HEAD，改用 GET
+                        if method == "HEAD" and resp.status in (405, 501):
+                            method = "GET"
+                            continue
+                        content = b""
+                        if method == "GET" and resp.status < 400:
+                            content = await read_body(resp)
+                        metrics.observe_request(url, time.perf_counter() - start, resp.status, len(content or b""))
+                        if resp.status not in RETRY_STATUS:
+                            return resp.status, resp.content_type, content
+                        error = f"状态码 {resp.status}"
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    metrics.observe_request(url, time.perf_counter() - start, "error")
+                    error = repr(e)
+            if attempt < self.max_retries:
+                await asyncio.sleep(BACKOFF * 2 ** (attempt - 1) * (0.5 + random.random()))
+        return None, None, error
+
+    async def check(self, url, method):
+        status, content_type, content = await self.request(url, method)
+        if status is None:
+            result = "error"
+            self.index.save(url, result, error=content)
+        elif status >= 400:
+            result = "dead"
+            self.index.save(url, result, status)
+        elif method == "HEAD":
+            result = "ok"
+            self.index.save(url, result, status)
+        elif content is None:
+            result = "too_large"
+            self.index.save(url, result, status, error=f"超过 {MAX_BYTES // 1024 // 1024} MB")
+        else:
+            ext = sniff_extension(content, content_type or "")
+            thumb = None
+            if ext is not None:
+                # 缩放在线程池中进行，不阻塞事件循环
+                thumb, ext = await asyncio.get_running_loop().run_in_executor(None, make_thumbnail, content, ext)
+            if thumb is None:
+                result = "not_image"
+                self.index.save(url, result, status, error=content_type)
+            else:
+                result = "ok"
+                self.index.save(url, result, status, self.store.put(thumb, ext),
+                                hashlib.sha1(content).hexdigest(), len(content))
+        self.stats[result] += 1
+        IMAGE_CHECKS.labels(urlsplit(url).netloc, result).inc()
+
+    async def run(self, work):
+        queue = asyncio.Queue()
+        for item in work:
+            queue.put_nowait(item)
+        done = 0
+
+        async def worker():
+            nonlocal done
+            while not queue.empty():
+                url, method = queue.get_nowait()
+                await self.check(url, method)
+                done += 1
+                if done % 500 == 0:
+                    self.index.commit()
+                    print(f"已检查 {done}/{len(work)} 个链接：{dict(self.stats)}")
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(work)) or 1)))
+        self.index.commit()
+
+
+def fetch(inputs, recheck_days=None, index_path=INDEX_PATH, store_dir=STORE_DIR, limit=None):
+    links = read_links(inputs)
+    index = ImageIndex(index_path)
+    try:
+        work = plan(links, index.entries(), recheck_days)[:limit]
+        methods = Counter(method for _, method in work)
+        print(f"共 {len(links)} 个不同的图片链接，下载 {methods['GET']} 个，复查 {methods['HEAD']} 个")
+
+        async def main():
+            async with ImageChecker(index, ThumbnailStore(store_dir)) as checker:
+                await checker.run(work)
+            return checker.stats
+
+        start = time.perf_counter()
+        stats = asyncio.run(main()) if work else Counter()
+        print(f"检查完成：{dict(stats)}，耗时 {time.perf_counter() - start:.1f} 秒")
+    finally:
+        index.close()
+    return stats
+
+
+def thumb_rows(index_path=INDEX_PATH, base_url=THUMB_BASE_URL):
+    """[(图片链接, 本地缩略图地址或 None, 状态)]；还没有运行过 fetch 时为空"""
+    if not os.path.exists(index_path):
+        print(f"未找到 {index_path}，请先运行 fetch")
+        return []
+    conn = sqlite3.connect(index_path)
+    rows = conn.execute("SELECT url, thumb, status FROM images").fetchall()
+    conn.close()
+    return [(url, base_url + thumb if thumb else None, status) for url, thumb, status in rows]
+
+
+def apply_neo4j(input_path, uri=None, index_path=INDEX_PATH, base_url=THUMB_BASE_URL):
+    """按图片链接.csv 的 (主体, 图片链接) 找到 project 节点，写入 thumb 与 image_status"""
+    sys.path.insert(0, os.path.join(ROOT, "Neo4j"))
+    from neo4j import GraphDatabase
+    from bulk_load import NEO4J_AUTH, NEO4J_URI, PROJECT_CQL, ensure_indexes, read_table, run_batches
+
+    images = {url: (thumb, status) for url, thumb, status in thumb_rows(index_path, base_url)}
+    df = read_table(input_path, ["主体", LINK_COLUMN]).dropna(subset=[LINK_COLUMN])
+    df = df[df[LINK_COLUMN].isin(images)].drop_duplicates("主体", keep="last")
+    rows = []
+    for name, url in zip(df["主体"], df[LINK_COLUMN]):
+        thumb, status = images[url]
+        props = {"image_status": status}
+        if thumb:
+            props["thumb"] = thumb
+        rows.append({"name": name, "props": props})
+    driver = GraphDatabase.driver(uri or NEO4J_URI, auth=NEO4J_AUTH)
+    try:
+        ensure_indexes(driver)
+        run_batches(driver, PROJECT_CQL, rows, desc="写入缩略图")
+    finally:
+        driver.close()
+    return len(rows)
+
+
+def apply_mysql(host, port, index_path=INDEX_PATH, base_url=THUMB_BASE_URL):
+    sys.path.insert(0, os.path.join(ROOT, "MySQL"))
+    from mysql import create_mysql_table, fill_image_columns, get_engine
+
+    engine = get_engine(host=host, port=port)
+    try:
+        create_mysql_table(engine)
+        with engine.begin() as conn:
+            updated = fill_image_columns(conn, thumb_rows(index_path, base_url))
+    finally:
+        engine.dispose()
+    print(f"已回填 {updated} 行的缩略图与图片状态")
+    return updated
+
+
+def print_stats(index_path=INDEX_PATH, store_dir=STORE_DIR):
+    conn = sqlite3.connect(index_path)
+    counts = dict(conn.execute("SELECT status, COUNT(*) FROM images GROUP BY status").fetchall())
+    thumbs, links = conn.execute("SELECT COUNT(DISTINCT thumb), COUNT(thumb) FROM images").fetchone()
+    source = conn.execute("SELECT COALESCE(SUM(source_bytes), 0) FROM images").fetchone()[0]
+    conn.close()
+    size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(store_dir) for f in files)
+    print(f"{index_path}：{counts}")
+    print(f"{links} 个链接共用 {thumbs} 个缩略图，占用 {size / 1024 / 1024:.1f} MB（原图共 {source / 1024 / 1024:.1f} MB）")
+
+
+def serve(port, store_dir=STORE_DIR):
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    prefix = "/" + THUMB_BASE_URL.strip("/")
+
+    class Handler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            path = path.split("?")[0]
+            if path.startswith(prefix + "/"):
+                path = path[len(prefix):]
+            return super().translate_path(path)
+
+    handler = functools.partial(Handler, directory=store_dir)
+    with ThreadingHTTPServer(("127.0.0.1", port), handler) as server:
+        print(f"缩略图服务：http://127.0.0.1:{port}{prefix}/")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="图片链接检查与本地缩略图库")
+    parser.add_argument("--index", default=INDEX_PATH)
+    parser.add_argument("--store", default=STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_fetch = sub.add_parser("fetch", help="检查图片链接并下载缩略图")
+    p_fetch.add_argument("--input", action="append", help=f"含“{LINK_COLUMN}”列的 CSV，可重复，默认 {DEFAULT_INPUT}")
+    p_fetch.add_argument("--recheck-days", type=float, help="复查超过该天数的链接")
+    p_fetch.add_argument("--limit", type=int, help="最多处理的链接数")
+
+    p_apply = sub.add_parser("apply", help="把缩略图地址写回数据库")
+    p_apply.add_argument("target", choices=["neo4j", "mysql"])
+    p_apply.add_argument("--input", default=DEFAULT_INPUT, help="neo4j：图片链接三元组文件")
+    p_apply.add_argument("--uri", help="neo4j：默认与 bulk_load.py 相同")
+    p_apply.add_argument("--host")
+    p_apply.add_argument("--port", type=int)
+
+    sub.add_parser("stats", help="查看检查结果与存储占用")
+    p_serve = sub.add_parser("serve", help="本地提供缩略图")
+    p_serve.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    metrics.start_from_env()
+    if args.command == "fetch":
+        fetch(args.input or [DEFAULT_INPUT], args.recheck_days, args.index, args.store, args.limit)
+    elif args.command == "apply" and args.target == "neo4j":
+        apply_neo4j(args.input, args.uri, args.index)
+    elif args.command == "apply":
+        sys.path.insert(0, os.path.join(ROOT, "MySQL"))
+        from mysql import DB_CONFIG
+        apply_mysql(args.host or DB_CONFIG["host"], args.port or DB_CONFIG["port"], args.index)
+    elif args.command == "stats":
+        print_stats(args.index, args.store)
+    else:
+        serve(args.port, args.store)
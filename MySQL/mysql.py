@@ -1,6 +1,12 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
 import pandas as pd
 from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
 
 # 数据库配置（根据实际情况修改）
 DB_CONFIG = {
@@ -12,8 +18,24 @@ DB_CONFIG = {
     "charset": "utf8mb4"
 }
 
+BATCH_SIZE = 5000
+# 服务器或客户端禁用了 LOAD DATA LOCAL INFILE 时的错误码，只有这些情况 --mode auto 才回退到 executemany
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+# MySQL/query.py 按藏品来源、年代过滤时使用的 (过滤列, id) 二级索引；
+# 年代是 VARCHAR(1024)，超出 InnoDB 索引长度限制，因此为它建一个定长的 MD5 生成列再建索引
+READ_INDEXES = {
+    "idx_source_id": "ADD INDEX idx_source_id (藏品来源, id)",
+    "idx_date_hash_id": "ADD INDEX idx_date_hash_id (年代哈希, id)",
+}
+DATAMODELING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'DataModeling')
+
+# 仓库根目录的运行指标：每批的行数、耗时和失败次数
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
 def create_mysql_table(engine):
-    """创建藏品信息表（id主键）"""
+    """创建藏品信息表（id主键，链接哈希唯一键用于去重，起始年/结束年由年代解析得到，
+    缩略图/图片状态由 Media/image_store.py 检查图片链接后回填，年代哈希与两个二级索引供 query.py 过滤）"""
     create_table_sql = """
     CREATE TABLE IF NOT EXISTS artifacts (
         id INT AUTO_INCREMENT PRIMARY KEY,
@@ -22,7 +44,18 @@ def create_mysql_table(engine):
         年代 VARCHAR(1024),
         介绍 TEXT,
         图片链接 VARCHAR(512),
-        详情链接 VARCHAR(512)
+        详情链接 VARCHAR(512),
+        链接哈希 CHAR(40) AS (SHA1(详情链接)) STORED,
+        起始年 INT,
+        结束年 INT,
+        朝代 VARCHAR(64),
+        缩略图 VARCHAR(255),
+        图片状态 VARCHAR(16),
+        年代哈希 BINARY(16) AS (UNHEX(MD5(年代))) STORED,
+        UNIQUE KEY uk_link_hash (链接哈希),
+        KEY idx_year (起始年, 结束年),
+        KEY idx_source_id (藏品来源, id),
+        KEY idx_date_hash_id (年代哈希, id)
     ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
     """
     try:
@@ -30,51 +63,322 @@ def create_mysql_table(engine):
             conn.execute(text(create_table_sql))
             conn.commit()
         print("数据表创建成功")
+        ensure_upsert_key(engine)
+        ensure_year_columns(engine)
+        ensure_image_columns(engine)
+        ensure_read_indexes(engine)
     except SQLAlchemyError as e:
         print(f"建表失败: {str(e)}")
 
-def import_csv_to_mysql(csv_file):
-    """执行CSV导入操作"""
-    engine = create_engine(
-        f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}"
-        f"@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        f"?charset={DB_CONFIG['charset']}"
+def ensure_upsert_key(engine):
+    """旧表没有唯一键时：按详情链接去重（保留id最大的一行），再补上链接哈希列和唯一键。
+
+    没有详情链接的行无法判断是否重复，统一置为 NULL（唯一键中的 NULL 互不冲突），不参与去重。
+    """
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'artifacts' AND COLUMN_NAME = '链接哈希'"
+        )).scalar()
+        if exists:
+            return
+        conn.execute(text("UPDATE artifacts SET 详情链接 = NULL WHERE TRIM(详情链接) = ''"))
+        removed = conn.execute(text(
+            "DELETE a FROM artifacts a JOIN artifacts b "
+            "ON a.详情链接 = b.详情链接 AND a.id < b.id "
+            "WHERE a.详情链接 IS NOT NULL"
+        )).rowcount
+        conn.execute(text(
+            "ALTER TABLE artifacts "
+            "ADD COLUMN 链接哈希 CHAR(40) AS (SHA1(详情链接)) STORED, "
+            "ADD UNIQUE KEY uk_link_hash (链接哈希)"
+        ))
+    print(f"已为旧表添加唯一键，删除重复记录 {removed} 条")
+
+def ensure_year_columns(engine):
+    """旧表没有年份列时补上 起始年/结束年/朝代 和年份范围索引"""
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'artifacts' AND COLUMN_NAME = '起始年'"
+        )).scalar()
+        if exists:
+            return
+        conn.execute(text(
+            "ALTER TABLE artifacts "
+            "ADD COLUMN 起始年 INT, ADD COLUMN 结束年 INT, ADD COLUMN 朝代 VARCHAR(64), "
+            "ADD INDEX idx_year (起始年, 结束年)"
+        ))
+    print("已为旧表添加年份列")
+
+def ensure_image_columns(engine):
+    """旧表没有缩略图列时补上 缩略图/图片状态"""
+    with engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'artifacts' AND COLUMN_NAME = '缩略图'"
+        )).scalar()
+        if exists:
+            return
+        conn.execute(text("ALTER TABLE artifacts ADD COLUMN 缩略图 VARCHAR(255), ADD COLUMN 图片状态 VARCHAR(16)"))
+    print("已为旧表添加缩略图列")
+
+def ensure_read_indexes(engine):
+    """旧表没有查询用的生成列或二级索引时补上 年代哈希 和 READ_INDEXES"""
+    with engine.begin() as conn:
+        has_hash = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'artifacts' AND COLUMN_NAME = '年代哈希'"
+        )).scalar()
+        if not has_hash:
+            conn.execute(text(
+                "ALTER TABLE artifacts ADD COLUMN 年代哈希 BINARY(16) AS (UNHEX(MD5(年代))) STORED"
+            ))
+        existing = {row[0] for row in conn.execute(text(
+            "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'artifacts'"
+        ))}
+        missing = [name for name in READ_INDEXES if name not in existing]
+        if missing:
+            conn.execute(text(f"ALTER TABLE artifacts {', '.join(READ_INDEXES[name] for name in missing)}"))
+    if not has_hash or missing:
+        print(f"已为旧表添加查询索引: {missing}")
+
+def fill_year_columns(conn, batch_size=BATCH_SIZE):
+    """用 DataModeling/dating.py 解析表中所有不同的年代取值，写入临时表后一次 UPDATE ... JOIN 回填年份列。
+
+    每次导入后对整表执行，年代被修改或清空的行也会得到正确的结果；返回解析出年份的取值数。
+    """
+    sys.path.insert(0, DATAMODELING_DIR)
+    from dating import parse_dates
+
+    # 按字节取不同值，避免不区分大小写的排序规则把 Undated 和 undated 合并
+    dates = pd.Series([row[0].decode('utf-8') for row in conn.exec_driver_sql(
+        "SELECT DISTINCT CAST(年代 AS BINARY) FROM artifacts WHERE 年代 IS NOT NULL"
+    )], dtype=object)
+    parsed = parse_dates(dates)
+    parsed = parsed.astype(object).where(parsed.notna(), None)
+    rows = [(d, d, s, e, y) for d, s, e, y in zip(dates, parsed['year_start'], parsed['year_end'], parsed['dynasty'])]
+
+    conn.exec_driver_sql(
+        "CREATE TEMPORARY TABLE artifacts_dates ("
+        "年代哈希 BINARY(16) PRIMARY KEY, 年代 VARCHAR(1024), 起始年 INT, 结束年 INT, 朝代 VARCHAR(64)"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
     )
     try:
-        create_mysql_table(engine)
+        for start in range(0, len(rows), batch_size):
+            conn.exec_driver_sql(
+                "INSERT INTO artifacts_dates VALUES (UNHEX(MD5(%s)), %s, %s, %s, %s)",
+                rows[start:start + batch_size]
+            )
+        conn.exec_driver_sql(
+            "UPDATE artifacts a LEFT JOIN artifacts_dates d ON d.年代哈希 = UNHEX(MD5(a.年代)) "
+            "SET a.起始年 = d.起始年, a.结束年 = d.结束年, a.朝代 = d.朝代"
+        )
+    finally:
+        conn.exec_driver_sql("DROP TEMPORARY TABLE IF EXISTS artifacts_dates")
+    return int(parsed['year_start'].notna().sum())
+
+def fill_image_columns(conn, rows, batch_size=BATCH_SIZE):
+    """rows 为 (图片链接, 本地缩略图地址, 状态) 列表；写入临时表后一次 UPDATE ... JOIN 回填，返回更新的行数。
+
+    不在 rows 中的图片链接保持原值，因此可以只回填新检查过的部分。
+    """
+    conn.exec_driver_sql(
+        "CREATE TEMPORARY TABLE artifacts_images ("
+        "链接哈希 BINARY(16) PRIMARY KEY, 缩略图 VARCHAR(255), 图片状态 VARCHAR(16)"
+        ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+    )
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            conn.exec_driver_sql(
+                "INSERT IGNORE INTO artifacts_images VALUES (UNHEX(MD5(%s)), %s, %s)", batch
+            )
+        t0 = time.perf_counter()
+        try:
+            updated = conn.exec_driver_sql(
+                "UPDATE artifacts a JOIN artifacts_images i ON i.链接哈希 = UNHEX(MD5(a.图片链接)) "
+                "SET a.缩略图 = i.缩略图, a.图片状态 = i.图片状态"
+            ).rowcount
+        except Exception:
+            metrics.observe_error('mysql', 'images')
+            raise
+        metrics.observe_batch('mysql', 'images', len(rows), time.perf_counter() - t0)
+    finally:
+        conn.exec_driver_sql("DROP TEMPORARY TABLE IF EXISTS artifacts_images")
+    return updated
+
+COLUMNS = ['藏品名称', '藏品来源', '年代', '介绍', '图片链接', '详情链接']
+
+UPSERT_SQL = (
+    f"INSERT INTO artifacts ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))}) "
+    f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in COLUMNS)}"
+)
+
+def database_url(**overrides):
+    """根据 DB_CONFIG 生成连接串，可传入 host/port 等覆盖配置（如连接本地测试库）"""
+    config = {**DB_CONFIG, **overrides}
+    return (
+        f"mysql+pymysql://{config['user']}:{config['password']}"
+        f"@{config['host']}:{config['port']}/{config['database']}"
+        f"?charset={config['charset']}"
+    )
+
+def get_engine(**overrides):
+    """创建用于导入的数据库引擎"""
+    return create_engine(database_url(**overrides), connect_args={"local_infile": True})
+
+def read_artifacts_csv(csv_file):
+    """读取合并后的CSV（或 combine.py 输出的 .parquet，只读取需要的列）并做数据清洗"""
+    if csv_file.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        df = pq.read_table(csv_file, columns=COLUMNS, memory_map=True).to_pandas().fillna('')
+    else:
         df = pd.read_csv(
             csv_file,
             encoding='utf-8-sig',
-            usecols=['藏品名称', '藏品来源', '年代', '介绍', '图片链接', '详情链接'],
+            usecols=COLUMNS,
             dtype={'年代': str},
             na_filter=False
         )
-        # 数据清洗
-        df = df.where(pd.notnull(df), None)
-        df['图片链接'] = df['图片链接'].apply(
-            lambda x: x if isinstance(x, str) and x.startswith('http') else None
-        )
-        # 批量导入数据（允许重复）
-        df.to_sql(
-            name='artifacts',
-            con=engine,
-            if_exists='append',
-            index=False,
-            method='multi',
-            chunksize=1000
+    df = df.where(pd.notnull(df), None)
+    df['图片链接'] = df['图片链接'].apply(
+        lambda x: x if isinstance(x, str) and x.startswith('http') else None
+    )
+    # 空的详情链接写为 NULL：SHA1('') 对所有行相同，会让没有链接的藏品互相覆盖
+    links = df['详情链接'].astype(object).str.strip()
+    df['详情链接'] = links.where(links.fillna('') != '', None)
+    return df
+
+def upsert_rows(conn, rows, batch_size=BATCH_SIZE):
+    """按链接哈希唯一键插入或更新，rows 为按 COLUMNS 顺序排列的元组列表"""
+    affected = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        t0 = time.perf_counter()
+        try:
+            # pymysql 会把 executemany 改写为多行 VALUES 的单条语句
+            affected += conn.exec_driver_sql(UPSERT_SQL, batch).rowcount
+        except Exception:
+            metrics.observe_error('mysql', 'upsert')
+            raise
+        metrics.observe_batch('mysql', 'upsert', len(batch), time.perf_counter() - t0)
+    return affected
+
+def import_with_executemany(engine, csv_file, batch_size=BATCH_SIZE):
+    """在客户端读取CSV，以 executemany 批量 upsert，返回处理的行数"""
+    df = read_artifacts_csv(csv_file)
+    rows = list(df[COLUMNS].itertuples(index=False, name=None))
+    with engine.begin() as conn:
+        upsert_rows(conn, rows, batch_size)
+    return len(rows)
+
+def import_with_load_data(engine, csv_file):
+    """用 LOAD DATA LOCAL INFILE 把CSV直接流式传给服务器，写入临时表后再整体 upsert，返回处理的行数"""
+    with open(csv_file, 'rb') as f:
+        first_line = f.readline()
+    line_end = '\\r\\n' if first_line.endswith(b'\r\n') else '\\n'
+    with open(csv_file, encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f))
+    missing = [c for c in COLUMNS if c not in header]
+    if missing:
+        raise ValueError(f"CSV缺少列: {missing}")
+
+    # CSV中的每一列先读入用户变量，只把需要的列写入临时表；图片链接、详情链接的清洗与 read_artifacts_csv 一致
+    variables = ', '.join(f'@c{i}' for i in range(len(header)))
+    assignments = [f"{c} = @c{header.index(c)}" for c in COLUMNS if c not in ('图片链接', '详情链接')]
+    image = f"@c{header.index('图片链接')}"
+    assignments.append(f"图片链接 = IF(LEFT({image}, 4) = 'http', {image}, NULL)")
+    assignments.append(f"详情链接 = NULLIF(TRIM(@c{header.index('详情链接')}), '')")
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TEMPORARY TABLE artifacts_staging ("
+            "藏品名称 VARCHAR(255), 藏品来源 VARCHAR(255), 年代 VARCHAR(1024), "
+            "介绍 TEXT, 图片链接 VARCHAR(512), 详情链接 VARCHAR(512)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
         )
-        print(f"成功导入 {len(df)} 条记录")
+        t0 = time.perf_counter()
+        try:
+            loaded = conn.exec_driver_sql(
+                "LOAD DATA LOCAL INFILE %s INTO TABLE artifacts_staging CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '{line_end}' IGNORE 1 LINES "
+                f"({variables}) SET {', '.join(assignments)}",
+                (csv_file,)
+            ).rowcount
+            conn.exec_driver_sql(
+                f"INSERT INTO artifacts ({', '.join(COLUMNS)}) "
+                f"SELECT {', '.join(COLUMNS)} FROM artifacts_staging "
+                f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in COLUMNS)}"
+            )
+            # LOAD DATA 整个文件是一批
+            metrics.observe_batch('mysql', 'load_data', loaded, time.perf_counter() - t0)
+        except Exception:
+            metrics.observe_error('mysql', 'load_data')
+            raise
+        finally:
+            conn.exec_driver_sql("DROP TEMPORARY TABLE IF EXISTS artifacts_staging")
+    return loaded
+
+def import_csv_to_mysql(csv_file, mode='auto', engine=None, batch_size=BATCH_SIZE):
+    """执行CSV导入操作，按详情链接去重（重复导入只会更新已有记录）。
+
+    mode: 'load' 使用 LOAD DATA LOCAL INFILE；'executemany' 使用客户端批量 upsert；
+    'auto' 优先 LOAD DATA，服务器禁用 local_infile 时自动回退到 executemany。
+    成功时返回导入的行数，失败时打印原因并返回 None。
+    """
+    own_engine = engine is None
+    engine = engine or get_engine()
+    try:
+        create_mysql_table(engine)
+        start = time.perf_counter()
+        if csv_file.endswith('.parquet') and mode == 'auto':
+            # LOAD DATA 只能读取文本文件，Parquet 输入直接走 executemany
+            mode = 'executemany'
+        if mode in ('auto', 'load'):
+            try:
+                count = import_with_load_data(engine, csv_file)
+                used = 'LOAD DATA'
+            except OperationalError as e:
+                # 连接失败、SQL 错误等其他问题直接抛出，不用 executemany 掩盖
+                if mode == 'load' or e.orig.args[0] not in LOCAL_INFILE_ERRORS:
+                    raise
+                print(f"LOAD DATA 不可用，改用 executemany: {e.orig}")
+                count = import_with_executemany(engine, csv_file, batch_size)
+                used = 'executemany'
+        else:
+            count = import_with_executemany(engine, csv_file, batch_size)
+            used = 'executemany'
+        elapsed = time.perf_counter() - start
+        print(f"成功导入 {count} 条记录（{used}），耗时 {elapsed:.2f} 秒，{count / max(elapsed, 1e-9):.0f} 行/秒")
+        with engine.begin() as conn:
+            print(f"已回填年份列：{fill_year_columns(conn, batch_size)} 种年代写法解析出年份")
         # 验证数据
         with engine.connect() as conn:
             result = conn.execute(text("SELECT COUNT(*) FROM artifacts")).scalar()
             print(f"当前数据库总记录数: {result}")
+        return count
 
     except SQLAlchemyError as e:
         print(f"数据库操作失败: {str(e)}")
     except Exception as e:
         print(f"发生错误: {str(e)}")
     finally:
-        engine.dispose()
+        if own_engine:
+            engine.dispose()
 
 if __name__ == "__main__":
-    import_csv_to_mysql('combined.csv')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="导入合并后的藏品CSV到MySQL")
+    parser.add_argument('csv_file', nargs='?', default='combined.csv')
+    parser.add_argument('--mode', choices=['auto', 'load', 'executemany'], default='auto')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--host', default=DB_CONFIG['host'], help="例如 127.0.0.1 连接本地 MySQL/MariaDB 测试")
+    parser.add_argument('--port', type=int, default=DB_CONFIG['port'])
+    args = parser.parse_args()
+    metrics.start_from_env()
+    count = import_csv_to_mysql(args.csv_file, args.mode,
+                                get_engine(host=args.host, port=args.port), args.batch_size)
+    # 失败时以非零状态退出，便于 pipeline.py 等调用方判断
+    sys.exit(0 if count is not None else 1)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# query.py
+# artifacts 表的只读查询接口：
+#   - 带连接池的引擎，供多个调用方复用连接；
+#   - 按 id 的键集分页（WHERE id > 上一页最后的 id），翻到多深都不会像 OFFSET 那样越来越慢；
+#   - 藏品来源、年代过滤由 (过滤列, id) 二级索引覆盖，先在索引上取出本页的 id，再回表取整行；
+#     生成列 年代哈希 和这两个索引由 mysql.py 建表时创建（旧表由 ensure_read_indexes 补齐）；
+#   - 按年份范围过滤时使用 mysql.py 回填的 起始年/结束年（idx_year 索引），查询与时间段重叠的藏品；
+#   - 流式迭代使用服务端游标，导出大量数据时不会把整个结果集缓存在内存中。
+
+import argparse
+import csv
+
+from sqlalchemy import create_engine, text
+
+from mysql import COLUMNS, database_url, ensure_read_indexes
+
+POOL_SIZE = 5
+MAX_OVERFLOW = 10
+POOL_RECYCLE = 3600  # 秒，早于服务器 wait_timeout 回收空闲连接
+PAGE_SIZE = 100
+STREAM_BUFFER = 1000
+
+SELECT_FIELDS = ["id"] + COLUMNS + ["起始年", "结束年", "朝代"]
+
+
+def get_read_engine(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, **overrides):
+    """创建带连接池的只读引擎"""
+    return create_engine(
+        database_url(**overrides),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def _filters(source=None, date=None, years=None):
+    conditions, params = [], {}
+    if source is not None:
+        conditions.append("藏品来源 = :source")
+        params["source"] = source
+    if date is not None:
+        conditions.append("年代哈希 = UNHEX(MD5(:date))")
+        params["date"] = date
+    if years is not None:
+        # 与 [year_from, year_to] 重叠：起始年不晚于区间终点，结束年不早于区间起点
+        conditions.append("起始年 <= :year_to AND 结束年 >= :year_from")
+        params["year_from"], params["year_to"] = years
+    return conditions, params
+
+
+def fetch_page(engine, after_id=0, limit=PAGE_SIZE, source=None, date=None, years=None):
+    """取 id > after_id 的一页，返回 (行列表, 下一页的 after_id)；没有更多数据时下一页为 None"""
+    conditions, params = _filters(source, date, years)
+    conditions.insert(0, "id > :after_id")
+    params.update(after_id=after_id, limit=limit)
+    # 子查询只访问二级索引（其中已包含主键 id），外层按主键回表；
+    # 年代按哈希过滤后再比较一次原值，排除哈希碰撞
+    recheck = "WHERE a.年代 = :date" if date is not None else ""
+    sql = text(
+        f"SELECT {', '.join('a.' + c for c in SELECT_FIELDS)} FROM artifacts a "
+        f"JOIN (SELECT id FROM artifacts WHERE {' AND '.join(conditions)} ORDER BY id LIMIT :limit) k "
+        f"ON a.id = k.id {recheck} ORDER BY a.id"
+    )
+    with engine.connect() as conn:
+        rows = [dict(row._mapping) for row in conn.execute(sql, params)]
+    next_id = rows[-1]["id"] if len(rows) == limit else None
+    return rows, next_id
+
+
+def iter_pages(engine, limit=PAGE_SIZE, source=None, date=None, after_id=0, years=None):
+    """逐页遍历，每页是一次独立的短查询"""
+    while after_id is not None:
+        rows, after_id = fetch_page(engine, after_id, limit, source, date, years)
+        if rows:
+            yield rows
+
+
+def stream_artifacts(engine, source=None, date=None, buffer_rows=STREAM_BUFFER, years=None):
+    """通过服务端游标逐行返回查询结果，内存占用只与 buffer_rows 有关"""
+    conditions, params = _filters(source, date, years)
+    if date is not None:
+        conditions.append("年代 = :date")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = text(f"SELECT {', '.join(SELECT_FIELDS)} FROM artifacts {where} ORDER BY id")
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=buffer_rows).execute(sql, params)
+        for row in result:
+            yield dict(row._mapping)
+
+
+def export_csv(engine, path, source=None, date=None, years=None):
+    """流式导出为 CSV，返回导出的行数"""
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SELECT_FIELDS)
+        writer.writeheader()
+        for row in stream_artifacts(engine, source, date, years=years):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式导出 artifacts 表")
+    parser.add_argument("output", help="导出的 CSV 路径")
+    parser.add_argument("--source", help="按藏品来源过滤")
+    parser.add_argument("--date", help="按年代过滤")
+    parser.add_argument("--years", nargs=2, type=int, metavar=("FROM", "TO"), help="按年份范围过滤（与该时间段重叠）")
+    parser.add_argument("--host", help="覆盖 DB_CONFIG 中的 host")
+    args = parser.parse_args()
+
+    engine = get_read_engine(**({"host": args.host} if args.host else {}))
+    try:
+        ensure_read_indexes(engine)
+        print(f"已导出 {export_csv(engine, args.output, args.source, args.date, args.years)} 条记录到 {args.output}")
+    finally:
+        engine.dispose()
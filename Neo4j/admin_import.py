@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# admin_import.py
+# 首次建图时使用的离线导入文件生成器：把 DataModeling/model.py 生成的三元组与属性 CSV
+# 转换成 neo4j-admin database import 所需的节点文件和关系文件，代替逐条 MERGE。
+# 生成后执行脚本末尾打印的 neo4j-admin 命令即可（需先停止数据库，目标库须为空）。
+
+import argparse
+import os
+
+import pandas as pd
+
+from bulk_load import AUTHOR_CSV, PROPERTY_FILES, project_frame, read_table, table_exists
+
+# 离线导入额外带上详情链接，在线脚本不会写入该属性
+IMPORT_PROPERTY_FILES = {**PROPERTY_FILES, "详情链接.csv": ("详情链接", "url")}
+
+NODE_FILES = {"project": "project.csv", "people": "people.csv"}
+REL_FILE = "writer.csv"
+
+
+def assign_ids(names):
+    """按名称排序后编号，同样的输入无论行序如何都得到同样的整数 ID"""
+    names = sorted(set(names))
+    return pd.DataFrame({"id": range(len(names)), "name": names})
+
+
+def build_import_frames(input_dir="."):
+    """返回 (project 节点, people 节点, writer 关系) 三个 DataFrame"""
+    authors = read_table(os.path.join(input_dir, AUTHOR_CSV), ["主体", "对象"]).dropna(subset=["对象"])
+    props = project_frame(input_dir, IMPORT_PROPERTY_FILES)
+
+    # 作者关系中出现的主体同样会被 MERGE 成 project 节点
+    projects = assign_ids(pd.concat([authors["主体"], props["主体"]]))
+    projects = projects.merge(props.rename(columns={"主体": "name"}), on="name", how="left")
+    people = assign_ids(authors["对象"])
+
+    project_id = pd.Series(projects["id"].values, index=projects["name"])
+    people_id = pd.Series(people["id"].values, index=people["name"])
+    writers = pd.DataFrame({
+        "start": authors["主体"].map(project_id).values,
+        "end": authors["对象"].map(people_id).values,
+    }).drop_duplicates().sort_values(["start", "end"], ignore_index=True)
+    return projects, people, writers
+
+
+def write_import_files(out_dir="import", input_dir="."):
+    """写出带 :ID / :START_ID / :END_ID 表头的导入文件，返回生成的三个 DataFrame"""
+    os.makedirs(out_dir, exist_ok=True)
+    projects, people, writers = build_import_frames(input_dir)
+
+    # 年份按整数导入，范围查询才能使用索引
+    projects = projects.rename(columns={"id": ":ID(project)", "year_start": "year_start:int",
+                                        "year_end": "year_end:int"})
+    people = people.rename(columns={"id": ":ID(people)"})
+    writers = writers.rename(columns={"start": ":START_ID(project)", "end": ":END_ID(people)"})
+
+    # neo4j-admin 默认把空字段视为不存在的属性；输出不带 BOM，以免污染表头
+    projects.to_csv(os.path.join(out_dir, NODE_FILES["project"]), index=False, encoding="utf-8")
+    people.to_csv(os.path.join(out_dir, NODE_FILES["people"]), index=False, encoding="utf-8")
+    writers.to_csv(os.path.join(out_dir, REL_FILE), index=False, encoding="utf-8")
+    print(f"✔ project 节点 {len(projects)} 个，people 节点 {len(people)} 个，writer 关系 {len(writers)} 条")
+    return projects, people, writers
+
+
+def import_command(out_dir="import", database="neo4j"):
+    return (
+        "neo4j-admin database import full --id-type=integer --multiline-fields=true "
+        f"--nodes=project={os.path.join(out_dir, NODE_FILES['project'])} "
+        f"--nodes=people={os.path.join(out_dir, NODE_FILES['people'])} "
+        f"--relationships=writer={os.path.join(out_dir, REL_FILE)} "
+        f"{database}"
+    )
+
+
+def expected_graph(input_dir="."):
+    """按 p_p.py / import_data.py / set_link.py / set_time.py 的逐行语义回放，得到它们最终建出的图"""
+    projects, people, writers = {}, set(), set()
+    df = read_table(os.path.join(input_dir, AUTHOR_CSV), ["主体", "对象"])
+    for pname, wname in zip(df["主体"], df["对象"]):
+        if pd.isna(wname):
+            continue
+        projects.setdefault(pname, {})
+        people.add(wname)
+        writers.add((pname, wname))
+    for filename, (col, key) in PROPERTY_FILES.items():
+        path = os.path.join(input_dir, filename)
+        if not table_exists(path):
+            continue
+        df = read_table(path, ["主体", col])
+        for name, value in zip(df["主体"], df[col]):
+            node = projects.setdefault(name, {})
+            if not pd.isna(value):
+                node[key] = value
+    return projects, people, writers
+
+
+def verify_import_files(out_dir="import", input_dir="."):
+    """读回生成的文件，与在线脚本应得到的图逐项比较，返回差异说明列表（为空即一致）"""
+    projects = pd.read_csv(os.path.join(out_dir, NODE_FILES["project"]), encoding="utf-8",
+                           dtype=str, keep_default_na=False)
+    people = pd.read_csv(os.path.join(out_dir, NODE_FILES["people"]), encoding="utf-8",
+                         dtype=str, keep_default_na=False)
+    writers = pd.read_csv(os.path.join(out_dir, REL_FILE), encoding="utf-8", dtype=str)
+
+    exp_projects, exp_people, exp_writers = expected_graph(input_dir)
+    problems = []
+
+    for label, frame, id_col in (("project", projects, ":ID(project)"), ("people", people, ":ID(people)")):
+        if frame[id_col].duplicated().any() or frame["name"].duplicated().any():
+            problems.append(f"{label} 节点存在重复的 ID 或名称")
+
+    if set(projects["name"]) != set(exp_projects):
+        problems.append(f"project 节点集合不一致：生成 {len(projects)} 个，应为 {len(exp_projects)} 个")
+    else:
+        keys = [key for _, key in PROPERTY_FILES.values() if key in projects.columns]
+        for record in projects[["name"] + keys].itertuples(index=False):
+            got = {k: v for k, v in zip(keys, record[1:]) if v != ""}
+            want = {k: str(v) for k, v in exp_projects[record[0]].items()}
+            if got != want:
+                problems.append(f"project {record[0]} 属性不一致：{got} != {want}")
+
+    if set(people["name"]) != exp_people:
+        problems.append(f"people 节点集合不一致：生成 {len(people)} 个，应为 {len(exp_people)} 个")
+
+    project_names = dict(zip(projects[":ID(project)"], projects["name"]))
+    people_names = dict(zip(people[":ID(people)"], people["name"]))
+    got_writers = set(zip(writers[":START_ID(project)"].map(project_names),
+                          writers[":END_ID(people)"].map(people_names)))
+    if len(got_writers) != len(writers) or got_writers != exp_writers:
+        problems.append(f"writer 关系不一致：生成 {len(writers)} 条，应为 {len(exp_writers)} 条")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成 neo4j-admin 离线导入文件")
+    parser.add_argument("--input-dir", default=".", help="三元组 CSV 所在目录")
+    parser.add_argument("--out-dir", default="import", help="导入文件输出目录")
+    parser.add_argument("--database", default="neo4j")
+    parser.add_argument("--no-verify", action="store_true", help="跳过与在线脚本结果的核对")
+    args = parser.parse_args()
+
+    write_import_files(args.out_dir, args.input_dir)
+    if not args.no_verify:
+        problems = verify_import_files(args.out_dir, args.input_dir)
+        if problems:
+            for line in problems[:20]:
+                print(f"✘ {line}")
+            raise SystemExit(f"核对失败，共 {len(problems)} 处差异")
+        print("✔ 与在线导入脚本的结果一致")
+    print("执行以下命令完成导入：")
+    print(import_command(args.out_dir, args.database))
+
+
+if __name__ == "__main__":
+    main()
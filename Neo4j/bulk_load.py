@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# bulk_load.py
+# 批量导入脚本：取代 import_data.py / p_p.py / set_link.py / set_time.py 中逐行 session.run 的做法。
+# 每批数据通过 UNWIND $rows 一次发送，并在显式写事务中执行；
+# 介绍、图片链接、年代三个属性先按主体合并，再对每个 project 节点一次性写入。
+# 如果 CSV 旁边有同名的 .parquet（model.py --format parquet 生成）且不比 CSV 旧，优先内存映射读取其中需要的列；
+# CSV 更新（重新以 CSV 格式运行 model.py 或手工修改）时读取 CSV，不会导入过期的 Parquet。
+# 加 --aliases author_aliases.json 时按 DataModeling/alias.py 的别名表批量规范化作者：
+# 变体合并到同一个 people 节点并写入人物ID（pid），文化标签写为 project 的 culture 属性。
+# 年代同时由 DataModeling/dating.py 解析为 year_start / year_end 整数和 dynasty，两个年份建有范围索引，
+# 可以用 WHERE p.year_start <= 1700 AND p.year_end >= 1600 查询某段时间的藏品。
+
+import argparse
+import os
+import sys
+import time
+from functools import reduce
+
+import pandas as pd
+from neo4j import GraphDatabase
+from tqdm import tqdm
+
+# 仓库根目录的运行指标：每批的行数、耗时和失败次数
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+NEO4J_URI = "bolt://39.105.26.212:7687"
+NEO4J_AUTH = ("neo4j", "neo4jgraph")
+BATCH_SIZE = 1000
+DATAMODELING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DataModeling")
+
+AUTHOR_CSV = "作者.csv"
+# 属性文件 -> (CSV 列名, project 节点上的属性名)，与原有脚本保持一致
+PROPERTY_FILES = {
+    "介绍.csv": ("介绍", "description"),
+    "图片链接.csv": ("图片链接", "link"),
+    "年代.csv": ("年代", "time"),
+    "文化.csv": ("文化", "culture"),
+}
+
+INDEX_CQL = [
+    "CREATE INDEX project_name IF NOT EXISTS FOR (n:project) ON (n.name)",
+    "CREATE INDEX people_name IF NOT EXISTS FOR (n:people) ON (n.name)",
+    "CREATE RANGE INDEX project_year_start IF NOT EXISTS FOR (n:project) ON (n.year_start)",
+    "CREATE RANGE INDEX project_year_end IF NOT EXISTS FOR (n:project) ON (n.year_end)",
+]
+
+WRITER_CQL = '''
+    UNWIND $rows AS row
+    MERGE (source:project {name: row.pname})
+    MERGE (target:people  {name: row.wname})
+    SET target.pid = coalesce(row.pid, target.pid)
+    MERGE (source)-[:writer]->(target)
+    '''
+
+PROJECT_CQL = '''
+    UNWIND $rows AS row
+    MERGE (e:project {name: row.name})
+    SET e += row.props
+    '''
+
+
+def parquet_path(path):
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def table_exists(path):
+    return os.path.exists(path) or os.path.exists(parquet_path(path))
+
+
+def fresh_parquet(path):
+    """同名 .parquet 存在且修改时间不早于 CSV 时返回其路径，否则返回 None"""
+    parquet = parquet_path(path)
+    if not os.path.exists(parquet):
+        return None
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(parquet):
+        print(f"{path} 比 {parquet} 新，读取 CSV")
+        return None
+    return parquet
+
+
+def read_table(path, columns):
+    """只读取需要的列，并去掉主体为空的行"""
+    parquet = fresh_parquet(path)
+    if parquet is not None:
+        import pyarrow.parquet as pq
+        df = pq.read_table(parquet, columns=columns, memory_map=True).to_pandas()
+    else:
+        df = pd.read_csv(path, encoding="utf-8-sig", usecols=columns)
+    return df.dropna(subset=[columns[0]])
+
+
+def load_aliases(path):
+    """读取 alias.py 生成的作者别名表缓存"""
+    sys.path.insert(0, DATAMODELING_DIR)
+    from alias import AliasTable
+    return AliasTable.load(path)
+
+
+def writer_rows(path=AUTHOR_CSV, aliases=None):
+    """作者.csv -> [{pname, wname}]，重复的三元组只保留一条。
+
+    给定别名表时对象换成规范人物名并附带 pid，文化标签和未知作者不生成关系。
+    """
+    df = read_table(path, ["主体", "对象"]).dropna(subset=["对象"])
+    if aliases is None:
+        df = df.drop_duplicates()
+        return [{"pname": p, "wname": w} for p, w in zip(df["主体"], df["对象"])]
+    kinds, names = aliases.apply(df["对象"])
+    df = df.assign(对象=names, pid=aliases.person_ids(df["对象"]))[kinds == "person"].drop_duplicates()
+    return [{"pname": p, "wname": w, "pid": i} for p, w, i in zip(df["主体"], df["对象"], df["pid"])]
+
+
+def culture_rows(path, aliases):
+    """作者.csv 中的文化标签 -> [{name, props: {culture}}]，同一主体保留最后一个"""
+    df = read_table(path, ["主体", "对象"]).dropna(subset=["对象"])
+    kinds, names = aliases.apply(df["对象"])
+    df = df.assign(对象=names)[kinds == "culture"].drop_duplicates("主体", keep="last")
+    return [{"name": p, "props": {"culture": c}} for p, c in zip(df["主体"], df["对象"])]
+
+
+def date_columns(times):
+    """年代字符串 -> year_start、year_end（Python int，无法解析为空）和 dynasty 三列"""
+    sys.path.insert(0, DATAMODELING_DIR)
+    from dating import parse_dates
+    parsed = parse_dates(times)
+    for col in ("year_start", "year_end"):
+        parsed[col] = parsed[col].astype(object)
+    return parsed
+
+
+def project_frame(input_dir=".", files=PROPERTY_FILES):
+    """合并属性文件，每个主体一行，列为 project 节点的属性名。
+
+    原脚本逐行覆盖属性，同一主体最终保留的是文件中最后一个非空值，这里保持相同结果。
+    不存在的属性文件会被跳过；有年代时附加解析出的年份范围和朝代。
+    """
+    frames = []
+    for filename, (col, key) in files.items():
+        path = os.path.join(input_dir, filename)
+        if not table_exists(path):
+            print(f"未找到 {path}，跳过该属性")
+            continue
+        df = read_table(path, ["主体", col])
+        names = df[["主体"]].drop_duplicates()
+        values = (df.dropna(subset=[col])
+                    .drop_duplicates("主体", keep="last")
+                    .rename(columns={col: key}))
+        frames.append(names.merge(values, on="主体", how="left"))
+    if not frames:
+        return pd.DataFrame(columns=["主体"])
+    merged = reduce(lambda a, b: a.merge(b, on="主体", how="outer"), frames)
+    if "time" in merged.columns:
+        merged = pd.concat([merged, date_columns(merged["time"])], axis=1)
+    return merged
+
+
+def project_rows(input_dir=".", files=PROPERTY_FILES):
+    """合并后的属性 -> [{name, props}]，空值不写入"""
+    merged = project_frame(input_dir, files)
+    keys = list(merged.columns[1:])
+    rows = []
+    for record in merged.itertuples(index=False):
+        props = {k: v for k, v in zip(keys, record[1:]) if not pd.isna(v)}
+        rows.append({"name": record[0], "props": props})
+    return rows
+
+
+def _run_batch(tx, cql, rows):
+    tx.run(cql, rows=rows).consume()
+
+
+def run_batches(driver, cql, rows, batch_size=BATCH_SIZE, desc="写入"):
+    """按批次在显式写事务中执行 UNWIND 语句，并输出每批的吞吐量"""
+    total_time = 0.0
+    with driver.session() as session:
+        bar = tqdm(range(0, len(rows), batch_size), desc=desc, unit="批")
+        for start in bar:
+            batch = rows[start:start + batch_size]
+            t0 = time.perf_counter()
+            try:
+                session.execute_write(_run_batch, cql, batch)
+            except Exception:
+                metrics.observe_error("neo4j", desc)
+                raise
+            elapsed = time.perf_counter() - t0
+            total_time += elapsed
+            metrics.observe_batch("neo4j", desc, len(batch), elapsed)
+            bar.set_postfix(rows_per_sec=f"{len(batch) / max(elapsed, 1e-9):.0f}")
+            tqdm.write(f"{desc} 第{start // batch_size + 1}批：{len(batch)} 行，"
+                       f"{elapsed:.2f} 秒，{len(batch) / max(elapsed, 1e-9):.0f} 行/秒")
+    if rows:
+        print(f"{desc}完成：共 {len(rows)} 行，平均 {len(rows) / max(total_time, 1e-9):.0f} 行/秒")
+    return total_time
+
+
+def ensure_indexes(driver):
+    """为 MERGE 使用的 name 属性建立索引，避免每一行都做全标签扫描"""
+    with driver.session() as session:
+        for cql in INDEX_CQL:
+            session.run(cql).consume()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入作者关系与藏品属性到 Neo4j")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--uri", default=NEO4J_URI)
+    parser.add_argument("--skip-writers", action="store_true", help="不导入作者关系")
+    parser.add_argument("--skip-props", action="store_true", help="不导入介绍/图片链接/年代/文化")
+    parser.add_argument("--aliases", help="作者别名表缓存（alias.py 生成），用于规范化作者")
+    args = parser.parse_args()
+
+    metrics.start_from_env()
+    aliases = load_aliases(args.aliases) if args.aliases else None
+    driver = GraphDatabase.driver(args.uri, auth=NEO4J_AUTH)
+    try:
+        ensure_indexes(driver)
+        if not args.skip_writers:
+            run_batches(driver, WRITER_CQL, writer_rows(aliases=aliases), args.batch_size, desc="导入作者关系")
+            if aliases is not None:
+                run_batches(driver, PROJECT_CQL, culture_rows(AUTHOR_CSV, aliases), args.batch_size,
+                            desc="写入文化属性")
+        if not args.skip_props:
+            run_batches(driver, PROJECT_CQL, project_rows(), args.batch_size, desc="写入藏品属性")
+    finally:
+        driver.close()
+    print("导入完成！")
+
+
+if __name__ == "__main__":
+    main()
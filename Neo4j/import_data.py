@@ -15,7 +15,7 @@ df = pd.read_csv(csv_path, encoding='utf-8')
 
 with graph.session() as session:
     # for _, row in df.iterrows():
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="添加时间属性"):
+    for _, row in tqdm(df.iterrows(), total=len(df), desc="添加介绍属性"):
         params = {
             "name": row['主体'],
             "description":row['介绍'],
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# parallel_writer.py
+# 并发导入作者关系，且并发事务之间不会锁住同一个节点：
+#   第一阶段：按名称去重后并发创建 project / people 节点，每个名称只出现在一个批次里；
+#   第二阶段：把关系按 (hash(主体) % k, hash(对象) % k) 分到 k×k 的网格中，
+#            每一轮并发执行一条“对角线”上的 k 个格子。同一轮的格子两两之间行号、列号都不同，
+#            因此涉及的 project、people 节点互不相交，像 Chinese 这样的热点节点也只会被一个事务持有。
+# 遇到死锁等临时性错误时按指数退避重试。
+
+import argparse
+import os
+import queue
+import random
+import sys
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
+from tqdm import tqdm
+
+from bulk_load import BATCH_SIZE, NEO4J_AUTH, NEO4J_URI, ensure_indexes, writer_rows
+
+# 仓库根目录的运行指标：每批的行数、耗时和失败次数
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF = 0.2  # 首次重试前等待的秒数，之后逐次翻倍
+
+PROJECT_NODE_CQL = "UNWIND $rows AS name MERGE (:project {name: name})"
+PEOPLE_NODE_CQL = "UNWIND $rows AS name MERGE (:people {name: name})"
+WRITER_REL_CQL = '''
+    UNWIND $rows AS row
+    MATCH (source:project {name: row.pname})
+    MATCH (target:people  {name: row.wname})
+    MERGE (source)-[:writer]->(target)
+    '''
+
+
+def partition_key(name, k):
+    # 使用 crc32 而不是 hash()，保证每次运行得到相同的分区
+    return zlib.crc32(name.encode("utf-8")) % k
+
+
+def chunks(rows, size):
+    return [rows[i:i + size] for i in range(0, len(rows), size)]
+
+
+def grid_rounds(rows, k):
+    """把关系分到 k×k 网格，返回 k 轮，每轮是 k 个互不共享节点的格子"""
+    grid = [[[] for _ in range(k)] for _ in range(k)]
+    for row in rows:
+        grid[partition_key(row["pname"], k)][partition_key(row["wname"], k)].append(row)
+    return [[grid[i][(i + r) % k] for i in range(k)] for r in range(k)]
+
+
+class SessionPool:
+    """固定数量的会话，线程取用后归还；会话本身不是线程安全的，同一时刻只被一个线程使用"""
+
+    def __init__(self, driver, size):
+        self._sessions = queue.Queue()
+        for _ in range(size):
+            self._sessions.put(driver.session())
+
+    def run(self, cql, rows, stage="写入", max_retries=MAX_RETRIES, backoff=BACKOFF):
+        session = self._sessions.get()
+        try:
+            for attempt in range(max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    with session.begin_transaction() as tx:
+                        tx.run(cql, rows=rows).consume()
+                        tx.commit()
+                    metrics.observe_batch("neo4j", stage, len(rows), time.perf_counter() - start)
+                    return attempt
+                except TransientError as e:
+                    metrics.observe_error("neo4j", stage)
+                    if attempt == max_retries:
+                        raise
+                    delay = backoff * (2 ** attempt) * (1 + random.random())
+                    tqdm.write(f"临时性错误（{e.code}），{delay:.2f} 秒后第{attempt + 1}次重试")
+                    time.sleep(delay)
+        finally:
+            self._sessions.put(session)
+
+    def close(self):
+        while not self._sessions.empty():
+            self._sessions.get().close()
+
+
+def create_nodes(pool, executor, rows, batch_size):
+    """第一阶段：每个名称只属于一个批次，批次之间可以任意并发"""
+    projects = sorted({row["pname"] for row in rows})
+    people = sorted({row["wname"] for row in rows})
+    tasks = [(PROJECT_NODE_CQL, b) for b in chunks(projects, batch_size)]
+    tasks += [(PEOPLE_NODE_CQL, b) for b in chunks(people, batch_size)]
+    futures = [executor.submit(pool.run, cql, batch, "创建节点") for cql, batch in tasks]
+    for future in tqdm(futures, desc="创建节点", unit="批"):
+        future.result()
+    print(f"✔ 节点创建完成：project {len(projects)} 个，people {len(people)} 个")
+
+
+def _write_cell(pool, cell, batch_size):
+    retries = 0
+    for batch in chunks(cell, batch_size):
+        retries += pool.run(WRITER_REL_CQL, batch, "创建作者关系")
+    return retries
+
+
+def create_relationships(pool, executor, rows, workers, batch_size):
+    """第二阶段：逐轮执行网格的对角线，每轮内的格子并发写入"""
+    retries = 0
+    for cells in tqdm(grid_rounds(rows, workers), desc="创建作者关系", unit="轮"):
+        futures = [executor.submit(_write_cell, pool, cell, batch_size) for cell in cells if cell]
+        retries += sum(f.result() for f in futures)
+    print(f"✔ 作者关系创建完成：{len(rows)} 条，重试 {retries} 次")
+
+
+def parallel_write(driver, rows, workers=WORKERS, batch_size=BATCH_SIZE):
+    pool = SessionPool(driver, workers)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            create_nodes(pool, executor, rows, batch_size)
+            create_relationships(pool, executor, rows, workers, batch_size)
+    finally:
+        pool.close()
+    elapsed = time.perf_counter() - start
+    print(f"共耗时 {elapsed:.2f} 秒，{len(rows) / max(elapsed, 1e-9):.0f} 行/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发导入作者关系（无死锁分区）")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="并发会话数")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--uri", default=NEO4J_URI)
+    args = parser.parse_args()
+
+    metrics.start_from_env()
+    driver = GraphDatabase.driver(args.uri, auth=NEO4J_AUTH)
+    try:
+        ensure_indexes(driver)
+        parallel_write(driver, writer_rows(), args.workers, args.batch_size)
+    finally:
+        driver.close()
+    print("导入完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ df = pd.read_csv(csv_path, encoding='utf-8')
 
 with graph.session() as session:
     # for _, row in df.iterrows():
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="添加时间属性"):
+    for _, row in tqdm(df.iterrows(), total=len(df), desc="添加图片链接属性"):
         params = {
             "name": row['主体'],
             "link":row['图片链接'],
@@ -1,166 +1,346 @@
 import os
-import csv
+import sys
 import time
+import heapq
+import threading
 import requests
+from collections import Counter, deque
 from concurrent.futures import ThreadPoolExecutor
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+# 共用的磁盘响应缓存（Spider/http_cache.py），重复抓取时用条件请求重新验证，离线时直接回放
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import HttpCache, OfflineMiss, cached_request
+# 仓库根目录的运行指标，请求延迟与状态码由 cached_request 记录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import metrics
+# 断点续爬（Spider/frontier.py）：已抓取的搜索页和文物记录在 frontier.db 中，再次运行自动从上次的位置继续
+from frontier import Frontier, RecordSink
+
+cache = HttpCache.from_env()
+
 url = 'https://prod.philamuseumsearch.org/v1/search'
 file_path = 'Philamuseum_chinese_made_artworks_final.csv'
+fieldnames = ['藏品编号', '藏品名称', '作者', '时间', '朝代', '类别', '尺寸', '媒介', '摘要', '信用信息',
+              '图片链接', '详情链接']
+page_size = 48
 headers = {
     'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
 }
 
-# 创建一个带有重试机制的 session
+# 详情请求的自适应控制（AIMD）：并发在 MIN_WORKERS ~ MAX_WORKERS 之间调整，超时时间跟随实测延迟
+INITIAL_WORKERS = 4
+MIN_WORKERS = 1
+MAX_WORKERS = 32
+LATENCY_FACTOR = 2.0      # 平滑延迟超过最低延迟的这个倍数时视为拥塞，停止增加并发
+INITIAL_TIMEOUT = 5.0
+MIN_TIMEOUT = 2.0
+MAX_TIMEOUT = 30.0
+RETRY_ATTEMPTS = 3        # 每个文物最多请求的次数，之后记为 failed
+RETRY_DELAY = 2.0         # 第 n 次重试前等待 RETRY_DELAY * 2^(n-1) 秒
+REPORT_INTERVAL = 10.0    # 每隔多少秒输出一次并发、延迟与吞吐量
+THROUGHPUT_WINDOW = 10.0  # 吞吐量按最近多少秒计算
+
+
+# 创建 session：只在连接阶段自动重试；超时和 429/5xx 交给 AimdController 处理，不在内部重试掩盖
 def create_session():
     session = requests.Session()
-    retries = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])  # 重试机制：最多3次
-    adapter = HTTPAdapter(max_retries=retries)
+    retries = Retry(connect=3, read=0, status=0, backoff_factor=1)
+    adapter = HTTPAdapter(max_retries=retries, pool_maxsize=MAX_WORKERS)
     session.mount('https://', adapter)
     return session
 
 
-# 保存数据到 CSV 文件
-def save_data_to_csv(data: list, path: str):
-    dir_path = os.path.dirname(path)
-    if dir_path:
-        os.makedirs(dir_path, exist_ok=True)
+class AimdController:
+    """加性增、乘性减的并发控制：
+    - 请求成功且延迟正常时，每完成约一轮（limit 个请求）并发上限加 1；
+    - 遇到 429/5xx 或超时，并发上限减半（同一轮拥塞只减一次），超时还会使超时时间加倍；
+    - 超时时间按 TCP 的方法由平滑延迟与延迟抖动计算（srtt + 4 * rttvar）。"""
+
+    def __init__(self, initial=INITIAL_WORKERS, minimum=MIN_WORKERS, maximum=MAX_WORKERS):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.timeout = INITIAL_TIMEOUT
+        self.srtt = None
+        self.rttvar = 0.0
+        self.base_rtt = None
+        self.last_backoff = 0.0
+        self.counts = Counter()
+        self.completed = deque()
+        self.last_report = time.monotonic()
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """进行中的请求达到并发上限时阻塞"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency, outcome):
+        """outcome 为 ok、throttled（429/5xx）、timeout 或 error（其他失败，不调整并发）"""
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            self.counts[outcome] += 1
+            if outcome == 'ok':
+                self._observe(latency)
+                self.completed.append(now)
+                if self.srtt <= LATENCY_FACTOR * self.base_rtt:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif outcome in ('throttled', 'timeout'):
+                if now - self.last_backoff > (self.srtt or self.timeout):
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_backoff = now
+                if outcome == 'timeout':
+                    self.timeout = min(MAX_TIMEOUT, self.timeout * 2)
+            self._cond.notify_all()
+            if now - self.last_report >= REPORT_INTERVAL:
+                self.last_report = now
+                print(self._status(now))
+
+    def _observe(self, latency):
+        if self.srtt is None:
+            self.srtt, self.rttvar = latency, latency / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - latency)
+            self.srtt = 0.875 * self.srtt + 0.125 * latency
+        self.base_rtt = self.srtt if self.base_rtt is None else min(self.base_rtt, self.srtt)
+        self.timeout = min(MAX_TIMEOUT, max(MIN_TIMEOUT, self.srtt + 4 * self.rttvar))
 
-    file_exists = os.path.exists(path)
-    write_header = not file_exists or (file_exists and os.path.getsize(path) == 0)
+    def throughput(self, now=None):
+        """最近 THROUGHPUT_WINDOW 秒内每秒成功的请求数"""
+        now = time.monotonic() if now is None else now
+        while self.completed and now - self.completed[0] > THROUGHPUT_WINDOW:
+            self.completed.popleft()
+        return len(self.completed) / THROUGHPUT_WINDOW
 
-    fieldnames = list(data[0].keys())
-    with open(path, mode='a', encoding='utf-8-sig', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if write_header:
-            writer.writeheader()
-        writer.writerows(data)
+    def _status(self, now):
+        c = self.counts
+        return (f"[详情] 并发上限 {int(self.limit)}，进行中 {self.in_flight}，超时 {self.timeout:.1f} 秒，"
+                f"平均延迟 {self.srtt or 0:.2f} 秒，{self.throughput(now):.1f} 条/秒；"
+                f"成功 {c['ok']} / 限流 {c['throttled']} / 超时 {c['timeout']} / 其他失败 {c['error']}")
 
+    def status(self):
+        with self._cond:
+            return self._status(time.monotonic())
 
-# 获取文物详情页面中的信息
-def get_object_details(uuid: str, session):
+
+# 获取文物详情页面中的信息，返回 (详情 dict 或 None, 结果类型)，结果类型供 AimdController 调整并发
+def get_object_details(uuid: str, session, timeout=INITIAL_TIMEOUT):
     detail_url = f'https://pma-collection.web.app/gen2/v1/objects/{uuid}'
     try:
-        response = session.get(detail_url, timeout=5)  # 设置5秒超时
-        if response.status_code == 200:
-            return response.json()
+        response = cached_request(session, 'GET', detail_url, cache, timeout=timeout)
+    except OfflineMiss as e:
+        print(e)
+        return None, 'error'
+    except requests.Timeout:
+        print(f"获取详情超时: {uuid}（{timeout:.1f} 秒）")
+        return None, 'timeout'
     except Exception as e:
         print(f"获取详情失败: {uuid} - {e}")
-    return {}
+        return None, 'error'
+    if response.status_code == 200:
+        try:
+            return response.json(), 'ok'
+        except ValueError:
+            return None, 'error'
+    print(f"获取详情失败: {uuid} - 状态码 {response.status_code}")
+    if response.status_code == 429 or response.status_code >= 500:
+        return None, 'throttled'
+    return None, 'error'
 
 
-# 获取文物信息
-def fetch_artwork_data(item, session, processed_uuids, failed_uuids):
-    # 判断文物的"constituents"字段是否包含"Chinese"
+# 判断文物的"constituents"字段是否包含"Chinese"
+def is_chinese(item):
     constituents = item.get('constituents', '')
+    return isinstance(constituents, str) and 'Chinese' in constituents
+
+
+# 由搜索结果中的一项和详情接口返回的 JSON 组装一行数据
+def build_record(item, details):
     uuid = item.get('uuid', '')
+    dimensions = details.get('Dimensions', '')
+    credit_line = details.get('CreditLine', '')
+    medium = details.get('Medium', '')
+    dynasty = details.get('Dynasty', '')
 
-    # 如果该文物已经被处理过，跳过
-    if uuid in processed_uuids:
-        return None
-
-    # 标记为已处理
-    processed_uuids.add(uuid)
-
-    if isinstance(constituents, str) and 'Chinese' in constituents:
-        # 获取详情页面的内容
-        details = get_object_details(uuid, session)
-
-        # 如果获取失败，将该uuid添加到失败列表
-        if not details:
-            failed_uuids.add(uuid)
-            return None
-
-        dimensions = details.get('Dimensions', '')
-        credit_line = details.get('CreditLine', '')
-        medium = details.get('Medium', '')
-        dynasty = details.get('Dynasty', '')
-
-        # 处理图片链接，如果是相对路径则拼接完整URL
-        image_url = item.get('imageUrl', '')
-        if image_url and not image_url.startswith("http"):
-            image_url = f"https://iiif.micr.io/{image_url}/full/^300,/0/default.jpg"
-
-        return {
-            '藏品编号': uuid,
-            '藏品名称': item.get('title', ''),
-            '作者': item.get('artist', ''),
-            '时间': item.get('date', ''),
-            '朝代': dynasty,
-            '类别': item.get('category', ''),
-            '尺寸': dimensions,
-            '媒介': medium,
-            '摘要': item.get('summary', ''),
-            '信用信息': credit_line,
-            '图片链接': image_url if image_url.startswith("http") else '',
-            '详情链接': f'https://www.philamuseum.org/collection/object/{uuid}',
-        }
-
-    return None
-
-
-# 重试获取失败的文物
-def retry_failed_uuids(failed_uuids, session):
-    for uuid in list(failed_uuids):
-        print(f"正在重试文物: {uuid}")
-        details = get_object_details(uuid, session)
-        if details:
-            failed_uuids.remove(uuid)
-            print(f"文物 {uuid} 重试成功")
-        else:
-            print(f"文物 {uuid} 重试失败")
-
-
-from_ = 0
-processed_uuids = set()  # 用于存储已处理的 uuid
-failed_uuids = set()  # 用于存储获取失败的 uuid
-session = create_session()  # 创建带重试机制的 session
-
-# 使用 ThreadPoolExecutor 来加速
-with ThreadPoolExecutor(max_workers=10) as executor:
-    while True:
-        print(f'正在爬取第{(from_ + 48) // 48}页')
-        payload = {
-            'query': 'chinese',
-            'paging': {
-                'from': from_,
-                'size': 48,
-            }
-        }
-        resp = requests.post(url, headers=headers, json=payload)
+    # 处理图片链接，如果是相对路径则拼接完整URL
+    image_url = item.get('imageUrl', '')
+    if image_url and not image_url.startswith("http"):
+        image_url = f"https://iiif.micr.io/{image_url}/full/^300,/0/default.jpg"
+
+    return {
+        '藏品编号': uuid,
+        '藏品名称': item.get('title', ''),
+        '作者': item.get('artist', ''),
+        '时间': item.get('date', ''),
+        '朝代': dynasty,
+        '类别': item.get('category', ''),
+        '尺寸': dimensions,
+        '媒介': medium,
+        '摘要': item.get('summary', ''),
+        '信用信息': credit_line,
+        '图片链接': image_url if image_url.startswith("http") else '',
+        '详情链接': f'https://www.philamuseum.org/collection/object/{uuid}',
+    }
+
+
+class DetailCrawler:
+    """按 AimdController 的并发上限抓取详情：submit() 在并发已满时阻塞翻页；
+    失败的文物放入后台重试队列，由重试线程按指数退避重新提交，不阻塞翻页；
+    请求 RETRY_ATTEMPTS 次仍失败才在 frontier 中记为 failed。wait() 等待全部任务（含重试）结束"""
 
+    def __init__(self, frontier, sink, session, controller):
+        self.frontier = frontier
+        self.sink = sink
+        self.session = session
+        self.controller = controller
+        self.executor = ThreadPoolExecutor(max_workers=controller.maximum)
+        self.outstanding = 0
+        self.retries = []  # (到期时间, 序号, 已请求次数, uuid, 文物)
+        self.sequence = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        self.retry_thread = threading.Thread(target=self._retry_loop, daemon=True)
+        self.retry_thread.start()
+
+    def submit(self, uuid, item):
+        with self._cond:
+            self.outstanding += 1
+        self._dispatch(uuid, item, 1)
+
+    def _dispatch(self, uuid, item, attempt):
+        self.controller.acquire()
+        self.executor.submit(self._fetch, uuid, item, attempt)
+
+    def _fetch(self, uuid, item, attempt):
+        start = time.monotonic()
         try:
-            result = resp.json().get('result', [])
+            details, outcome = get_object_details(uuid, self.session, self.controller.timeout)
+            record = build_record(item, details) if details else None
         except Exception as e:
-            print(f'请求失败或解析出错：{e}')
-            break
+            print(f"处理文物时出错: {uuid} - {e}")
+            record, outcome = None, 'error'
+        self.controller.release(time.monotonic() - start, outcome)
 
-        # 如果没有更多数据，跳出循环
-        if not result:
-            print('所有信息已被爬取')
-            break
+        # 写入 sink 或 frontier 出错（如磁盘已满、SQLite 被锁）时也要减少 outstanding，否则 wait() 永远不会返回
+        finished = True
+        try:
+            if record is not None:
+                self.sink.write(record, uuid)
+            elif attempt < RETRY_ATTEMPTS:
+                with self._cond:
+                    due = time.monotonic() + RETRY_DELAY * 2 ** (attempt - 1)
+                    self.sequence += 1
+                    heapq.heappush(self.retries, (due, self.sequence, attempt, uuid, item))
+                    self._cond.notify_all()
+                finished = False
+            else:
+                self.frontier.mark_failed(uuid, outcome)
+        except Exception as e:
+            print(f"记录文物结果时出错: {uuid} - {e}")
+            try:
+                self.frontier.mark_failed(uuid, e)
+            except Exception as e:
+                print(f"无法把文物记为失败: {uuid} - {e}")
+        finally:
+            if finished:
+                with self._cond:
+                    self.outstanding -= 1
+                    self._cond.notify_all()
 
-        # 使用并发来获取每个文物的详情信息
-        datalist = list(
-            executor.map(fetch_artwork_data, result, [session] * len(result), [processed_uuids] * len(result),
-                         [failed_uuids] * len(result)))
+    def _retry_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self.closed:
+                        return
+                    now = time.monotonic()
+                    if self.retries and self.retries[0][0] <= now:
+                        _, _, attempt, uuid, item = heapq.heappop(self.retries)
+                        break
+                    self._cond.wait(self.retries[0][0] - now if self.retries else None)
+            print(f"正在重试文物: {uuid}（第{attempt + 1}次）")
+            self._dispatch(uuid, item, attempt + 1)
 
-        # 过滤掉 None 的项
-        datalist = [data for data in datalist if data is not None]
+    def wait(self):
+        with self._cond:
+            while self.outstanding:
+                self._cond.wait()
+            self.closed = True
+            self._cond.notify_all()
+        self.executor.shutdown()
 
-        if datalist:
-            save_data_to_csv(datalist, file_path)
-            print(f'第{(from_ + 48) // 48}页信息已保存')
-        else:
-            print(f'第{(from_ + 48) // 48}页没有符合条件的数据')
 
-        from_ += 48
-        time.sleep(1)
+# 提交 frontier 中所有待处理的文物（包括上次中断时未完成的），返回提交的数量
+def crawl_pending(frontier, crawler):
+    submitted = 0
+    for uuid, item in frontier.iter_pending():
+        crawler.submit(uuid, item)
+        submitted += 1
+    return submitted
+
+
+def main():
+    metrics.start_from_env()
+    from_ = 0
+    frontier = Frontier('philamuseum')  # 记录已处理的页和 uuid（带锁，可在多个线程中使用）
+    session = create_session()  # 创建只重试连接错误的 session
+    controller = AimdController()
+
+    # 上次运行中最终失败的文物放回队列，本次重新抓取
+    retried = frontier.retry_failed()
+    if retried:
+        print(f"上次失败的文物已放回队列: {retried}")
+
+    with RecordSink(file_path, fieldnames, frontier) as sink:
+        crawler = DetailCrawler(frontier, sink, session, controller)
+        while True:
+            page_no = from_ // page_size + 1
+            page = f'from={from_}'
+            if frontier.page_count(page) is None:
+                print(f'正在爬取第{page_no}页')
+                payload = {
+                    'query': 'chinese',
+                    'paging': {
+                        'from': from_,
+                        'size': page_size,
+                    }
+                }
+                try:
+                    resp = cached_request(requests, 'POST', url, cache, headers=headers, json=payload)
+                    result = resp.json().get('result', [])
+                except Exception as e:
+                    print(f'请求失败或解析出错：{e}')
+                    break
+
+                # 如果没有更多数据，跳出循环
+                if not result:
+                    print('所有信息已被爬取')
+                    break
+
+                # 只登记 constituents 含 Chinese 的文物，重复的 uuid 由 frontier 忽略
+                frontier.add_page(page, [(item.get('uuid', ''), item) for item in result if is_chinese(item)],
+                                  total=len(result))
+            else:
+                print(f'第{page_no}页已处理过，跳过')
+
+            # 详情并发抓取，并发已满时在这里等待，翻页的速度由详情的处理速度决定
+            submitted = crawl_pending(frontier, crawler)
+            print(f'第{page_no}页提交{submitted}个文物')
+
+            from_ += page_size
+
+        crawler.wait()
+
+    print(controller.status())
+    print(cache.summary())
+    print(frontier.summary())
+
 
-        # 重试获取失败的文物
-        if failed_uuids:
-            print(f"重试失败的文物，当前失败数: {len(failed_uuids)}")
-            retry_failed_uuids(failed_uuids, session)
-            if not failed_uuids:
-                print("所有失败的文物已成功获取")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# adapters.py
+# crawl_engine.py 的博物馆适配器。每个适配器提供：
+#   - list_pages(engine)：异步生成器，逐页请求列表/搜索页，产出待抓取的文物（dict）；
+#   - detail_url(item)：文物详情页地址，detail_json 为 True 时详情按 JSON 解析；
+#   - parse_detail(item, body)：由详情页内容生成一条记录，返回 None 表示丢弃；
+#   - close()：抓取结束后释放适配器持有的资源（如纳尔逊的分类器）。
+# 解析逻辑直接复用各博物馆原有脚本中的函数，输出列与原脚本一致。
+
+import importlib.util
+import os
+from abc import ABC, abstractmethod
+
+SPIDER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(relative_path):
+    """按路径加载原有爬虫脚本（文件名含中文和连字符，无法直接 import）"""
+    path = os.path.join(SPIDER_DIR, relative_path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class Adapter(ABC):
+    """适配器基类；子类必须实现 list_pages 和 parse_detail，缺少时在实例化时就会报错"""
+    name = ""
+    output = ""
+    columns = []
+    detail_json = False
+
+    def __init__(self, max_pages=None):
+        self.max_pages = max_pages
+
+    def pages(self, total):
+        """限制列表页数（用于测试）"""
+        return total if self.max_pages is None else min(total, self.max_pages)
+
+    @abstractmethod
+    async def list_pages(self, engine):
+        """异步生成器：逐页请求列表/搜索页，产出待抓取的文物"""
+
+    def detail_url(self, item):
+        return item["url"]
+
+    @abstractmethod
+    def parse_detail(self, item, body):
+        """由详情页内容生成一条记录，返回 None 表示丢弃"""
+
+    def close(self):
+        pass
+
+
+class MetAdapter(Adapter):
+    name = "met"
+    output = "met_chinese_artworks1.csv"
+    columns = ['标题', '艺术家', '文化背景', '年代', '材质', '尺寸', '分类', '描述', '图片URL', '链接']
+    search_url = "https://www.metmuseum.org/art/collection/search?q=chinese&geolocation=China&offset={offset}"
+    page_size = 40
+
+    def __init__(self, max_pages=None):
+        super().__init__(max_pages)
+        self.script = load_script(os.path.join("metmuseum", "metmuseum_final.py"))
+
+    async def list_pages(self, engine):
+        page = 0
+        while self.max_pages is None or page < self.max_pages:
+            html = await engine.fetch(self.search_url.format(offset=page * self.page_size))
+            if not html:
+                print("无法获取搜索结果，停止。")
+                return
+            artworks = self.script.parse_search_results(html)
+            print(f"offset={page * self.page_size}：本页找到 {len(artworks)} 个文物。")
+            if not artworks:
+                return
+            for artwork in artworks:
+                yield artwork
+            page += 1
+
+    def detail_url(self, item):
+        return item['链接']
+
+    def parse_detail(self, item, body):
+        details = self.script.parse_artwork_details(body)
+        return {**item, **details}
+
+
+class PhilaAdapter(Adapter):
+    name = "phila"
+    output = "Philamuseum_chinese_made_artworks_final.csv"
+    columns = ['藏品编号', '藏品名称', '作者', '时间', '朝代', '类别', '尺寸', '媒介', '摘要', '信用信息',
+               '图片链接', '详情链接']
+    detail_json = True
+    page_size = 48
+
+    def __init__(self, max_pages=None):
+        super().__init__(max_pages)
+        self.script = load_script(os.path.join("Philamuseum", "philamuseum_final.py"))
+
+    async def list_pages(self, engine):
+        seen = set()
+        page = 0
+        while self.max_pages is None or page < self.max_pages:
+            payload = {'query': 'chinese', 'paging': {'from': page * self.page_size, 'size': self.page_size}}
+            data = await engine.fetch(self.script.url, method="POST", json=payload, as_json=True)
+            result = (data or {}).get('result', [])
+            if not result:
+                print('所有信息已被爬取')
+                return
+            for item in result:
+                uuid = item.get('uuid', '')
+                if uuid in seen or not self.script.is_chinese(item):
+                    continue
+                seen.add(uuid)
+                yield item
+            page += 1
+
+    def detail_url(self, item):
+        return f"https://pma-collection.web.app/gen2/v1/objects/{item.get('uuid', '')}"
+
+    def parse_detail(self, item, body):
+        return self.script.build_record(item, body) if body else None
+
+
+class NelsonAdapter(Adapter):
+    name = "nelson"
+    output = "chinese_artifacts.csv"
+    columns = ['文物名字', '年代', '材质', '尺寸', '入藏信息', '藏品编号', '当前是否展出', '详情页面URL', '文物图片链接']
+    list_url = "https://art.nelson-atkins.org/advancedsearch/objects/provenance%3Achina?page={page}"
+    total_pages = 12
+
+    def __init__(self, max_pages=None, classify=None):
+        """classify(字段) 返回 True 时才保留该文物，字段由 classification_fields 从页面中提取；
+        默认使用 china_classifier.ChinaClassifier（搜索结果中混有日本、朝鲜等文物，与原脚本一样需要筛选），
+        close() 时关闭。classify 无法判断时应抛出异常（如 ClassifierError），引擎把该 URL 记为失败而不是丢弃"""
+        super().__init__(max_pages)
+        self.script = load_script(os.path.join("纳尔逊阿特金斯艺术博物馆", "纳尔逊-阿特金斯艺术博物馆.py"))
+        self.classifier = None
+        if classify is None:
+            from china_classifier import ChinaClassifier
+            self.classifier = ChinaClassifier()
+            classify = self.classifier.classify
+        self.classify = classify
+
+    async def list_pages(self, engine):
+        for page in range(1, self.pages(self.total_pages) + 1):
+            html = await engine.fetch(self.list_url.format(page=page))
+            if not html:
+                continue
+            for url in self.script.parse_list_page(html):
+                yield {"url": url}
+
+    def parse_detail(self, item, body):
+        if not self.classify(self.script.classification_fields(body)):
+            return None
+        return self.script.parse_detail_page(body, item["url"])
+
+    def close(self):
+        if self.classifier is not None:
+            print(self.classifier.summary())
+            self.classifier.close()
+            self.classifier = None
+
+
+class SanDiegoAdapter(Adapter):
+    """列表页与详情页直接按静态 HTML 抓取，不经过浏览器。静态列表页可能缺少懒加载的条目，
+    条目数不足一整页的页码在结束时列出，需要用原脚本的 --links（浏览器）重新抓取列表页"""
+    name = "sdmart"
+    output = "museum_artifact_details.csv"
+    columns = ['名称', '创作日期', '创作地点', '图片链接', '类型', '材质', '入藏信息', '藏品编号', '尺寸', '详细描述']
+    base_url = 'https://collection.sdmart.org'
+    list_url = base_url + '/objects-1/portfolio?records=50&query=Creation_Place2%20has%20words%20%22china%22&sort=9&page={page}'
+    total_pages = 44
+
+    def __init__(self, max_pages=None):
+        super().__init__(max_pages)
+        self.script = load_script(os.path.join("圣地亚哥艺术博物馆", "圣地亚哥艺术博物馆.py"))
+        self.incomplete = []
+
+    async def list_pages(self, engine):
+        for page in range(self.pages(self.total_pages)):
+            html = await engine.fetch(self.list_url.format(page=page))
+            if not html:
+                continue
+            links = self.script.parse_portfolio_links(html)
+            if not self.script.static_list_complete(links, page):
+                self.incomplete.append(page)
+                print(f"第 {page} 页静态 HTML 只有 {len(links)} 个链接（每页 {self.script.RECORDS_PER_PAGE} 个），"
+                      f"可能缺少懒加载的条目")
+            for link in links:
+                yield {"url": self.base_url + link}
+
+    def parse_detail(self, item, body):
+        values = self.script.parse_artifact_details(body, self.base_url, item["url"])
+        return dict(zip(self.columns, values))
+
+    def close(self):
+        if self.incomplete:
+            print(f"以下列表页的静态 HTML 可能不完整：{self.incomplete}，"
+                  f"请用 圣地亚哥艺术博物馆.py --links 通过浏览器重新抓取列表页")
+
+
+ADAPTERS = {cls.name: cls for cls in (MetAdapter, PhilaAdapter, NelsonAdapter, SanDiegoAdapter)}
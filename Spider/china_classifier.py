@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# china_classifier.py
+# 判断文物是否属于中国文物（纳尔逊-阿特金斯的搜索条件是“来源含 China”，结果中混有日本、朝鲜等文物）：
+#   1. 规则：文化、朝代、年代等字段明确写出中国朝代/年号或 Chinese，且没有其他国家的文化、时代名称时直接判定，
+#      反之亦然；来源（provenance）只说明经手地点，不单独作为依据；
+#   2. 缓存：模型的结论按“提示词版本 + 模型 + 字段文本”的 SHA1 保存在 SQLite 中，同样的内容不再询问；
+#   3. 其余的只把提取出的字段文本（而不是整页 HTML）发给模型，多个请求通过同一个客户端并发发送。
+# 模型调用失败不是“否”的结论：classify_many 中对应位置为 None，classify 抛出 ClassifierError，
+# 调用方应把该文物记为失败（frontier.mark_failed），用 frontier.py --retry-failed 放回队列后重新判断。
+# 模型地址、密钥和名称由环境变量 CLASSIFIER_BASE_URL、CLASSIFIER_API_KEY、CLASSIFIER_MODEL 指定。
+#
+# 本地测试用的模型替身：python china_classifier.py stub --port 8766
+#   再设置 CLASSIFIER_BASE_URL=http://127.0.0.1:8766/v1 运行爬虫
+# 查看缓存：python china_classifier.py stats
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+VERDICT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "classifier_verdicts.db")
+MODEL_BASE_URL = os.environ.get("CLASSIFIER_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3/")
+MODEL_API_KEY = os.environ.get("CLASSIFIER_API_KEY", "xxxxxxxxxxxxxxxx")
+MODEL_NAME = os.environ.get("CLASSIFIER_MODEL", "xxxxxxxxxxxx")
+MODEL_CONCURRENCY = 4
+MODEL_TIMEOUT = 60
+MAX_TEXT = 4000        # 发送给模型的字段文本最大长度
+
+PROMPT_VERSION = "1"   # 修改提示词时递增，使旧的缓存结论失效
+SYSTEM_PROMPT = ("作为文物领域的权威专家，请依据给定的文物信息（来自博物馆藏品详情页的字段），"
+                 "精准判断该文物是否属于中国文物。仅需用 “yes” 或 “no” 作答，无需阐述依据。")
+
+# 规则只看这些字段（字段名中包含其中任一词）
+DECISIVE_FIELDS = ("culture", "dynasty", "period", "reign", "date", "people", "nationality")
+CHINA_TERMS = re.compile(
+    r"\bchin(?:a|ese)\b"
+    r"|\b(?:shang|zhou|qin|han|jin|sui|tang|song|liao|yuan|ming|qing|northern wei|eastern wei|western wei"
+    r"|northern qi|northern zhou|southern song|northern song|five dynasties)\s+(?:dynasty|period)\b"
+    r"|\b(?:hongwu|yongle|xuande|chenghua|hongzhi|zhengde|jiajing|longqing|wanli|tianqi|chongzhen|shunzhi"
+    r"|kangxi|yongzheng|qianlong|jiaqing|daoguang|xianfeng|tongzhi|guangxu|xuantong)\b"
+    r"|\b(?:warring states|spring and autumn|neolithic china|republic period)\b",
+    re.I)
+OTHER_TERMS = re.compile(
+    r"\b(?:japan(?:ese)?|korea(?:n)?|vietnam(?:ese)?|thai(?:land)?|cambodia(?:n)?|khmer|burm(?:a|ese)"
+    r"|india(?:n)?|persian|iran(?:ian)?|egypt(?:ian)?|greek|roman|islamic|ottoman|mughal"
+    r"|american|french|english|british|italian|german|dutch|flemish|spanish"
+    r"|edo|meiji|momoyama|muromachi|kamakura|heian|nara|asuka|kofun|jomon|yayoi|taisho|showa"
+    r"|joseon|goryeo|silla|baekje|three kingdoms of korea)\b",
+    re.I)
+
+
+class ClassifierError(RuntimeError):
+    """规则和缓存都无法判断、询问模型又失败时抛出"""
+
+
+def format_fields(fields):
+    """把 {字段名: 文本} 拼成发给模型的文本"""
+    return "\n".join(f"{name}: {value}" for name, value in fields.items() if value)[:MAX_TEXT]
+
+
+def content_key(text, model=MODEL_NAME):
+    return hashlib.sha1(f"{PROMPT_VERSION}\n{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def rule_verdict(fields):
+    """能由字段直接判断时返回 True / False，否则返回 None 交给模型"""
+    text = " ".join(value for name, value in fields.items()
+                    if any(word in name.lower() for word in DECISIVE_FIELDS))
+    if not text:
+        return None
+    china, other = CHINA_TERMS.search(text), OTHER_TERMS.search(text)
+    if china and not other:
+        return True
+    if other and not china:
+        return False
+    return None
+
+
+class ChinaClassifier:
+    """classify_many([字段 dict]) 返回与输入等长的结论列表：True / False，模型调用失败时为 None"""
+
+    def __init__(self, db_path=VERDICT_DB, base_url=MODEL_BASE_URL, api_key=MODEL_API_KEY, model=MODEL_NAME,
+                 concurrency=MODEL_CONCURRENCY):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.stats = Counter()
+        self._client = None
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, verdict INTEGER NOT NULL, "
+                          "answer TEXT, created_at REAL)")
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def client(self):
+        """所有请求共用一个 OpenAI 客户端（内部连接池复用连接）"""
+        with self._lock:
+            if self._client is None:
+                from openai import OpenAI
+                self._client = OpenAI(base_url=self.base_url, api_key=self.api_key, timeout=MODEL_TIMEOUT)
+            return self._client
+
+    def _cached(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT verdict FROM verdicts WHERE key = ?", (key,)).fetchone()
+        return None if row is None else bool(row[0])
+
+    def _store(self, key, verdict, answer):
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)",
+                              (key, int(verdict), answer, time.time()))
+            self.conn.commit()
+
+    def _ask(self, text):
+        """询问模型，返回 (结论, 原始回答)，失败时结论为 None"""
+        try:
+            completion = self.client().chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": text},
+                ],
+            )
+            answer = completion.choices[0].message.content or ""
+        except Exception as e:
+            print(f"模型调用失败: {e}")
+            return None, None
+        return "yes" in answer.lower(), answer
+
+    def classify_many(self, items):
+        verdicts = [None] * len(items)
+        to_ask = {}  # 键 -> (文本, [下标])，同一批中内容相同的只问一次
+        for i, fields in enumerate(items):
+            verdict = rule_verdict(fields)
+            if verdict is not None:
+                self.stats["rule"] += 1
+                verdicts[i] = verdict
+                continue
+            text = format_fields(fields)
+            key = content_key(text, self.model)
+            cached = self._cached(key)
+            if cached is not None:
+                self.stats["cache"] += 1
+                verdicts[i] = cached
+                continue
+            to_ask.setdefault(key, (text, []))[1].append(i)
+
+        keys = list(to_ask)
+        for key, (verdict, answer) in zip(keys, self.executor.map(self._ask, [to_ask[k][0] for k in keys])):
+            if verdict is None:
+                self.stats["error"] += 1
+            else:
+                self.stats["model"] += 1
+                self._store(key, verdict, answer)
+            for i in to_ask[key][1]:
+                verdicts[i] = verdict
+        return verdicts
+
+    def classify(self, fields):
+        """返回 True / False；模型调用失败时抛出 ClassifierError，而不是当作非中国文物"""
+        verdict = self.classify_many([fields])[0]
+        if verdict is None:
+            raise ClassifierError("模型调用失败，无法判断是否为中国文物")
+        return verdict
+
+    def summary(self):
+        s = self.stats
+        return f"分类：规则判定 {s['rule']} 个，缓存命中 {s['cache']} 个，询问模型 {s['model']} 个，失败 {s['error']} 个"
+
+    def close(self):
+        self.executor.shutdown()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    """OpenAI 兼容的 /chat/completions 替身：用户消息中含 chin（不区分大小写）时回答 yes，否则 no"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        content = body.get("messages", [{}])[-1].get("content", "")
+        self.server.requests += 1
+        answer = "yes" if re.search("chin", content, re.I) else "no"
+        payload = json.dumps({
+            "id": f"stub-{self.server.requests}", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": answer}}],
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_server(port=0):
+    """启动模型替身（后台线程），返回服务器对象，地址为 http://127.0.0.1:端口/v1"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubModelHandler)
+    server.daemon_threads = True
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="中国文物分类：模型替身与缓存统计")
+    sub = parser.add_subparsers(dest="command", required=True)
+    stub = sub.add_parser("stub", help="启动本地模型替身")
+    stub.add_argument("--port", type=int, default=8766)
+    stats = sub.add_parser("stats", help="查看缓存的结论")
+    stats.add_argument("--db", default=VERDICT_DB)
+    args = parser.parse_args()
+
+    if args.command == "stub":
+        server = stub_server(args.port)
+        print(f"模型替身已启动：http://127.0.0.1:{server.server_address[1]}/v1")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    else:
+        conn = sqlite3.connect(args.db)
+        counts = dict(conn.execute("SELECT verdict, COUNT(*) FROM verdicts GROUP BY verdict").fetchall())
+        print(f"{args.db}：中国文物 {counts.get(1, 0)} 个，非中国文物 {counts.get(0, 0)} 个")
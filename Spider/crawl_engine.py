@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# crawl_engine.py
+# 四个博物馆爬虫共用的 asyncio/aiohttp 抓取引擎：
+#   - 所有请求共用一个 ClientSession，连接按域名复用；
+#   - 每个域名有独立的并发上限和每秒请求数上限（HOST_POLICIES），吞吐量由礼貌性设置决定，
+#     而不是由逐个请求的往返延迟决定；
+#   - 各博物馆以适配器接入（adapters.py），只需实现 list_pages() 和 parse_detail() 两个钩子：
+#     列表页边翻页边产出文物，详情页随即并发抓取，解析放到线程池中执行，不阻塞事件循环；
+#   - 传入 http_cache.HttpCache 后，请求先查磁盘缓存，并用 ETag/Last-Modified 做条件请求，
+#     缓存命中不占用域名的并发与限速额度；
+#   - 默认通过 frontier.py 记录每个详情 URL 的状态，记录按批追加写入输出文件，
+#     中断后再次运行会跳过已完成的 URL，只补抓剩余部分；--restart 清空进度从头开始。
+#   - 每次请求的延迟、状态码、字节数和每个详情页的解析耗时记入 metrics.py（METRICS_PORT / METRICS_FILE 输出）。
+#
+# 用法：python crawl_engine.py met --output met.csv
+#       python crawl_engine.py phila --fixtures http://127.0.0.1:8765   （对着 fixture_server.py 离线测试）
+#       python crawl_engine.py nelson --offline                          （只回放缓存，不访问网络）
+
+import argparse
+import asyncio
+import csv
+import json as jsonlib
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict, namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from frontier import Frontier, RecordSink
+from http_cache import HttpCache, request_body
+
+# 仓库根目录的共用指标模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
+}
+
+# concurrency：同一域名同时进行的请求数；rate：每秒最多发出的请求数（0 表示不限）
+HostPolicy = namedtuple("HostPolicy", ["concurrency", "rate"])
+DEFAULT_POLICY = HostPolicy(concurrency=4, rate=2.0)
+HOST_POLICIES = {
+    "www.metmuseum.org": HostPolicy(concurrency=8, rate=4.0),
+    "prod.philamuseumsearch.org": HostPolicy(concurrency=2, rate=1.0),
+    "pma-collection.web.app": HostPolicy(concurrency=10, rate=10.0),
+    "art.nelson-atkins.org": HostPolicy(concurrency=4, rate=2.0),
+    "collection.sdmart.org": HostPolicy(concurrency=4, rate=2.0),
+}
+
+MAX_RETRIES = 3
+TIMEOUT = 20
+BACKOFF = 2.0       # 第 n 次重试前等待 BACKOFF * 2^(n-1) 秒（加随机抖动）
+WORKERS = 32        # 同时处理的详情任务数，实际并发再由各域名的上限约束
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """按固定间隔为请求分配发送时间，保证每秒不超过 rate 次"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        delay = self.next_time - now
+        self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _decode(content, encoding, as_json):
+    text = content.decode(encoding or "utf-8", errors="replace")
+    return jsonlib.loads(text) if as_json else text
+
+
+class CrawlEngine:
+    """使用方式：async with CrawlEngine() as engine: rows = await engine.crawl(adapter)"""
+
+    def __init__(self, policies=HOST_POLICIES, default_policy=DEFAULT_POLICY, headers=HEADERS,
+                 rewrite=None, max_retries=MAX_RETRIES, timeout=TIMEOUT, workers=WORKERS, cache=None):
+        self.policies = policies
+        self.default_policy = default_policy
+        self.headers = headers
+        # rewrite(url) -> 实际请求的地址，用于把请求转发到本地 fixture 服务器；限速仍按原域名计算
+        self.rewrite = rewrite
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.workers = workers
+        self.cache = cache
+        self.session = None
+        self._hosts = {}
+        self.stats = defaultdict(Counter)
+
+    async def __aenter__(self):
+        per_host = max([p.concurrency for p in self.policies.values()] + [self.default_policy.concurrency])
+        connector = aiohttp.TCPConnector(limit=0, limit_per_host=per_host, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector, headers=self.headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _host(self, host):
+        if host not in self._hosts:
+            policy = self.policies.get(host, self.default_policy)
+            self._hosts[host] = (asyncio.Semaphore(policy.concurrency), RateLimiter(policy.rate))
+        return self._hosts[host]
+
+    async def fetch(self, url, method="GET", json=None, as_json=False):
+        """请求 url，返回文本（as_json 时返回解析后的 JSON）；多次失败或 4xx 时返回 None"""
+        host = urlsplit(url).netloc
+        cache, entry, body = self.cache, None, request_body(json)
+        if cache is not None:
+            entry = cache.lookup(method, url, body)
+            if entry is not None and cache.usable(entry):
+                cache.count("hit")
+                return _decode(cache.content(entry), entry.get("encoding"), as_json)
+            if cache.offline:
+                print(f"离线模式下缓存中没有: {url}")
+                cache.count("miss")
+                return None
+        semaphore, limiter = self._host(host)
+        target = self.rewrite(url) if self.rewrite else url
+        headers = HttpCache.conditional_headers(entry)
+        for attempt in range(1, self.max_retries + 1):
+            async with semaphore:
+                await limiter.wait()
+                start = time.perf_counter()
+                try:
+                    async with self.session.request(method, target, json=json, headers=headers) as resp:
+                        if resp.status == 304 and entry is not None:
+                            metrics.observe_request(url, time.perf_counter() - start, resp.status)
+                            cache.count("revalidated")
+                            cache.touch(method, url, body, entry)
+                            self.stats[host]["ok"] += 1
+                            self.stats[host]["seconds"] += time.perf_counter() - start
+                            return _decode(cache.content(entry), entry.get("encoding"), as_json)
+                        if resp.status < 400:
+                            content = await resp.read()
+                            metrics.observe_request(url, time.perf_counter() - start, resp.status, len(content))
+                            encoding = resp.charset or "utf-8"
+                            if cache is not None and resp.status == 200:
+                                cache.count("miss")
+                                cache.store(method, url, body, resp.status, resp.headers, content, encoding)
+                            self.stats[host]["ok"] += 1
+                            self.stats[host]["seconds"] += time.perf_counter() - start
+                            return _decode(content, encoding, as_json)
+                        metrics.observe_request(url, time.perf_counter() - start, resp.status)
+                        error = f"状态码 {resp.status}"
+                        if resp.status not in RETRY_STATUS:
+                            print(f"请求失败: {url} - {error}，不再重试")
+                            self.stats[host]["failed"] += 1
+                            return None
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    metrics.observe_request(url, time.perf_counter() - start, "error")
+                    error = repr(e)
+            self.stats[host]["retries"] += 1
+            print(f"请求失败（第{attempt}次）: {url} - {error}")
+            if attempt < self.max_retries:
+                await asyncio.sleep(BACKOFF * 2 ** (attempt - 1) * (0.5 + random.random()))
+        print(f"多次失败，跳过该URL: {url}")
+        self.stats[host]["failed"] += 1
+        return None
+
+    async def crawl(self, adapter, frontier=None, sink=None):
+        """列表页与详情页流水线执行，返回解析出的记录列表（顺序与完成顺序一致）。
+        传入 frontier 时跳过已完成的详情 URL，失败的 URL 记为 failed；
+        传入 sink 时记录直接写入 sink，不在内存中累积，返回空列表"""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.workers * 2)
+        records = []
+        parse_seconds = metrics.PARSE_SECONDS.labels(adapter.name)
+
+        def parse(item, body):
+            with parse_seconds.time():
+                return adapter.parse_detail(item, body)
+
+        async def produce():
+            try:
+                async for item in adapter.list_pages(self):
+                    if frontier is not None and frontier.add(adapter.detail_url(item), item) == "done":
+                        continue
+                    await queue.put(item)
+            finally:
+                for _ in range(self.workers):
+                    await queue.put(None)
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                url = adapter.detail_url(item)
+                body = await self.fetch(url, as_json=adapter.detail_json)
+                if body is None:
+                    if frontier is not None:
+                        frontier.mark_failed(url, "请求失败")
+                    continue
+                try:
+                    record = await loop.run_in_executor(None, parse, item, body)
+                except Exception as exc:
+                    print(f"解析详情页出错: {url} - {exc}")
+                    if frontier is not None:
+                        frontier.mark_failed(url, exc)
+                    continue
+                if sink is not None:
+                    sink.write(record or None, url)
+                elif record:
+                    records.append(record)
+
+        await asyncio.gather(produce(), *(work() for _ in range(self.workers)))
+        return records
+
+    def report(self, elapsed, count):
+        for host, c in sorted(self.stats.items()):
+            avg = c["seconds"] / c["ok"] if c["ok"] else 0.0
+            print(f"  {host}: 成功 {c['ok']} 次，重试 {c['retries']} 次，失败 {c['failed']} 次，"
+                  f"平均响应 {avg:.2f} 秒，{c['ok'] / max(elapsed, 1e-9):.1f} 请求/秒")
+        if self.cache is not None:
+            print(f"  {self.cache.summary()}")
+        print(f"共 {count} 条记录，耗时 {elapsed:.1f} 秒，{count / max(elapsed, 1e-9):.1f} 条/秒")
+
+
+def write_csv(path, columns, records):
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(records)
+
+
+async def run(adapter, output, rewrite=None, workers=WORKERS, cache=None, frontier=None):
+    """不传 frontier 时结束后一次写出 CSV；传入时边抓边追加写入，可断点续爬"""
+    start = time.perf_counter()
+    async with CrawlEngine(rewrite=rewrite, workers=workers, cache=cache) as engine:
+        if frontier is None:
+            records = await engine.crawl(adapter)
+            count = len(records)
+        else:
+            with RecordSink(output, adapter.columns, frontier) as sink:
+                records = await engine.crawl(adapter, frontier, sink)
+            count = sink.written
+    elapsed = time.perf_counter() - start
+    if frontier is None:
+        write_csv(output, adapter.columns, records)
+    engine.report(elapsed, count)
+    if frontier is not None:
+        print(frontier.summary())
+    print(f"已保存到 {output}")
+    return records
+
+
+if __name__ == "__main__":
+    from adapters import ADAPTERS
+
+    parser = argparse.ArgumentParser(description="用统一的异步引擎抓取博物馆藏品")
+    parser.add_argument("museum", choices=sorted(ADAPTERS))
+    parser.add_argument("--output", help="输出 CSV，默认使用适配器的文件名")
+    parser.add_argument("--max-pages", type=int, help="最多抓取的列表页数")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--fixtures", help="本地 fixture 服务器地址，例如 http://127.0.0.1:8765")
+    parser.add_argument("--no-cache", action="store_true", help="不使用磁盘响应缓存")
+    parser.add_argument("--ttl", type=float, help="缓存在该秒数内有效，期间不访问网络")
+    parser.add_argument("--offline", action="store_true", help="只回放缓存，不访问网络")
+    parser.add_argument("--no-resume", action="store_true", help="不记录进度，结束后一次写出 CSV")
+    parser.add_argument("--restart", action="store_true", help="清空该博物馆的进度和输出文件，从头开始")
+    args = parser.parse_args()
+
+    metrics.start_from_env()
+    adapter = ADAPTERS[args.museum](max_pages=args.max_pages)
+    rewrite = None
+    if args.fixtures:
+        from fixture_server import local_rewrite
+        rewrite = local_rewrite(args.fixtures)
+    cache = None
+    if not args.no_cache:
+        cache = HttpCache.from_env()
+        cache.ttl = args.ttl if args.ttl is not None else cache.ttl
+        cache.offline = args.offline or cache.offline
+    output = args.output or adapter.output
+    frontier = None
+    if not args.no_resume:
+        frontier = Frontier(adapter.name)
+        if args.restart:
+            frontier.reset()
+            if os.path.exists(output):
+                os.remove(output)
+    try:
+        asyncio.run(run(adapter, output, rewrite, args.workers, cache, frontier))
+    finally:
+        adapter.close()
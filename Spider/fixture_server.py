@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# fixture_server.py
+# 本地替身 HTTP 服务器：按 index.json 把请求映射到事先保存的页面，供 crawl_engine.py 离线测试。
+# 引擎把 https://host/path?query 改写为 http://127.0.0.1:端口/host/path?query，
+# 服务器据此还原原始 URL，用“方法 + URL（+ POST 请求体的哈希）”查找保存的文件。
+# 可用 --delay 模拟网络延迟，观察吞吐量是否只受各域名的并发与限速设置约束。
+#
+# 保存页面：python fixture_server.py record fixtures "https://art.nelson-atkins.org/..."
+#           python fixture_server.py record fixtures https://prod.philamuseumsearch.org/v1/search --json '{...}'
+# 启动服务：python fixture_server.py serve fixtures --port 8765 --delay 0.2
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+INDEX_FILE = "index.json"
+CONTENT_TYPES = {".json": "application/json", ".html": "text/html; charset=utf-8"}
+
+
+def fixture_key(method, url, body=b""):
+    """POST 请求体按规范化的 JSON 计算哈希，与空白、键顺序无关"""
+    key = f"{method.upper()} {url}"
+    if body:
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+        except ValueError:
+            pass
+        key += " " + hashlib.sha1(body).hexdigest()
+    return key
+
+
+def local_rewrite(base):
+    """返回把外部 URL 改写到本地服务器的函数"""
+    base = base.rstrip("/")
+
+    def rewrite(url):
+        parts = urlsplit(url)
+        return f"{base}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+    return rewrite
+
+
+def load_index(root):
+    path = os.path.join(root, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fixture(root, method, url, content, body=b"", suffix=".html"):
+    """保存一个页面并登记到 index.json，返回登记的键"""
+    os.makedirs(os.path.join(root, "files"), exist_ok=True)
+    key = fixture_key(method, url, body)
+    filename = os.path.join("files", hashlib.sha1(key.encode("utf-8")).hexdigest() + suffix)
+    with open(os.path.join(root, filename), "wb") as f:
+        f.write(content)
+    index = load_index(root)
+    index[key] = filename
+    with open(os.path.join(root, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    return key
+
+
+def record(root, url, payload=None):
+    """抓取真实页面并保存为 fixture"""
+    import requests
+    from crawl_engine import HEADERS
+
+    if payload is None:
+        resp = requests.get(url, headers=HEADERS, timeout=20)
+        body = b""
+    else:
+        resp = requests.post(url, headers=HEADERS, json=payload, timeout=20)
+        body = json.dumps(payload).encode("utf-8")
+    resp.raise_for_status()
+    suffix = ".json" if "json" in resp.headers.get("Content-Type", "") else ".html"
+    return save_fixture(root, "POST" if payload is not None else "GET", url, resp.content, body, suffix)
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, port=0, delay=0.0):
+        self.root = root
+        self.index = load_index(root)
+        self.delay = delay
+        self.hits = 0
+        self.misses = []
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """在后台线程中运行，返回自身"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def _serve(self, body=b""):
+        server = self.server
+        url = "https://" + self.path.lstrip("/")
+        filename = server.index.get(fixture_key(self.command, url, body))
+        if server.delay:
+            time.sleep(server.delay)
+        if filename is None:
+            server.misses.append(url)
+            self.send_error(404, "fixture not found")
+            return
+        with open(os.path.join(server.root, filename), "rb") as f:
+            content = f.read()
+        server.hits += 1
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES.get(os.path.splitext(filename)[1], "application/octet-stream"))
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        self._serve(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="保存页面或启动本地 fixture 服务器")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="抓取并保存页面")
+    rec.add_argument("root")
+    rec.add_argument("url")
+    rec.add_argument("--json", help="以 POST 发送的 JSON 请求体")
+    serve = sub.add_parser("serve", help="启动服务器")
+    serve.add_argument("root")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--delay", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(f"已保存：{record(args.root, args.url, json.loads(args.json) if args.json else None)}")
+    else:
+        server = FixtureServer(args.root, args.port, args.delay)
+        print(f"fixture 服务器已启动：{server.base_url}（{len(server.index)} 个页面）")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# frontier.py
+# 可断点续爬的抓取边界与流式结果输出：
+#   - Frontier：SQLite 中记录每个爬虫的列表页（页键 -> 条目数）和详情 URL 的状态（pending / done / failed），
+#     以及抓取详情所需的列表页数据；重启后已完成的页不再请求，只继续处理 pending 的 URL；
+#   - RecordSink：只追加的 CSV 输出，按批写入并 fsync，同一个事务里把这一批 URL 标记为 done、
+#     并记录文件长度。崩溃后重新打开时截断到最后一次提交的长度，每条记录恰好输出一次；
+# 两者都只在内存中保留一个批次，内存占用与藏品总数无关。
+#
+# 查看进度：python frontier.py [爬虫名]；把失败的 URL 重新放回队列：python frontier.py 爬虫名 --retry-failed
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FRONTIER_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontier.db")
+BATCH_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    crawl TEXT NOT NULL, page TEXT NOT NULL, total INTEGER NOT NULL, fetched_at REAL,
+    PRIMARY KEY (crawl, page));
+CREATE TABLE IF NOT EXISTS urls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    crawl TEXT NOT NULL, url TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending',
+    data TEXT, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, updated_at REAL,
+    UNIQUE (crawl, url));
+CREATE INDEX IF NOT EXISTS idx_urls_state ON urls (crawl, state, id);
+CREATE TABLE IF NOT EXISTS sinks (
+    crawl TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL,
+    PRIMARY KEY (crawl, path));
+"""
+
+
+class Frontier:
+    def __init__(self, crawl, path=FRONTIER_DB):
+        self.crawl = crawl
+        self.path = path
+        self._lock = threading.Lock()
+        # 已经由 iter_pending 交出、但还没有提交或标记失败的 URL，避免同一进程内重复交出
+        self._leased = set()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, statements):
+        """在一个事务中执行 [(sql, 参数)]"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self.conn.executemany(sql, params)
+                    else:
+                        self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    # ---------------- 列表页 ----------------
+
+    def page_count(self, page):
+        """已处理过的列表页返回当时的条目数，未处理返回 None"""
+        with self._lock:
+            row = self.conn.execute("SELECT total FROM pages WHERE crawl = ? AND page = ?",
+                                    (self.crawl, page)).fetchone()
+        return None if row is None else row[0]
+
+    def add_page(self, page, items, total=None):
+        """登记一个列表页及其中的详情 URL（[(url, 数据)]），已存在的 URL 保持原状态"""
+        items = list(items)
+        now = time.time()
+        self._write([
+            ("INSERT OR IGNORE INTO urls (crawl, url, data, updated_at) VALUES (?, ?, ?, ?)",
+             [(self.crawl, url, json.dumps(data, ensure_ascii=False), now) for url, data in items]),
+            ("INSERT OR REPLACE INTO pages (crawl, page, total, fetched_at) VALUES (?, ?, ?, ?)",
+             (self.crawl, page, len(items) if total is None else total, now)),
+        ])
+
+    # ---------------- 详情 URL ----------------
+
+    def add(self, url, data=None):
+        """登记一个 URL，返回它当前的状态"""
+        self._write([("INSERT OR IGNORE INTO urls (crawl, url, data, updated_at) VALUES (?, ?, ?, ?)",
+                      (self.crawl, url, json.dumps(data, ensure_ascii=False), time.time()))])
+        return self.state(url)
+
+    def state(self, url):
+        with self._lock:
+            row = self.conn.execute("SELECT state FROM urls WHERE crawl = ? AND url = ?",
+                                    (self.crawl, url)).fetchone()
+        return None if row is None else row[0]
+
+    def iter_pending(self, batch_size=500):
+        """按登记顺序分批取出 pending 的 (url, 数据)，每批单独查询；
+        交出的 URL 在 commit / mark_failed 之前不会被再次交出"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT id, url, data FROM urls WHERE crawl = ? AND state = 'pending' AND id > ? "
+                    "ORDER BY id LIMIT ?", (self.crawl, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row_id, url, data in rows:
+                with self._lock:
+                    if url in self._leased:
+                        continue
+                    self._leased.add(url)
+                yield url, json.loads(data) if data else None
+            last_id = rows[-1][0]
+
+    def mark_failed(self, url, error=""):
+        with self._lock:
+            self._leased.discard(url)
+        self._write([("UPDATE urls SET state = 'failed', attempts = attempts + 1, error = ?, updated_at = ? "
+                      "WHERE crawl = ? AND url = ?", (str(error), time.time(), self.crawl, url))])
+
+    def commit(self, done_urls, sink_path=None, sink_size=None):
+        """把一批 URL 标记为 done，并（可选）记录输出文件已经 fsync 的长度"""
+        statements = [("UPDATE urls SET state = 'done', attempts = attempts + 1, error = NULL, updated_at = ? "
+                       "WHERE crawl = ? AND url = ?", [(time.time(), self.crawl, url) for url in done_urls])]
+        if sink_path is not None:
+            statements.append(("INSERT OR REPLACE INTO sinks (crawl, path, size) VALUES (?, ?, ?)",
+                               (self.crawl, os.path.abspath(sink_path), sink_size)))
+        self._write(statements)
+        with self._lock:
+            self._leased.difference_update(done_urls)
+
+    def sink_size(self, sink_path):
+        with self._lock:
+            row = self.conn.execute("SELECT size FROM sinks WHERE crawl = ? AND path = ?",
+                                    (self.crawl, os.path.abspath(sink_path))).fetchone()
+        return None if row is None else row[0]
+
+    def retry_failed(self):
+        """把失败的 URL 放回 pending，返回数量"""
+        with self._lock:
+            count = self.conn.execute("UPDATE urls SET state = 'pending' WHERE crawl = ? AND state = 'failed'",
+                                      (self.crawl,)).rowcount
+        return count
+
+    def counts(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM urls WHERE crawl = ? GROUP BY state",
+                                     (self.crawl,)).fetchall()
+            pages = self.conn.execute("SELECT COUNT(*) FROM pages WHERE crawl = ?", (self.crawl,)).fetchone()[0]
+        return {"pages": pages, "pending": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def summary(self):
+        c = self.counts()
+        return f"列表页 {c['pages']} 个，详情 完成 {c['done']} / 待处理 {c['pending']} / 失败 {c['failed']}"
+
+    def reset(self):
+        """清空该爬虫的全部进度"""
+        self._write([(f"DELETE FROM {table} WHERE crawl = ?", (self.crawl,)) for table in ("pages", "urls", "sinks")])
+
+
+class RecordSink:
+    """只追加的 CSV 输出。write(记录, url) 先放入缓冲区，每 batch_size 个 URL 写入文件并 fsync，
+    再与 Frontier 一起提交；记录为 None 表示该 URL 已处理但没有输出（例如被筛掉）。"""
+
+    def __init__(self, path, columns, frontier=None, batch_size=BATCH_SIZE):
+        self.path = path
+        self.columns = list(columns)
+        self.frontier = frontier
+        self.batch_size = batch_size
+        self.rows, self.keys = [], []
+        self.written = 0
+        self._lock = threading.Lock()
+
+        committed = frontier.sink_size(path) if frontier is not None else None
+        if committed is not None and os.path.exists(path) and os.path.getsize(path) > committed:
+            # 上次崩溃时写了一半的批次，截断到最后一次提交的位置
+            with open(path, "r+b") as f:
+                f.truncate(committed)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                csv.writer(f).writerow(self.columns)
+                f.flush()
+                os.fsync(f.fileno())
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction="ignore")
+
+    def write(self, record, key=None):
+        with self._lock:
+            if record is not None:
+                self.rows.append(record)
+            if key is not None:
+                self.keys.append(key)
+            if max(len(self.rows), len(self.keys)) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.rows and not self.keys:
+            return
+        self.writer.writerows(self.rows)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        if self.frontier is not None:
+            self.frontier.commit(self.keys, self.path, os.fstat(self.file.fileno()).st_size)
+        self.written += len(self.rows)
+        self.rows, self.keys = [], []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查看或调整爬虫进度")
+    parser.add_argument("crawl", nargs="?", help="爬虫名，不填时列出所有爬虫")
+    parser.add_argument("--db", default=FRONTIER_DB)
+    parser.add_argument("--retry-failed", action="store_true", help="把失败的 URL 重新放回队列")
+    parser.add_argument("--reset", action="store_true", help="清空该爬虫的进度，从头开始")
+    args = parser.parse_args()
+
+    if args.crawl is None:
+        conn = sqlite3.connect(args.db)
+        names = [row[0] for row in conn.execute("SELECT DISTINCT crawl FROM urls UNION SELECT crawl FROM pages")]
+        conn.close()
+    else:
+        names = [args.crawl]
+    for name in names:
+        frontier = Frontier(name, args.db)
+        if args.retry_failed:
+            print(f"{name}：{frontier.retry_failed()} 个失败的 URL 已放回队列")
+        if args.reset:
+            frontier.reset()
+            print(f"{name}：进度已清空")
+        print(f"{name}：{frontier.summary()}")
+        frontier.close()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# html_extract.py
+# 基于 lxml 的快速抽取工具，供各爬虫的解析函数使用：
+#   - XPath 在模块加载时预编译，解析时不再逐个节点做 class 比较；
+#   - 文本规则与 BeautifulSoup 一致：text() 对应 get_text(strip=True)，strings() 对应 stripped_strings，
+#     都跳过注释以及 script/style/template 中的文字，保证新旧解析器输出逐字段相同（见 parser_bench.py）。
+
+from lxml import etree
+
+TEXT_NODES = etree.XPath(
+    ".//text()[not(ancestor::script or ancestor::style or ancestor::template or ancestor::rt or ancestor::rp)]")
+
+
+def parse(html):
+    """把页面文本解析为 lxml 树，空页面返回 None"""
+    if not html:
+        return None
+    try:
+        return etree.HTML(html)
+    except ValueError:
+        # 带 <?xml encoding=...?> 声明的字符串 lxml 不接受，改为按 UTF-8 字节解析
+        return etree.HTML(html.encode("utf-8"))
+
+
+def has_class(name):
+    """XPath 条件：class 属性中含有 name 这一项，对应 BeautifulSoup 的 class_=name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def first(xpath, node, **variables):
+    """执行预编译的 XPath，返回第一个结果，没有时返回 None"""
+    result = xpath(node, **variables)
+    return result[0] if result else None
+
+
+def strings(node):
+    return [s.strip() for s in TEXT_NODES(node) if s.strip()]
+
+
+def text(node):
+    return "".join(strings(node))
+
+
+def tail(node):
+    """元素之后紧跟的文字（BeautifulSoup 中的 next_sibling.strip()）"""
+    return (node.tail or "").strip()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# http_cache.py
+# 爬虫共用的磁盘响应缓存：
+#   - 以“方法 + URL + 规范化请求体”的 SHA1 为键，元数据（状态、ETag、Last-Modified、编码、抓取时间）
+#     存在 entries/ 下，响应内容按自身的 SHA1 存在 blobs/ 下，内容相同的页面只保存一份；
+#   - 默认每次都带 If-None-Match / If-Modified-Since 重新验证，服务器返回 304 时直接使用缓存内容；
+#   - 设置 ttl（秒）后，未过期的条目不再访问网络；离线模式只回放缓存，缺失时抛出 OfflineMiss。
+# 通过环境变量控制：CRAWL_CACHE_DIR（缓存目录）、CRAWL_CACHE_TTL（秒）、CRAWL_CACHE_OFFLINE=1。
+# 实际发出的请求和缓存命中情况同时记入仓库根目录 metrics.py 的运行指标。
+#
+# 查看缓存统计：python http_cache.py [缓存目录]
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import metrics
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache")
+
+
+class OfflineMiss(requests.RequestException):
+    """离线回放模式下缓存中没有该请求"""
+
+
+def request_body(json_data=None, data=None):
+    """请求体的规范形式：JSON 按键排序、去掉多余空白，保证同样的请求得到同样的键"""
+    if json_data is not None:
+        return json.dumps(json_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    return data or b""
+
+
+def cache_key(method, url, body=b""):
+    return hashlib.sha1(method.upper().encode() + b" " + url.encode("utf-8") + b"\n" + body).hexdigest()
+
+
+def _write_atomic(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+class HttpCache:
+    def __init__(self, root=CACHE_DIR, ttl=None, offline=False):
+        self.root = root
+        self.ttl = ttl
+        self.offline = offline
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        ttl = os.environ.get("CRAWL_CACHE_TTL")
+        return cls(root=os.environ.get("CRAWL_CACHE_DIR", CACHE_DIR),
+                   ttl=float(ttl) if ttl else None,
+                   offline=os.environ.get("CRAWL_CACHE_OFFLINE") == "1")
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, "entries", key[:2], key + ".json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+        metrics.CACHE_LOOKUPS.labels(name).inc()
+
+    def lookup(self, method, url, body=b""):
+        path = self._entry_path(cache_key(method, url, body))
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def usable(self, entry):
+        """离线模式或未超过 ttl 时直接使用，不访问网络"""
+        if self.offline:
+            return True
+        return self.ttl is not None and time.time() - entry["fetched_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def content(self, entry):
+        with open(self._blob_path(entry["blob"]), "rb") as f:
+            return f.read()
+
+    def store(self, method, url, body, status, headers, content, encoding=None):
+        """保存一次成功的响应，返回条目"""
+        digest = hashlib.sha1(content).hexdigest()
+        blob = self._blob_path(digest)
+        if not os.path.exists(blob):
+            _write_atomic(blob, content)
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "content_type": headers.get("Content-Type", ""),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "encoding": encoding,
+            "blob": digest,
+            "fetched_at": time.time(),
+        }
+        self._save_entry(cache_key(method, url, body), entry)
+        return entry
+
+    def touch(self, method, url, body, entry):
+        """304 之后刷新抓取时间，使 ttl 重新计时"""
+        entry = {**entry, "fetched_at": time.time()}
+        self._save_entry(cache_key(method, url, body), entry)
+        return entry
+
+    def _save_entry(self, key, entry):
+        _write_atomic(self._entry_path(key), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+    def summary(self):
+        s = self.stats
+        return f"缓存命中 {s['hit']} 次，304 重新验证 {s['revalidated']} 次，下载 {s['miss']} 次"
+
+
+class CachedResponse:
+    """与 requests.Response 用法相同的最小接口：status_code、headers、content、text、json()、raise_for_status()"""
+
+    def __init__(self, url, status_code, headers, content, encoding=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    @classmethod
+    def from_entry(cls, cache, entry):
+        return cls(entry["url"], entry["status"], {"Content-Type": entry["content_type"]},
+                   cache.content(entry), entry.get("encoding"), from_cache=True)
+
+
+def cached_request(session, method, url, cache, json=None, data=None, headers=None, **kwargs):
+    """经过缓存发送请求（session 为 requests.Session 或 requests 模块），返回 CachedResponse"""
+    body = request_body(json, data)
+    entry = cache.lookup(method, url, body)
+    if entry is not None and cache.usable(entry):
+        cache.count("hit")
+        return CachedResponse.from_entry(cache, entry)
+    if cache.offline:
+        raise OfflineMiss(f"离线模式下缓存中没有: {method} {url}")
+
+    headers = {**(headers or {}), **cache.conditional_headers(entry)}
+    start = time.perf_counter()
+    try:
+        resp = session.request(method, url, json=json, data=data, headers=headers, **kwargs)
+    except requests.RequestException:
+        metrics.observe_request(url, time.perf_counter() - start, "error")
+        raise
+    metrics.observe_request(url, time.perf_counter() - start, resp.status_code, len(resp.content))
+    if resp.status_code == 304 and entry is not None:
+        cache.count("revalidated")
+        return CachedResponse.from_entry(cache, cache.touch(method, url, body, entry))
+    if resp.status_code == 200:
+        cache.count("miss")
+        cache.store(method, url, body, resp.status_code, resp.headers, resp.content, resp.encoding)
+    return CachedResponse(url, resp.status_code, resp.headers, resp.content, resp.encoding)
+
+
+if __name__ == "__main__":
+    root = sys.argv[1] if len(sys.argv) > 1 else CACHE_DIR
+    entries = blobs = size = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if "entries" in dirpath:
+                entries += 1
+            else:
+                blobs += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+    print(f"{root}：{entries} 个请求，{blobs} 份不同的内容，共 {size / 1024 / 1024:.1f} MB")
@@ -1,9 +1,36 @@
+import os
+import sys
+import queue
+import argparse
+import threading
 import requests
 from bs4 import BeautifulSoup
-import pandas as pd
 import time
+from contextlib import nullcontext
+from functools import partial
 from urllib.parse import urljoin
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# 共用的磁盘响应缓存（Spider/http_cache.py），重复抓取时用条件请求重新验证，离线时直接回放
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import HttpCache, OfflineMiss, cached_request
+# 运行指标（仓库根目录的 metrics.py）：请求延迟、状态码由 cached_request 记录，这里另记详情页的解析耗时
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import metrics
+# 断点续爬（Spider/frontier.py）：已抓取的搜索页和文物记录在 frontier.db 中，结果边抓边追加写入 CSV
+from frontier import Frontier, RecordSink
+# lxml 快速抽取（Spider/html_extract.py），XPath 预编译
+from html_extract import etree, first, has_class, parse, text
+
+cache = HttpCache.from_env()
+PARSE_SECONDS = metrics.PARSE_SECONDS.labels('metmuseum')
+
+OUTPUT = 'met_chinese_artworks1.csv'
+COLUMNS = ['标题', '艺术家', '文化背景', '年代', '材质', '尺寸', '分类', '描述', '图片URL', '链接']
+PAGE_SIZE = 40
+MAX_WORKERS = 16         # 常驻的详情页线程数，即同时进行的请求数上限
+QUEUE_SIZE = MAX_WORKERS * 4  # 翻页线程最多领先的文物数，队列满时翻页暂停
+REQUEST_INTERVAL = 0.125  # 任意两个实际发出的请求之间的最小间隔（秒），即每秒最多 8 个请求
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
@@ -11,13 +38,37 @@ headers = {
 
 base_url = "https://www.metmuseum.org"
 
-# 通用的获取页面HTML的函数，如果网页请求失败，自动尝试最多5次，提升稳定性。
-def fetch_html(url, max_retries=5, timeout=20):
+
+# 按请求限速的 Session：所有线程共用，每个实际发出的请求按 REQUEST_INTERVAL 排队，缓存命中不经过这里
+class PoliteSession(requests.Session):
+    def __init__(self, interval):
+        super().__init__()
+        self.interval = interval
+        self.next_time = 0.0
+        self._lock = threading.Lock()
+
+    def request(self, *args, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+        return super().request(*args, **kwargs)
+
+
+session = PoliteSession(REQUEST_INTERVAL)
+
+# 通用的获取页面的函数，如果网页请求失败，自动尝试最多5次，提升稳定性；返回响应，失败时返回 None
+def fetch_response(url, max_retries=5, timeout=20):
     for attempt in range(1, max_retries + 1):
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
+            response = cached_request(session, 'GET', url, cache, headers=headers, timeout=timeout)
             response.raise_for_status()
-            return response.text
+            return response
+        except OfflineMiss as e:
+            print(e)
+            return None
         except requests.RequestException as e:
             print(f"请求失败（第{attempt}次）: {e}")
             if attempt == max_retries:
@@ -25,8 +76,13 @@ def fetch_html(url, max_retries=5, timeout=20):
                 return None
             time.sleep(2)  # 每次失败后休息2秒
 
-# 解析搜索结果页面
-def parse_search_results(html):
+# 获取页面HTML文本
+def fetch_html(url, max_retries=5, timeout=20):
+    response = fetch_response(url, max_retries, timeout)
+    return response.text if response is not None else None
+
+# 解析搜索结果页面（BeautifulSoup 参考实现，parser_bench.py 用它核对 parse_search_results 的输出）
+def parse_search_results_bs4(html):
     soup = BeautifulSoup(html, 'html.parser')
     artworks = []
 
@@ -55,8 +111,8 @@ def parse_search_results(html):
 
     return artworks
 
-# 解析文物详情页面
-def parse_artwork_details(html):
+# 解析文物详情页面（BeautifulSoup 参考实现，parser_bench.py 用它核对 parse_artwork_details 的输出）
+def parse_artwork_details_bs4(html):
     soup = BeautifulSoup(html, 'html.parser')
 
     details = {
@@ -94,6 +150,70 @@ def parse_artwork_details(html):
 
     return details
 
+SEARCH_ITEMS = etree.XPath(f"//figure[{has_class('collection-object_collectionObject__SuPct')}]")
+SEARCH_TITLE = etree.XPath(f".//a[{has_class('collection-object_link__qM3YR')}]")
+SEARCH_ARTIST = etree.XPath(f".//div[{has_class('collection-object_culture__BaSXn')}]")
+SEARCH_IMAGE = etree.XPath(f".//img[{has_class('collection-object_image__XVQPm')}]")
+DETAIL_DESC = etree.XPath("//div[normalize-space(@class)='artwork__intro__desc js-artwork__intro__desc']")
+DETAIL_OVERVIEW = etree.XPath("//section[@id='overview']")
+PARAGRAPHS = etree.XPath(".//p")
+OVERVIEW_FIELDS = [('Date:', '年代'), ('Culture:', '文化背景'), ('Medium:', '材质'),
+                   ('Dimensions:', '尺寸'), ('Classification:', '分类')]
+
+# 解析搜索结果页面（lxml）
+def parse_search_results(html):
+    root = parse(html)
+    if root is None:
+        return []
+    artworks = []
+    for item in SEARCH_ITEMS(root):
+        title_tag = first(SEARCH_TITLE, item)
+        title = text(title_tag) if title_tag is not None else "无标题"
+
+        artist_tag = first(SEARCH_ARTIST, item)
+        artist = text(artist_tag) if artist_tag is not None else "未知"
+
+        relative_url = title_tag.get('href', '') if title_tag is not None else ""
+        img_tag = first(SEARCH_IMAGE, item)
+
+        artworks.append({
+            '标题': title,
+            '艺术家': artist,
+            '链接': urljoin(base_url, relative_url),
+            '图片URL': img_tag.get('src', '') if img_tag is not None else ""
+        })
+    return artworks
+
+# 解析文物详情页面（lxml）
+def parse_artwork_details(html):
+    details = {
+        '文化背景': '未知文化',
+        '年代': '未知年代',
+        '材质': '未知材质',
+        '尺寸': '未知尺寸',
+        '分类': '未知分类',
+        '描述': '无描述'
+    }
+    root = parse(html)
+    if root is None:
+        return details
+
+    desc_div = first(DETAIL_DESC, root)
+    if desc_div is not None:
+        description = ' '.join(t for t in (text(p) for p in PARAGRAPHS(desc_div)) if t)
+        details['描述'] = ' '.join(description.split())
+
+    overview_section = first(DETAIL_OVERVIEW, root)
+    if overview_section is not None:
+        for p in PARAGRAPHS(overview_section):
+            value = text(p)
+            for label, field in OVERVIEW_FIELDS:
+                if label in value:
+                    details[field] = value.replace(label, '').strip()
+                    break
+
+    return details
+
 # 单个文物处理函数
 def process_artwork(artwork):
     detail_html = fetch_html(artwork['链接'])
@@ -101,8 +221,12 @@ def process_artwork(artwork):
         print(f"跳过文物：{artwork['标题']}")
         return None
 
-    artwork_details = parse_artwork_details(detail_html)
+    with PARSE_SECONDS.time():
+        artwork_details = parse_artwork_details(detail_html)
+    return build_record(artwork, artwork_details)
 
+# 由搜索结果中的文物和详情页字段组装一行数据
+def build_record(artwork, artwork_details):
     full_info = {
         '标题': artwork['标题'],
         '艺术家': artwork['艺术家'],
@@ -117,58 +241,125 @@ def process_artwork(artwork):
     }
     return full_info
 
-# 主程序
-def main():
-    all_artworks = []
-    offset = 0
-    page_size = 40
-    max_workers = 8
-
+# 解析进程中执行：由原始字节解码并解析详情页，返回 (字段 dict, 解析耗时)（模块级函数，可被子进程 pickle 调用）。
+# 子进程中的指标不会回到主进程，因此耗时随结果带回，由回调记录
+def parse_detail_content(content, encoding):
+    start = time.perf_counter()
+    details = parse_artwork_details(content.decode(encoding or 'utf-8', errors='replace'))
+    return details, time.perf_counter() - start
+
+# 翻页线程：先交出上次中断时未完成的文物，再逐页抓取搜索结果，登记到 frontier 后放入队列；
+# 队列满时阻塞，不会比详情线程领先太多。结束时为每个详情线程放入一个 None
+def page_producer(frontier, work_queue, workers):
+    try:
+        for item in frontier.iter_pending():
+            work_queue.put(item)
+
+        offset = 0
+        while True:
+            page = f"offset={offset}"
+            count = frontier.page_count(page)
+            if count is None:
+                search_url = f"https://www.metmuseum.org/art/collection/search?q=chinese&geolocation=China&offset={offset}"
+                print(f"\n正在抓取 offset={offset} 的搜索结果页面...")
+                search_html = fetch_html(search_url)
+                if not search_html:
+                    print("无法获取搜索结果，停止。")
+                    break
+
+                artworks = parse_search_results(search_html)
+                print(f"本页找到 {len(artworks)} 个文物。")
+                if not artworks:
+                    print("没有更多文物，抓取完成。")
+                    break
+                frontier.add_page(page, [(artwork['链接'], artwork) for artwork in artworks])
+                for item in frontier.iter_pending():
+                    work_queue.put(item)
+            else:
+                print(f"offset={offset} 的搜索结果已处理过（{count} 个文物），跳过。")
+            offset += PAGE_SIZE
+    finally:
+        for _ in range(workers):
+            work_queue.put(None)
+
+
+# 详情线程：不断从队列中取文物抓取详情，结果写入 sink，失败的记为 failed。
+# 传入 parse_pool 时线程只负责下载，原始字节交给解析进程，解析结果在回调中写入；
+# parse_slots 限制已下载、尚未解析完的页面数
+def detail_worker(frontier, sink, work_queue, parse_pool=None, parse_slots=None):
     while True:
-        search_url = f"https://www.metmuseum.org/art/collection/search?q=chinese&geolocation=China&offset={offset}"
-        print(f"\n正在抓取 offset={offset} 的搜索结果页面...")
-        search_html = fetch_html(search_url)
-        if not search_html:
-            print("无法获取搜索结果，停止。")
-            break
-
-        artworks = parse_search_results(search_html)
-        print(f"本页找到 {len(artworks)} 个文物。")
-
-        if not artworks:
-            print("没有更多文物，抓取完成。")
-            break
-
-        # 多线程处理当前页所有文物
+        item = work_queue.get()
+        if item is None:
+            return
+        url, artwork = item
+        if parse_pool is not None:
+            response = fetch_response(url)
+            if response is None:
+                print(f"跳过文物：{artwork['标题']}")
+                frontier.mark_failed(url, "请求失败")
+                continue
+            parse_slots.acquire()
+            future = parse_pool.submit(parse_detail_content, response.content, response.encoding)
+            future.add_done_callback(partial(finish_parse, frontier, sink, url, artwork, parse_slots))
+            continue
+        try:
+            result = process_artwork(artwork)
+        except Exception as exc:
+            print(f"处理文物时出错: {exc}")
+            frontier.mark_failed(url, exc)
+            continue
+        if result:
+            sink.write(result, url)
+        else:
+            frontier.mark_failed(url, "请求失败")
+
+
+# 解析进程完成后的回调（在进程池的管理线程中执行）
+def finish_parse(frontier, sink, url, artwork, parse_slots, future):
+    parse_slots.release()
+    try:
+        artwork_details, seconds = future.result()
+    except Exception as exc:
+        print(f"解析文物详情时出错: {exc}")
+        frontier.mark_failed(url, exc)
+        return
+    PARSE_SECONDS.observe(seconds)
+    sink.write(build_record(artwork, artwork_details), url)
+
+
+# 主程序：翻页与抓取详情流水线并行，已完成的搜索页和文物直接跳过，中断后再次运行从上次停下的位置继续。
+# processes 大于 0 时下载与解析分成两级：max_workers 个线程下载，processes 个进程解析，解析不再受 GIL 限制
+def main(max_workers=MAX_WORKERS, processes=0):
+    metrics.start_from_env()
+    frontier = Frontier('metmuseum')
+    work_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    parse_slots = threading.BoundedSemaphore(processes * 4) if processes else None
+    start = time.perf_counter()
+
+    with RecordSink(OUTPUT, COLUMNS, frontier) as sink, \
+            (ProcessPoolExecutor(max_workers=processes) if processes else nullcontext()) as parse_pool:
+        pager = threading.Thread(target=page_producer, args=(frontier, work_queue, max_workers), daemon=True)
+        pager.start()
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_artwork = {executor.submit(process_artwork, artwork): artwork for artwork in artworks}
-            for future in as_completed(future_to_artwork):
-                try:
-                    result = future.result()
-                    if result:
-                        all_artworks.append(result)
-                except Exception as exc:
-                    print(f"处理文物时出错: {exc}")
-
-        offset += page_size
-        time.sleep(2)
-
-    if all_artworks:
-        columns = ['标题', '艺术家', '文化背景', '年代', '材质', '尺寸', '分类', '描述', '图片URL', '链接']
-        df = pd.DataFrame(all_artworks)
-
-        for col in columns:
-            if col not in df.columns:
-                df[col] = ''
-
-        df = df[columns]
-
-        df.to_csv('met_chinese_artworks1.csv', index=False, encoding='utf-8-sig')
-        print("\n全部数据已保存为 met_chinese_artworks1.csv")
-        print("\n示例数据:")
-        print(df.head())
+            workers = [executor.submit(detail_worker, frontier, sink, work_queue, parse_pool, parse_slots)
+                       for _ in range(max_workers)]
+            for worker in workers:
+                worker.result()
+        pager.join()
+
+    elapsed = time.perf_counter() - start
+    print(cache.summary())
+    print(frontier.summary())
+    if sink.written:
+        print(f"\n本次新增 {sink.written} 条，耗时 {elapsed:.1f} 秒（{sink.written / elapsed:.1f} 条/秒），"
+              f"全部数据保存在 {OUTPUT}")
     else:
-        print("没有获取到有效数据。")
+        print("本次没有获取到新数据。")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="抓取大都会艺术博物馆的中国文物")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="下载详情页的线程数")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="解析详情页的进程数，0 表示在下载线程中直接解析；页面多、CPU 核数多时可设为核数")
+    args = parser.parse_args()
+    main(args.workers, args.processes)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# parser_bench.py
+# 解析器基准：对保存下来的页面（fixture_server.py 的 fixture 目录，或 http_cache.py 的缓存目录）
+# 分别运行 BeautifulSoup 参考实现（*_bs4）和 lxml 快速实现，逐字段比较输出，并报告每秒解析的页数。
+# 页面按 URL 归类到各解析器；有字段不一致时列出前几处并以非零状态退出。
+# 默认使用仓库中的 fixtures/parser_corpus：大都会的搜索页、详情页与圣地亚哥的列表页、详情页，
+# 按真实页面的结构生成，包含导航噪声、注释、脚本、缺失的简介/概览等边界情况。
+#
+# 用法：python parser_bench.py
+#       python parser_bench.py fixtures
+#       python parser_bench.py http_cache --kind met_detail --repeat 10
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+from bs4 import BeautifulSoup
+
+from adapters import load_script
+from fixture_server import INDEX_FILE, load_index
+
+MET_SCRIPT = os.path.join("metmuseum", "metmuseum_final.py")
+SDMART_SCRIPT = os.path.join("圣地亚哥艺术博物馆", "圣地亚哥艺术博物馆.py")
+SDMART_BASE = 'https://collection.sdmart.org'
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "parser_corpus")
+
+# pattern：匹配页面 URL；load()：返回 (旧解析器, 新解析器)，两者都以 (url, html) 调用
+ParserKind = namedtuple("ParserKind", ["pattern", "load"])
+
+
+def _met(old_name, new_name):
+    def load():
+        script = load_script(MET_SCRIPT)
+        old, new = getattr(script, old_name), getattr(script, new_name)
+        return (lambda url, html: old(html)), (lambda url, html: new(html))
+    return load
+
+
+def _sdmart_links():
+    script = load_script(SDMART_SCRIPT)
+    return ((lambda url, html: script.parse_portfolio_links_bs4(BeautifulSoup(html, 'html.parser'))),
+            (lambda url, html: script.parse_portfolio_links(html)))
+
+
+def _sdmart_detail():
+    script = load_script(SDMART_SCRIPT)
+    return ((lambda url, html: script.parse_artifact_details_bs4(BeautifulSoup(html, 'html.parser'), SDMART_BASE, url)),
+            (lambda url, html: script.parse_artifact_details(html, SDMART_BASE, url)))
+
+
+KINDS = {
+    "met_search": ParserKind(re.compile(r"metmuseum\.org/art/collection/search\?"),
+                             _met("parse_search_results_bs4", "parse_search_results")),
+    "met_detail": ParserKind(re.compile(r"metmuseum\.org/art/collection/search/\d+"),
+                             _met("parse_artwork_details_bs4", "parse_artwork_details")),
+    "sdmart_list": ParserKind(re.compile(r"collection\.sdmart\.org/objects-1/portfolio"), _sdmart_links),
+    "sdmart_detail": ParserKind(re.compile(r"collection\.sdmart\.org/objects-1/info"), _sdmart_detail),
+}
+
+
+def load_corpus(root):
+    """返回 [(url, html)]：fixture 目录读 index.json，缓存目录读 entries/ 下的元数据"""
+    pages = []
+    if os.path.exists(os.path.join(root, INDEX_FILE)):
+        for key, filename in load_index(root).items():
+            method, url = key.split(" ")[:2]
+            if method == "GET":
+                with open(os.path.join(root, filename), "rb") as f:
+                    pages.append((url, f.read().decode("utf-8", errors="replace")))
+        return pages
+    for dirpath, _, filenames in os.walk(os.path.join(root, "entries")):
+        for name in filenames:
+            with open(os.path.join(dirpath, name), encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry["method"] != "GET":
+                continue
+            blob = os.path.join(root, "blobs", entry["blob"][:2], entry["blob"])
+            with open(blob, "rb") as f:
+                pages.append((entry["url"], f.read().decode(entry.get("encoding") or "utf-8", errors="replace")))
+    return pages
+
+
+def diff(old, new, path=""):
+    """逐字段比较两份输出，返回 [(字段路径, 旧值, 新值)]"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        return [d for key in dict.fromkeys([*old, *new]) for d in diff(old.get(key), new.get(key), f"{path}.{key}")]
+    if isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)) and len(old) == len(new):
+        return [d for i, (a, b) in enumerate(zip(old, new)) for d in diff(a, b, f"{path}[{i}]")]
+    return [] if old == new else [(path or ".", old, new)]
+
+
+def pages_per_second(parser, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for url, html in pages:
+            parser(url, html)
+    return len(pages) * repeat / max(time.perf_counter() - start, 1e-9)
+
+
+def run(root, kinds=None, repeat=3, show=5):
+    """返回字段不一致的总数"""
+    corpus = load_corpus(root)
+    print(f"{root}：共 {len(corpus)} 个 GET 页面")
+    total = 0
+    for name in kinds or KINDS:
+        kind = KINDS[name]
+        pages = [(url, html) for url, html in corpus if kind.pattern.search(url)]
+        if not pages:
+            continue
+        try:
+            old, new = kind.load()
+        except ImportError as e:
+            print(f"{name}：无法加载解析器（{e}），跳过")
+            continue
+
+        mismatches = [(url, *d) for url, html in pages for d in diff(old(url, html), new(url, html))]
+        old_rate = pages_per_second(old, pages, repeat)
+        new_rate = pages_per_second(new, pages, repeat)
+        print(f"{name}：{len(pages)} 个页面，BeautifulSoup {old_rate:.1f} 页/秒，lxml {new_rate:.1f} 页/秒"
+              f"（{new_rate / old_rate:.1f} 倍），字段不一致 {len(mismatches)} 处")
+        for url, field, a, b in mismatches[:show]:
+            print(f"  {url} {field}：{a!r} != {b!r}")
+        total += len(mismatches)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比较新旧 HTML 解析器的速度与输出")
+    parser.add_argument("root", nargs="?", default=DEFAULT_CORPUS,
+                        help="fixture 目录或 http_cache 缓存目录，默认为仓库中的 fixtures/parser_corpus")
+    parser.add_argument("--kind", action="append", choices=sorted(KINDS), help="只测试指定的页面类型，可重复")
+    parser.add_argument("--repeat", type=int, default=3, help="每个页面解析的次数")
+    args = parser.parse_args()
+
+    # 圣地亚哥的解析函数逐字段打印 INFO 日志，测速时关闭
+    logging.disable(logging.INFO)
+    sys.exit(1 if run(args.root, args.kind, args.repeat) else 0)
@@ -1,75 +1,256 @@
+# 圣地亚哥艺术博物馆爬虫：
+#   - 静态快速路径：先直接请求页面 HTML，字段已经齐全（列表页已有整页的条目）时不启动浏览器；
+#   - 否则交给无头浏览器池（Chrome / Firefox / Edge，每个线程一个实例，按需启动），
+#     用 WebDriverWait 等待页面内容出现，不再固定等待；
+#   - 详情页进度记录在 frontier.db 中，可断点续爬；--fixtures 指向 fixture_server.py 可离线测试。
+#
+# 用法：python 圣地亚哥艺术博物馆.py                      （抓取 museum_13_links.csv 中的详情页）
+#       python 圣地亚哥艺术博物馆.py --links --workers 6    （先重新抓取列表页）
+
+import os
+import sys
 import time
 import csv
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+import requests
 from selenium import webdriver
-from selenium.webdriver.edge.service import Service
-from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from requests.exceptions import ReadTimeout
-from selenium.common.exceptions import WebDriverException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import logging
-import chardet
+
+# 断点续爬（Spider/frontier.py）：详情页链接及其状态记录在 frontier.db 中，结果每 10 条追加写入一次
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from frontier import Frontier, RecordSink
+# lxml 快速抽取（Spider/html_extract.py），XPath 预编译
+from html_extract import etree, first, has_class, parse, strings, tail
+# 静态快速路径经过共用的磁盘响应缓存（Spider/http_cache.py）
+from http_cache import HttpCache, OfflineMiss, cached_request
+# 运行指标（仓库根目录的 metrics.py）：静态请求由 cached_request 记录，浏览器加载页面的耗时记为状态 browser
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import metrics
+
+COLUMNS = ['名称', '创作日期', '创作地点', '图片链接', '类型', '材质', '入藏信息', '藏品编号', '尺寸', '详细描述']
+BASE_URL = 'https://collection.sdmart.org'
+LIST_URL = BASE_URL + '/objects-1/portfolio?records=50&query=Creation_Place2%20has%20words%20%22china%22&sort=9&page='
+TOTAL_PAGES = 44
+RECORDS_PER_PAGE = 50   # 与 LIST_URL 中的 records=50 一致
+
+BROWSER = os.environ.get('SDMART_BROWSER', 'chrome')  # chrome / firefox / edge
+DRIVER_PATH = os.environ.get('SDMART_DRIVER')         # 浏览器驱动路径，不设置时由 Selenium Manager 自动查找
+POOL_SIZE = 4           # 并行的浏览器（线程）数
+PAGE_TIMEOUT = 20       # 页面加载与等待内容出现的最长时间（秒）
+NOTES_TIMEOUT = 3       # 等待“详细描述”折叠面板展开的最长时间（秒）
+SCROLL_TIMEOUT = 10     # 列表页滚动到高度不再增长的最长时间（秒）
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
+}
+
+cache = HttpCache.from_env()
+session = requests.Session()
+PARSE_SECONDS = metrics.PARSE_SECONDS.labels('sdmart')
 
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def scroll_page_to_bottom(driver):
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
+def make_driver(browser=BROWSER, driver_path=DRIVER_PATH):
+    """启动一个无头浏览器，不加载图片"""
+    if browser == 'firefox':
+        options = webdriver.FirefoxOptions()
+        options.add_argument('-headless')
+        options.set_preference('permissions.default.image', 2)
+        service = webdriver.FirefoxService(executable_path=driver_path) if driver_path else None
+        driver = webdriver.Firefox(options=options, service=service)
+    else:
+        options = webdriver.EdgeOptions() if browser == 'edge' else webdriver.ChromeOptions()
+        for argument in ('--headless=new', '--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu',
+                         '--blink-settings=imagesEnabled=false', '--window-size=1280,2000'):
+            options.add_argument(argument)
+        if browser == 'edge':
+            service = webdriver.EdgeService(executable_path=driver_path) if driver_path else None
+            driver = webdriver.Edge(options=options, service=service)
+        else:
+            service = webdriver.ChromeService(executable_path=driver_path) if driver_path else None
+            driver = webdriver.Chrome(options=options, service=service)
+    driver.set_page_load_timeout(PAGE_TIMEOUT)
+    return driver
+
+
+class BrowserPool:
+    """每个工作线程一个浏览器实例，第一次需要时才启动，全部走静态快速路径时不会启动浏览器。
+    rewrite(url) 返回实际访问的地址，用于把请求转发到本地 fixture 服务器"""
+
+    def __init__(self, browser=BROWSER, driver_path=DRIVER_PATH, rewrite=None):
+        self.browser = browser
+        self.driver_path = driver_path
+        self.rewrite = rewrite
+        self.stats = Counter()
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def target(self, url):
+        return self.rewrite(url) if self.rewrite else url
+
+    def driver(self):
+        driver = getattr(self._local, 'driver', None)
+        if driver is None:
+            driver = make_driver(self.browser, self.driver_path)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def discard(self):
+        """浏览器出错后关闭当前线程的实例，下次使用时重新启动"""
+        driver = getattr(self._local, 'driver', None)
+        self._local.driver = None
+        if driver is not None:
+            with self._lock:
+                self._drivers.remove(driver)
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def close(self):
+        for driver in self._drivers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+        self._drivers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def fetch_static(url):
+    """不经过浏览器直接请求页面，失败时返回 None"""
+    try:
+        response = cached_request(session, 'GET', url, cache, headers=HEADERS, timeout=PAGE_TIMEOUT)
+        response.raise_for_status()
+        return response.text
+    except OfflineMiss:
+        return None
+    except requests.RequestException as e:
+        logging.warning(f"静态请求 {url} 失败: {e}")
+        return None
+
+
+def scroll_page_to_bottom(driver, timeout=SCROLL_TIMEOUT):
+    """滚动到底部，直到两次轮询之间页面高度不再增长（不再每次固定等待 2 秒）"""
+    heights = []
+
+    def settled(d):
+        d.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        heights.append(d.execute_script("return document.body.scrollHeight"))
+        return len(heights) >= 2 and heights[-1] == heights[-2]
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.5).until(settled)
+    except TimeoutException:
+        logging.warning("页面高度持续变化，停止滚动。")
+
+
+# 从列表页中提取文物详情页的相对链接（BeautifulSoup 参考实现，parser_bench.py 用它核对 parse_portfolio_links）
+def parse_portfolio_links_bs4(soup):
+    links = []
+    for link in soup.find_all('a', title="Open object description"):
+        href = link.get('href')
+        logging.info(f"找到链接: {href}")
+        if href:
+            links.append(href)
+    return links
+
+
+PORTFOLIO_LINKS = etree.XPath("//a[@title='Open object description']/@href")
+
+
+# 从列表页中提取文物详情页的相对链接（lxml）
+def parse_portfolio_links(html):
+    root = parse(html)
+    links = []
+    for href in (PORTFOLIO_LINKS(root) if root is not None else []):
+        logging.info(f"找到链接: {href}")
+        if href:
+            links.append(str(href))
+    return links
+
+
+def static_list_complete(links, page):
+    """静态列表页中已有该页的全部条目：最后一页之前每页应有 RECORDS_PER_PAGE 个链接；
+    最后一页的条目数无法从静态 HTML 得知，视为不完整。懒加载的条目只有浏览器滚动后才会出现"""
+    return page < TOTAL_PAGES - 1 and len(links) >= RECORDS_PER_PAGE
 
 
-def crawl_single_page(driver, url, max_retries=3):
+def crawl_single_page(pool, url, page, use_static=True, max_retries=3):
+    if use_static:
+        html = fetch_static(pool.target(url))
+        links = parse_portfolio_links(html) if html else []
+        if static_list_complete(links, page):
+            pool.count('static')
+            return links
+        if links:
+            logging.info(f"第 {page} 页静态 HTML 只有 {len(links)} 个链接，改用浏览器加载")
+
     retries = 0
     while retries < max_retries:
         try:
-            driver.get(url)
-            time.sleep(5)
+            start = time.perf_counter()
+            driver = pool.driver()
+            driver.get(pool.target(url))
+            WebDriverWait(driver, PAGE_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "a[title='Open object description']")))
 
-            # 滚动页面到底部
+            # 滚动页面到底部，等待懒加载的条目
             scroll_page_to_bottom(driver)
 
-            page_source = driver.page_source
-            # 检测编码
-            encoding = chardet.detect(page_source.encode())['encoding']
-            soup = BeautifulSoup(page_source.encode().decode(encoding), 'html.parser')
-
-            links = []
-            for link in soup.find_all('a', title="Open object description"):
-                href = link.get('href')
-                logging.info(f"找到链接: {href}")
-                if href:
-                    links.append(href)
-            return links
+            pool.count('browser')
+            # page_source 已经是解码后的字符串，直接解析
+            html = driver.page_source
+            metrics.observe_request(url, time.perf_counter() - start, 'browser', len(html))
+            return parse_portfolio_links(html)
         except (ReadTimeout, WebDriverException) as e:
+            metrics.observe_request(url, time.perf_counter() - start, 'error')
             logging.warning(f"请求页面 {url} 时出现错误: {e}，正在重试第 {retries + 1} 次...")
+            if not isinstance(e, TimeoutException):
+                pool.discard()
             retries += 1
-            time.sleep(5)
+            time.sleep(2 ** retries)
     logging.error(f"请求页面 {url} 失败，已达到最大重试次数。")
     return []
 
 
-def crawl_museum():
-    base_url = 'https://collection.sdmart.org/objects-1/portfolio?records=50&query=Creation_Place2%20has%20words%20%22china%22&sort=9&page='
-    service = Service('D:\Desktop\msedgedriver.exe')
-    driver = webdriver.Edge(service=service)
+# 并行抓取全部列表页，链接按页码顺序写入 museum_13_links.csv
+def crawl_museum(workers=POOL_SIZE, browser=BROWSER, rewrite=None, use_static=True):
+    pages = range(0, TOTAL_PAGES)
 
     all_links = []
-    try:
-        for page in range(0, 44):
-            logging.info(f"正在处理第 {page} 页")
-            time.sleep(1)
-            url = base_url + str(page)
-            page_links = crawl_single_page(driver, url)
-            all_links.extend(page_links)
-    except Exception as e:
-        logging.error(f"发生未知错误: {e}")
-    finally:
-        driver.quit()
+    with BrowserPool(browser, rewrite=rewrite) as pool, ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for page, page_links in enumerate(executor.map(
+                    lambda page: crawl_single_page(pool, LIST_URL + str(page), page, use_static), pages)):
+                logging.info(f"第 {page} 页找到 {len(page_links)} 个链接")
+                all_links.extend(page_links)
+        except Exception as e:
+            logging.error(f"发生未知错误: {e}")
+        logging.info(f"静态页面 {pool.stats['static']} 个，浏览器渲染 {pool.stats['browser']} 个")
 
     with open('museum_13_links.csv', 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
@@ -87,144 +268,242 @@ def get_element_text(soup, element_type, element_text, default=""):
     return default
 
 
-def crawl_artifact_details(base_url, driver, url, max_retries=3):
+# 解析文物详情页，返回 (名称, 创作日期, 创作地点, 图片链接, 类型, 材质, 入藏信息, 藏品编号, 尺寸, 详细描述)
+# （BeautifulSoup 参考实现，parser_bench.py 用它核对 parse_artifact_details 的输出）
+def parse_artifact_details_bs4(soup, base_url, url):
+    name_text = ""
+    if "objectName=" in url:
+        name_text = url.split("objectName=")[1]
+
+    logging.info(f"文物名称: {name_text}")
+
+    creation_date = get_element_text(soup, 'strong', 'Creation date:')
+    logging.info(f"创作日期: {creation_date}")
+
+    creation_place = get_element_text(soup, 'strong', 'Creation place:')
+    logging.info(f"创作地点: {creation_place}")
+
+    parent_element1 = soup.find('a', class_='highslide')
+    img_src = ""
+    if parent_element1:
+        target_img = parent_element1.find('img')
+        if target_img:
+            img_src = base_url + target_img.get('src')
+        else:
+            logging.warning("父元素中未找到 img 标签。")
+    else:
+        logging.warning("未找到符合条件的父元素。")
+    logging.info(f"图片链接: {img_src}")
+    parent_element2 = soup.find('div',
+                                class_='content col-md-12')
+    type_ = ""
+    medium = ""
+    Credit_Line = ""
+    Accession_Number = ""
+    Dimensions = ""
+    if parent_element2:
+        divs = parent_element2.find_all('div')
+        for div in divs:
+            type_strong = div.find('strong', string='Type:')
+            if type_strong:
+                type_ = type_strong.next_sibling.strip()
+            medium_strong = div.find('strong', string='Medium and Support:')
+            if medium_strong:
+                medium = medium_strong.next_sibling.strip()
+            Credit_Line_strong = div.find('strong', string='Credit Line:')
+            if Credit_Line_strong:
+                Credit_Line = Credit_Line_strong.next_sibling.strip()
+            Accession_Number_strong = div.find('strong', string='Accession Number:')
+            if Accession_Number_strong:
+                Accession_Number = Accession_Number_strong.next_sibling.strip()
+            Dimensions_strong = div.find('strong', string='Dimensions:')
+            if Dimensions_strong:
+                Dimensions = Dimensions_strong.next_sibling.strip()
+
+
+    target_div = soup.find('div', class_='embarkInfoNotes ui-accordion-content ui-corner-bottom ui-helper-reset ui-widget-content ui-accordion-content-active')
+    combined_text = ""
+    if target_div:
+        text_pieces = [part.strip() for part in target_div.stripped_strings]
+        combined_text = " ".join(text_pieces)
+    logging.info(f"详细描述: {combined_text}")
+    return name_text, creation_date, creation_place, img_src, type_, medium, Credit_Line, Accession_Number, Dimensions, combined_text
+
+
+LABELLED_TEXT = etree.XPath("(//strong[. = $label])[1]")
+HIGHSLIDE_LINK = etree.XPath(f"//a[{has_class('highslide')}]")
+FIRST_IMG = etree.XPath(".//img")
+CONTENT_DIV = etree.XPath("//div[normalize-space(@class)='content col-md-12']")
+DIVS_WITH_LABEL = etree.XPath(".//div[.//strong[. = $label]]")
+LABEL_IN_DIV = etree.XPath(".//strong[. = $label]")
+NOTES_DIV = etree.XPath("//div[normalize-space(@class)='embarkInfoNotes ui-accordion-content ui-corner-bottom "
+                        "ui-helper-reset ui-widget-content ui-accordion-content-active']")
+CONTENT_LABELS = ['Type:', 'Medium and Support:', 'Credit Line:', 'Accession Number:', 'Dimensions:']
+
+
+def labelled_text(root, label):
+    element = first(LABELLED_TEXT, root, label=label)
+    return tail(element) if element is not None else ""
+
+
+# 解析文物详情页（lxml），返回值与 parse_artifact_details_bs4 相同
+def parse_artifact_details(html, base_url, url):
+    root = parse(html)
+    if root is None:
+        root = etree.HTML("<html></html>")
+    name_text = ""
+    if "objectName=" in url:
+        name_text = url.split("objectName=")[1]
+
+    logging.info(f"文物名称: {name_text}")
+
+    creation_date = labelled_text(root, 'Creation date:')
+    logging.info(f"创作日期: {creation_date}")
+
+    creation_place = labelled_text(root, 'Creation place:')
+    logging.info(f"创作地点: {creation_place}")
+
+    img_src = ""
+    link = first(HIGHSLIDE_LINK, root)
+    if link is not None:
+        target_img = first(FIRST_IMG, link)
+        if target_img is not None:
+            img_src = base_url + target_img.get('src', '')
+        else:
+            logging.warning("父元素中未找到 img 标签。")
+    else:
+        logging.warning("未找到符合条件的父元素。")
+    logging.info(f"图片链接: {img_src}")
+
+    # 与参考实现相同：取最后一个含该标签的 div 中的第一个标签
+    values = dict.fromkeys(CONTENT_LABELS, "")
+    content = first(CONTENT_DIV, root)
+    if content is not None:
+        for label in CONTENT_LABELS:
+            divs = DIVS_WITH_LABEL(content, label=label)
+            if divs:
+                values[label] = tail(LABEL_IN_DIV(divs[-1], label=label)[0])
+    type_, medium, Credit_Line, Accession_Number, Dimensions = (values[label] for label in CONTENT_LABELS)
+
+    notes = first(NOTES_DIV, root)
+    combined_text = " ".join(strings(notes)) if notes is not None else ""
+    logging.info(f"详细描述: {combined_text}")
+    return name_text, creation_date, creation_place, img_src, type_, medium, Credit_Line, Accession_Number, Dimensions, combined_text
+
+
+NOTES_ANY = etree.XPath(f"//div[{has_class('embarkInfoNotes')}]")
+
+
+def static_complete(html):
+    """静态 HTML 中已有全部字段：信息区存在，且没有需要脚本展开的“详细描述”面板"""
+    root = parse(html)
+    if root is None or first(CONTENT_DIV, root) is None:
+        return False
+    return first(NOTES_ANY, root) is None or first(NOTES_DIV, root) is not None
+
+
+def crawl_artifact_details(pool, url, use_static=True, max_retries=3):
+    if use_static:
+        html = fetch_static(pool.target(url))
+        if html and static_complete(html):
+            pool.count('static')
+            with PARSE_SECONDS.time():
+                return parse_artifact_details(html, BASE_URL, url)
+
     retries = 0
     while retries < max_retries:
         try:
-            driver.get(url)
-            time.sleep(5)
-
-            # 滚动页面到底部
-            scroll_page_to_bottom(driver)
-
-            page_source = driver.page_source
-            # 检测编码
-            encoding = chardet.detect(page_source.encode())['encoding']
-            soup = BeautifulSoup(page_source.encode().decode(encoding), 'html.parser')
-            time.sleep(5)
-            name_text = ""
-            if "objectName=" in url:
-                name_text = url.split("objectName=")[1]
-
-            logging.info(f"文物名称: {name_text}")
-
-            creation_date = get_element_text(soup, 'strong', 'Creation date:')
-            logging.info(f"创作日期: {creation_date}")
-
-            creation_place = get_element_text(soup, 'strong', 'Creation place:')
-            logging.info(f"创作地点: {creation_place}")
-
-            parent_element1 = soup.find('a', class_='highslide')
-            img_src = ""
-            if parent_element1:
-                target_img = parent_element1.find('img')
-                if target_img:
-                    img_src = base_url + target_img.get('src')
-                else:
-                    logging.warning("父元素中未找到 img 标签。")
-            else:
-                logging.warning("未找到符合条件的父元素。")
-            logging.info(f"图片链接: {img_src}")
-            time.sleep(5)
-            parent_element2 = soup.find('div',
-                                        class_='content col-md-12')
-            type_ = ""
-            medium = ""
-            Credit_Line = ""
-            Accession_Number = ""
-            Dimensions = ""
-            if parent_element2:
-                divs = parent_element2.find_all('div')
-                for div in divs:
-                    type_strong = div.find('strong', string='Type:')
-                    if type_strong:
-                        type_ = type_strong.next_sibling.strip()
-                    medium_strong = div.find('strong', string='Medium and Support:')
-                    if medium_strong:
-                        medium = medium_strong.next_sibling.strip()
-                    Credit_Line_strong = div.find('strong', string='Credit Line:')
-                    if Credit_Line_strong:
-                        Credit_Line = Credit_Line_strong.next_sibling.strip()
-                    Accession_Number_strong = div.find('strong', string='Accession Number:')
-                    if Accession_Number_strong:
-                        Accession_Number = Accession_Number_strong.next_sibling.strip()
-                    Dimensions_strong = div.find('strong', string='Dimensions:')
-                    if Dimensions_strong:
-                        Dimensions = Dimensions_strong.next_sibling.strip()
-
-
-            target_div = soup.find('div', class_='embarkInfoNotes ui-accordion-content ui-corner-bottom ui-helper-reset ui-widget-content ui-accordion-content-active')
-            combined_text = ""
-            if target_div:
-                text_pieces = [part.strip() for part in target_div.stripped_strings]
-                combined_text = " ".join(text_pieces)
-            logging.info(f"详细描述: {combined_text}")
-            return name_text, creation_date, creation_place, img_src, type_, medium, Credit_Line, Accession_Number, Dimensions, combined_text
+            start = time.perf_counter()
+            driver = pool.driver()
+            driver.get(pool.target(url))
+            WebDriverWait(driver, PAGE_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'div.content.col-md-12')))
+            if driver.find_elements(By.CSS_SELECTOR, 'div.embarkInfoNotes'):
+                try:
+                    WebDriverWait(driver, NOTES_TIMEOUT).until(EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, 'div.embarkInfoNotes.ui-accordion-content-active')))
+                except TimeoutException:
+                    logging.warning(f"详细描述面板未展开: {url}")
+
+            pool.count('browser')
+            html = driver.page_source
+            metrics.observe_request(url, time.perf_counter() - start, 'browser', len(html))
+            with PARSE_SECONDS.time():
+                return parse_artifact_details(html, BASE_URL, url)
         except (ReadTimeout, WebDriverException) as e:
+            metrics.observe_request(url, time.perf_counter() - start, 'error')
             logging.warning(f"请求页面 {url} 时出现错误: {e}，正在重试第 {retries + 1} 次...")
+            if not isinstance(e, TimeoutException):
+                pool.discard()
             retries += 1
-            time.sleep(5)
+            time.sleep(2 ** retries)
     logging.error(f"请求页面 {url} 失败，已达到最大重试次数。")
     return "", "", "", "", "", "", "", "", "", ""
 
 
-def crawl_all_artifacts(start_index=0):
-    base_url = 'https://collection.sdmart.org'
-    service = Service('D:\Desktop\msedgedriver.exe')
-    driver = webdriver.Edge(service=service)
-    all_details = []
-    try:
-        encodings = ['utf-8', 'gbk', 'latin-1']
-        for encoding in encodings:
-            try:
-                with open('./museum_13_links.csv', 'r', encoding=encoding) as infile:
-                    reader = csv.reader(infile)
-                    next(reader)  # 跳过标题行
-                    links = list(reader)
-                    break
-            except UnicodeDecodeError:
-                continue
-        else:
-            logging.error("无法使用任何编码方式读取文件。")
-            return all_details
-
-        for row in links[start_index:]:
-            link = row[0]
-            full_url = base_url + link
-            retries = 0
-            while retries < 3:  # 重试 3 次
+# 抓取 museum_13_links.csv 中尚未完成的详情页，多个线程并行，中断后再次运行从上次停下的位置继续，返回本次写入的条数
+def crawl_all_artifacts(workers=POOL_SIZE, browser=BROWSER, rewrite=None, use_static=True):
+    encodings = ['utf-8', 'gbk', 'latin-1']
+    for encoding in encodings:
+        try:
+            with open('./museum_13_links.csv', 'r', encoding=encoding) as infile:
+                reader = csv.reader(infile)
+                next(reader)  # 跳过标题行
+                links = list(reader)
+                break
+        except UnicodeDecodeError:
+            continue
+    else:
+        logging.error("无法使用任何编码方式读取文件。")
+        return 0
+
+    frontier = Frontier('sdmart')
+    frontier.add_page('museum_13_links.csv', [(BASE_URL + row[0], None) for row in links])
+    logging.info(frontier.summary())
+
+    with BrowserPool(browser, rewrite=rewrite) as pool, \
+            RecordSink('./museum_artifact_details.csv', COLUMNS, frontier, batch_size=10) as sink, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = frontier.iter_pending()
+        while True:
+            batch = list(islice(pending, workers * 4))
+            if not batch:
+                break
+            future_to_url = {executor.submit(crawl_artifact_details, pool, url, use_static): url for url, _ in batch}
+            for future in as_completed(future_to_url):
+                full_url = future_to_url[future]
                 try:
-                    logging.info(f"正在处理链接: {full_url}")
-                    logging.info('===========================================================')
-                    name_text, creation_date, creation_place, img_src, type_, medium, Credit_Line, Accession_Number, Dimensions, combined_text = crawl_artifact_details(
-                        base_url, driver, full_url)
-                    logging.info('===========================================================')
-                    all_details.append(
-                        [name_text, creation_date, creation_place, img_src, type_, medium, Credit_Line,
-                         Accession_Number,
-                         Dimensions, combined_text])
-                    break  # 如果成功，跳出重试循环
-                except (ReadTimeout, WebDriverException) as e:
-                    logging.warning(f"请求页面 {full_url} 时出现错误: {e}，正在重试第 {retries + 1} 次...")
-                    retries += 1
-                    time.sleep(5)
-            if retries == 3:
-                logging.error(f"请求页面 {full_url} 失败，已达到最大重试次数。")
-
-    except Exception as e:
-        logging.error(f"发生未知错误: {e}")
-    finally:
-        driver.quit()
-
-    # 追加数据到 CSV 文件
-    with open('./museum_artifact_details.csv', 'a', newline='', encoding='utf-8') as outfile:
-        writer = csv.writer(outfile)
-        for details in all_details:
-            writer.writerow(details)
-
-    return all_details
+                    details = future.result()
+                except Exception as e:
+                    logging.error(f"处理链接 {full_url} 时发生未知错误: {e}")
+                    frontier.mark_failed(full_url, e)
+                    continue
+                if any(details):
+                    sink.write(dict(zip(COLUMNS, details)), full_url)
+                else:
+                    frontier.mark_failed(full_url, "请求页面失败")
+        logging.info(f"静态页面 {pool.stats['static']} 个，浏览器渲染 {pool.stats['browser']} 个")
+
+    logging.info(frontier.summary())
+    return sink.written
 
 
 if __name__ == "__main__":
-    results = crawl_all_artifacts()
-    logging.info(f"共爬取到 {len(results)} 个文物的详细信息，已追加到 museum_artifact_details.csv 文件中。")
+    parser = argparse.ArgumentParser(description="抓取圣地亚哥艺术博物馆的中国文物")
+    parser.add_argument("--links", action="store_true", help="先抓取列表页，重新生成 museum_13_links.csv")
+    parser.add_argument("--workers", type=int, default=POOL_SIZE, help="并行的线程（浏览器）数")
+    parser.add_argument("--browser", choices=["chrome", "firefox", "edge"], default=BROWSER)
+    parser.add_argument("--no-static", action="store_true", help="总是用浏览器渲染，不走静态快速路径")
+    parser.add_argument("--fixtures", help="本地 fixture 服务器地址，例如 http://127.0.0.1:8765")
+    args = parser.parse_args()
+
+    metrics.start_from_env()
+    rewrite = None
+    if args.fixtures:
+        from fixture_server import local_rewrite
+        rewrite = local_rewrite(args.fixtures)
+    if args.links:
+        links = crawl_museum(args.workers, args.browser, rewrite, not args.no_static)
+        logging.info(f"共找到 {len(links)} 个链接，已保存到 museum_13_links.csv 文件中。")
+    count = crawl_all_artifacts(args.workers, args.browser, rewrite, not args.no_static)
+    logging.info(f"共爬取到 {count} 个文物的详细信息，已追加到 museum_artifact_details.csv 文件中。")
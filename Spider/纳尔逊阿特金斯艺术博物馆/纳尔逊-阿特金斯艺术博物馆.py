@@ -1,125 +1,171 @@
 import requests
 from lxml import etree
-import pandas as pd
-from openai import OpenAI
 import os
+import sys
 import time
 
+# 共用的磁盘响应缓存（Spider/http_cache.py），重复抓取时用条件请求重新验证，离线时直接回放
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from http_cache import HttpCache, OfflineMiss, cached_request
+# 仓库根目录的运行指标，请求延迟与状态码由 cached_request 记录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import metrics
+from china_classifier import ChinaClassifier
+# 断点续爬（Spider/frontier.py）：已处理的列表页和详情页状态记录在 frontier.db 中，结果边抓边追加写入 CSV
+from frontier import Frontier, RecordSink
+
+cache = HttpCache.from_env()
+
 MAX_RETRIES = 3
 TIMEOUT = 10
+TOTAL_PAGES = 12
+
+OUTPUT = 'chinese_artifacts.csv'
+COLUMNS = ['文物名字', '年代', '材质', '尺寸', '入藏信息', '藏品编号', '当前是否展出', '详情页面URL', '文物图片链接']
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'}
 
 
-def model(url):
-    for retry in range(MAX_RETRIES):
-        try:
-            response = requests.get(url, headers=headers, timeout=TIMEOUT)
-            response.raise_for_status()
-            page_content = response.text
-            client = OpenAI(
-                base_url="https://ark.cn-beijing.volces.com/api/v3/",
-                api_key="xxxxxxxxxxxxxxxx"
-            )
-            completion = client.chat.completions.create(
-                model="xxxxxxxxxxxx",
-                messages=[
-                    {"role": "system",
-                     "content": "作为文物领域的权威专家，请依据给定的网页内容，精准判断其中提及的文物是否属于中国文物。仅需用 “yes” 或 “no” 作答，无需阐述依据。"},
-                    {"role": "user", "content": page_content},
-                ],
-            )
-            return completion.choices[0].message.content
-        except requests.RequestException as e:
-            print(f"请求 {url} 失败，重试次数: {retry + 1}/{MAX_RETRIES}，错误信息: {e}")
-            if retry < MAX_RETRIES - 1:
-                time.sleep(2)
-    return None
+base_url = 'https://art.nelson-atkins.org'
 
 
+# 解析列表页，返回详情页的完整URL
+def parse_list_page(page_text):
+    html = etree.HTML(page_text)
+    detail_urls = []
+    # 提取文物列表项
+    artifact_items = html.xpath('//div[contains(@class, "result item grid-item")]')
+    for item in artifact_items:
+        name_href = item.xpath('.//h3/a/@href')
+        for href in name_href:
+            detail_urls.append(base_url + href)
+    return detail_urls
+
+
+# 解析详情页，返回一条文物信息
+def parse_detail_page(page_text, url):
+    detail_html = etree.HTML(page_text)
+    name = detail_html.xpath('//div[@class="detailField titleField"]/h1/text()')
+    name = name[0] if name else ''
+
+    date = detail_html.xpath('//div[@class="detailField displayDateField"]/span[contains(@class, "detailFieldValue")]/text()')
+    date = date[0] if date else ''
+
+    medium = detail_html.xpath('//div[@class="detailField mediumField"]/span[contains(@class, "detailFieldValue")]/text()')
+    medium = medium[0] if medium else ''
+
+    dimensions = detail_html.xpath('//div[@class="detailField dimensionsField"]/span[contains(@class, "detailFieldValue")]/div/text()')
+    dimensions = dimensions[0] if dimensions else ''
+
+    credit_line = detail_html.xpath('//div[@class="detailField creditlineField"]/span[contains(@class, "detailFieldValue")]/text()')
+    credit_line = credit_line[0] if credit_line else ''
+
+    object_number = detail_html.xpath('//div[@class="detailField invnoField"]/span[contains(@class, "detailFieldValue")]/text()')
+    object_number = object_number[0] if object_number else ''
+
+    on_view = detail_html.xpath('//div[@class="detailField onviewField"]/div/text()')
+    on_view = on_view[0] if on_view else ''
+
+    part_url = detail_html.xpath('//div[contains(@class, "emuseum-img-wrap")]/img/@src')
+    part_url = part_url[0] if part_url else ''
+    img_url = base_url + part_url if part_url else ''
+
+    return {
+        '文物名字': name,
+        '年代': date,
+        '材质': medium,
+        '尺寸': dimensions,
+        '入藏信息': credit_line,
+        '藏品编号': object_number,
+        '当前是否展出': on_view,
+        '详情页面URL': url,
+        '文物图片链接': img_url
+    }
+
+
+# 提取用于判断是否为中国文物的字段 {字段名: 文本}，字段名取自 detailField 的 class（如 cultureField -> culture）
+# 只把这些文字交给规则和模型，而不是整页 HTML；页面没有这些字段时退回正文文字
+def classification_fields(page_text):
+    html = etree.HTML(page_text)
+    fields = {}
+    for field in html.xpath('//div[contains(@class, "detailField")]'):
+        names = [c[:-len('Field')] for c in field.get('class', '').split() if c.endswith('Field') and c != 'detailField']
+        if not names:
+            continue
+        value = ' '.join(t.strip() for t in field.xpath('.//*[not(contains(@class, "detailFieldLabel"))]/text()')
+                         if t.strip())
+        if value:
+            fields[names[0]] = value
+    if not fields:
+        body = html.xpath('//body')
+        fields['page'] = ' '.join(' '.join(body[0].itertext()).split()) if body else ''
+    return fields
+
+
+# 下载详情页，成功时返回页面文字，失败返回 None
 def get_information(url):
     for retry in range(MAX_RETRIES):
         try:
-            detail_response = requests.get(url, headers=headers, timeout=TIMEOUT)
+            detail_response = cached_request(requests, 'GET', url, cache, headers=headers, timeout=TIMEOUT)
             if detail_response.status_code == 200:
-                is_china = model(url)
-                if is_china and 'yes' in is_china:
-                    print(is_china)
-                    detail_html = etree.HTML(detail_response.text)
-                    name = detail_html.xpath('//div[@class="detailField titleField"]/h1/text()')
-                    name = name[0] if name else ''
-
-                    date = detail_html.xpath('//div[@class="detailField displayDateField"]/span[contains(@class, "detailFieldValue")]/text()')
-                    date = date[0] if date else ''
-
-                    medium = detail_html.xpath('//div[@class="detailField mediumField"]/span[contains(@class, "detailFieldValue")]/text()')
-                    medium = medium[0] if medium else ''
-
-                    dimensions = detail_html.xpath('//div[@class="detailField dimensionsField"]/span[contains(@class, "detailFieldValue")]/div/text()')
-                    dimensions = dimensions[0] if dimensions else ''
-
-                    credit_line = detail_html.xpath('//div[@class="detailField creditlineField"]/span[contains(@class, "detailFieldValue")]/text()')
-                    credit_line = credit_line[0] if credit_line else ''
-
-                    object_number = detail_html.xpath('//div[@class="detailField invnoField"]/span[contains(@class, "detailFieldValue")]/text()')
-                    object_number = object_number[0] if object_number else ''
-
-                    on_view = detail_html.xpath('//div[@class="detailField onviewField"]/div/text()')
-                    on_view = on_view[0] if on_view else ''
-
-                    part_url = detail_html.xpath('//div[contains(@class, "emuseum-img-wrap")]/img/@src')
-                    part_url = part_url[0] if part_url else ''
-                    img_url = base_url + part_url if part_url else ''
-
-                    artifacts_info.append({
-                        '文物名字': name,
-                        '年代': date,
-                        '材质': medium,
-                        '尺寸': dimensions,
-                        '入藏信息': credit_line,
-                        '藏品编号': object_number,
-                        '当前是否展出': on_view,
-                        '详情页面URL': url,
-                        '文物图片链接': img_url
-                    })
+                return detail_response.text
             else:
                 print(f"页面 {url} 访问失败，状态码: {detail_response.status_code}")
             break
+        except OfflineMiss as e:
+            print(e)
+            break
         except requests.RequestException as e:
             print(f"请求 {url} 失败，重试次数: {retry + 1}/{MAX_RETRIES}，错误信息: {e}")
             if retry < MAX_RETRIES - 1:
                 time.sleep(2)
+    return None
 
 
-base_url = 'https://art.nelson-atkins.org'
-artifacts_info = []
-
-# 遍历多页
-for page in range(1, 13):
-    start_url = f'https://art.nelson-atkins.org/advancedsearch/objects/provenance%3Achina?page={page}'
-    for retry in range(MAX_RETRIES):
-        try:
-            response = requests.get(start_url, headers=headers, timeout=TIMEOUT)
-            if response.status_code == 200:
-                html = etree.HTML(response.text)
-                # 提取文物列表项
-                artifact_items = html.xpath('//div[contains(@class, "result item grid-item")]')
-                for item in artifact_items:
-                    name_elements = item.xpath('.//h3/a/text()')
-                    name_href = item.xpath('.//h3/a/@href')
-                    for i in range(len(name_href)):
-                        print(i)
-                        detail_url = base_url + name_href[i]
-                        print(detail_url)
-                        get_information(detail_url)
+# 一个列表页的详情页下载完后一起分类：规则能判断的直接判断，其余查缓存，剩下的并发询问模型。
+# 中国文物的记录写入 sink，其余的以 None 写入（URL 同样记为完成）；下载失败或模型调用失败（结论为 None）的
+# 记为 failed，不当作非中国文物，用 frontier.py --retry-failed 放回队列后重新处理
+def collect_chinese(classifier, frontier, sink, detail_urls):
+    pages = []
+    for i, detail_url in enumerate(detail_urls):
+        print(f"正在抓取详情页 {i + 1}/{len(detail_urls)}: {detail_url}")
+        page_text = get_information(detail_url)
+        if page_text:
+            pages.append((detail_url, page_text))
+        else:
+            frontier.mark_failed(detail_url, "请求失败")
+    verdicts = classifier.classify_many([classification_fields(text) for _, text in pages])
+    for (detail_url, page_text), is_china in zip(pages, verdicts):
+        if is_china is None:
+            frontier.mark_failed(detail_url, "分类失败")
+            continue
+        sink.write(parse_detail_page(page_text, detail_url) if is_china else None, detail_url)
+
+
+# 主程序：逐页登记列表页中的详情 URL，再处理所有 pending 的 URL（包括上次中断时没有完成的）；
+# 已处理过的列表页不再请求，中断后再次运行从上次停下的位置继续
+def main():
+    metrics.start_from_env()
+    frontier = Frontier('nelson-atkins')
+    with ChinaClassifier() as classifier, RecordSink(OUTPUT, COLUMNS, frontier) as sink:
+        for page in range(1, TOTAL_PAGES + 1):
+            count = frontier.page_count(f"page={page}")
+            if count is None:
+                start_url = f'https://art.nelson-atkins.org/advancedsearch/objects/provenance%3Achina?page={page}'
+                page_text = get_information(start_url)
+                if page_text is None:
+                    continue
+                frontier.add_page(f"page={page}", [(url, None) for url in parse_list_page(page_text)])
             else:
-                print(f"页面 {start_url} 访问失败，状态码: {response.status_code}")
-            break
-        except requests.RequestException as e:
-            print(f"请求 {start_url} 失败，重试次数: {retry + 1}/{MAX_RETRIES}，错误信息: {e}")
-            if retry < MAX_RETRIES - 1:
-                time.sleep(2)
+                print(f"第 {page} 页已处理过（{count} 个文物），跳过。")
+            collect_chinese(classifier, frontier, sink, [url for url, _ in frontier.iter_pending()])
+        print(classifier.summary())
+
+    print(cache.summary())
+    print(frontier.summary())
+    print(f"本次新增 {sink.written} 条，全部数据保存在 {OUTPUT}")
+
 
-df = pd.DataFrame(artifacts_info)
-df.to_csv('chinese_artifacts.csv', index=False, encoding='utf-8-sig')
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# delta_sync.py
+# 增量同步：为每个目标库（Neo4j / MySQL）在本地保存一份“实体 -> 内容哈希”的清单，
+# 每次运行只计算新增、修改、删除的实体，并只把这部分差异写入数据库。
+# 写入成功后才会更新清单，失败时下次运行会重新计算同样的差异。
+#
+# 用法：
+#   python delta_sync.py neo4j --input-dir ../Neo4j
+#   python delta_sync.py mysql --csv ../MySQL/combined.csv
+#   加 --dry-run 只打印差异数量，不写数据库
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "Neo4j"))
+sys.path.insert(0, os.path.join(ROOT, "MySQL"))
+
+MANIFEST_DIR = os.path.join(ROOT, "Sync", "manifests")
+
+
+def content_hash(values):
+    data = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def load_manifest(store, manifest_dir=MANIFEST_DIR):
+    path = os.path.join(manifest_dir, f"{store}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(store, manifest, manifest_dir=MANIFEST_DIR):
+    """先写临时文件再替换，避免中途退出留下损坏的清单"""
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = os.path.join(manifest_dir, f"{store}.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def diff(old, new):
+    """比较两份清单，返回 (新增, 修改, 删除) 的键列表"""
+    inserts = [k for k in new if k not in old]
+    updates = [k for k in new if k in old and old[k] != new[k]]
+    deletes = [k for k in old if k not in new]
+    return inserts, updates, deletes
+
+
+# ---------------- Neo4j ----------------
+
+def neo4j_entities(input_dir):
+    """三元组 CSV -> {键: 内容}，键为 project:<名称> 或 writer:<主体>\\t<对象>"""
+    from bulk_load import AUTHOR_CSV, project_frame, read_table
+
+    authors = read_table(os.path.join(input_dir, AUTHOR_CSV), ["主体", "对象"]).dropna(subset=["对象"])
+    props = project_frame(input_dir)
+    keys = list(props.columns[1:])
+
+    entities = {}
+    for name in authors["主体"]:
+        entities[f"project:{name}"] = {}
+    for record in props.itertuples(index=False):
+        entities[f"project:{record[0]}"] = {
+            k: v for k, v in zip(keys, record[1:]) if not pd.isna(v)
+        }
+    for pname, wname in zip(authors["主体"], authors["对象"]):
+        entities[f"writer:{pname}\t{wname}"] = {}
+    return entities
+
+
+NEO4J_DELETE_WRITER_CQL = '''
+    UNWIND $rows AS row
+    MATCH (:project {name: row.pname})-[r:writer]->(:people {name: row.wname})
+    DELETE r
+    '''
+NEO4J_DELETE_PROJECT_CQL = '''
+    UNWIND $rows AS row
+    MATCH (e:project {name: row.name})
+    DETACH DELETE e
+    '''
+# 属性为 null 时 SET 会删除该属性，因此源数据里被清空的字段也会同步
+NEO4J_UPSERT_PROJECT_CQL = '''
+    UNWIND $rows AS row
+    MERGE (e:project {name: row.name})
+    SET e.description = row.props.description,
+        e.link = row.props.link,
+        e.time = row.props.time,
+        e.culture = row.props.culture,
+        e.year_start = row.props.year_start,
+        e.year_end = row.props.year_end,
+        e.dynasty = row.props.dynasty
+    '''
+NEO4J_DELETE_ORPHAN_PEOPLE_CQL = '''
+    UNWIND $rows AS row
+    MATCH (t:people {name: row.wname})
+    WHERE NOT (t)--()
+    DELETE t
+    '''
+
+
+def apply_neo4j(delta, entities, driver, batch_size):
+    from bulk_load import WRITER_CQL, ensure_indexes, run_batches
+
+    inserts, updates, deletes = delta
+
+    def split(keys, prefix):
+        return [k[len(prefix):] for k in keys if k.startswith(prefix)]
+
+    removed_writers = [dict(zip(("pname", "wname"), k.split("\t", 1))) for k in split(deletes, "writer:")]
+    removed_projects = [{"name": n} for n in split(deletes, "project:")]
+    changed_projects = [{"name": n, "props": entities[f"project:{n}"]}
+                        for n in split(inserts + updates, "project:")]
+    added_writers = [dict(zip(("pname", "wname"), k.split("\t", 1))) for k in split(inserts, "writer:")]
+
+    ensure_indexes(driver)
+    run_batches(driver, NEO4J_DELETE_WRITER_CQL, removed_writers, batch_size, desc="删除作者关系")
+    run_batches(driver, NEO4J_DELETE_PROJECT_CQL, removed_projects, batch_size, desc="删除藏品节点")
+    run_batches(driver, NEO4J_UPSERT_PROJECT_CQL, changed_projects, batch_size, desc="更新藏品节点")
+    run_batches(driver, WRITER_CQL, added_writers, batch_size, desc="新增作者关系")
+    # 关系被删除后不再与任何藏品相连的作者节点一并清理
+    orphans = [{"wname": w} for w in {row["wname"] for row in removed_writers}]
+    run_batches(driver, NEO4J_DELETE_ORPHAN_PEOPLE_CQL, orphans, batch_size, desc="清理孤立作者")
+
+
+# ---------------- MySQL ----------------
+
+def mysql_entities(csv_file):
+    """合并后的 CSV -> {详情链接: 一行数据}，同一详情链接出现多次时保留最后一行"""
+    from mysql import COLUMNS, read_artifacts_csv
+
+    df = read_artifacts_csv(csv_file)
+    missing = df["详情链接"].isna() | (df["详情链接"] == "")
+    if missing.any():
+        print(f"跳过 {int(missing.sum())} 条没有详情链接的记录")
+    df = df[~missing].drop_duplicates("详情链接", keep="last")
+    return {record[-1]: dict(zip(COLUMNS, record)) for record in df[COLUMNS].itertuples(index=False)}
+
+
+def apply_mysql(delta, entities, engine, batch_size):
+    from sqlalchemy import text
+    from mysql import COLUMNS, create_mysql_table, fill_year_columns, upsert_rows
+
+    inserts, updates, deletes = delta
+    delete_sql = text("DELETE FROM artifacts WHERE 详情链接 = :详情链接")
+
+    # 建表时会为旧表补上详情链接的唯一键（并清理旧版追加导入留下的重复行），新增和修改都走 upsert
+    create_mysql_table(engine)
+    with engine.begin() as conn:
+        for start in range(0, len(deletes), batch_size):
+            conn.execute(delete_sql, [{"详情链接": k} for k in deletes[start:start + batch_size]])
+        rows = [tuple(entities[k][c] for c in COLUMNS) for k in inserts + updates]
+        upsert_rows(conn, rows, batch_size)
+        fill_year_columns(conn, batch_size)
+
+
+def sync(store, entities, apply, target, batch_size=1000, dry_run=False, manifest_dir=MANIFEST_DIR):
+    """计算差异并写入目标库，成功后保存新的清单；返回 (新增, 修改, 删除) 数量"""
+    old = load_manifest(store, manifest_dir)
+    new = {key: content_hash(value) for key, value in entities.items()}
+    delta = diff(old, new)
+    counts = tuple(len(part) for part in delta)
+    print(f"{store}：新增 {counts[0]}，修改 {counts[1]}，删除 {counts[2]}，未变化 {len(new) - counts[0] - counts[1]}")
+    if dry_run or not any(counts):
+        return counts
+    apply(delta, entities, target, batch_size)
+    save_manifest(store, new, manifest_dir)
+    print(f"✔ {store} 同步完成，清单已更新")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按内容哈希增量同步到 Neo4j / MySQL")
+    parser.add_argument("store", choices=["neo4j", "mysql"])
+    parser.add_argument("--input-dir", default=os.path.join(ROOT, "Neo4j"), help="三元组 CSV 所在目录（neo4j）")
+    parser.add_argument("--csv", default="combined.csv", help="合并后的藏品 CSV（mysql）")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--manifest-dir", default=MANIFEST_DIR)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.store == "neo4j":
+        from neo4j import GraphDatabase
+        from bulk_load import NEO4J_AUTH, NEO4J_URI
+
+        entities = neo4j_entities(args.input_dir)
+        driver = GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+        try:
+            sync("neo4j", entities, apply_neo4j, driver, args.batch_size, args.dry_run, args.manifest_dir)
+        finally:
+            driver.close()
+    else:
+        from mysql import get_engine
+
+        entities = mysql_entities(args.csv)
+        engine = get_engine()
+        try:
+            sync("mysql", entities, apply_mysql, engine, args.batch_size, args.dry_run, args.manifest_dir)
+        finally:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# metrics.py
+# 爬虫与数据库加载脚本共用的运行指标，按 Prometheus 文本格式输出，用来判断一次运行的瓶颈在网络、解析还是数据库：
+#   - 爬虫：每个域名的请求延迟直方图、状态码计数、下载字节数，缓存命中情况，以及各博物馆的解析耗时；
+#   - 加载：Neo4j / MySQL 每批的行数、耗时直方图、最近一批的行/秒和错误数。
+# 不依赖 prometheus_client；指标保存在进程内，通过环境变量选择输出方式（脚本启动时调用 start_from_env()）：
+#   METRICS_PORT=9108     在 http://127.0.0.1:9108/metrics 提供文本格式，可由 Prometheus 抓取或直接 curl 查看；
+#   METRICS_FILE=out.prom 每 METRICS_INTERVAL 秒（默认 10）覆盖写入该文件，进程退出时再写一次。
+#
+# 查看一次运行留下的文件：python metrics.py out.prom [--grep crawl_request]
+
+import atexit
+import bisect
+from abc import ABC, abstractmethod
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+DUMP_INTERVAL = float(os.environ.get("METRICS_INTERVAL", "10"))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    """一个指标及其各组标签取值；labels(...) 返回该组标签对应的子指标"""
+    type = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **kwargs):
+        key = tuple(str(v) for v in values) or tuple(str(kwargs[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """创建一组标签对应的子指标"""
+
+    @abstractmethod
+    def samples(self):
+        """[(样本名后缀, 标签值, 额外标签, 数值)]"""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [("", key, (), child.value) for key, child in sorted(self._children.items())]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _Histogram(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        samples = []
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                samples.append(("_bucket", key, (("le", le),), cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, cls, name, documentation, labelnames=(), **kwargs):
+        """同名指标只创建一次，重复导入或多个脚本声明同一指标时返回已有的对象"""
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return self.metrics[name]
+
+    def render(self):
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(m.render() for m in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+# ---------------- 爬虫 ----------------
+
+REQUEST_SECONDS = histogram("crawl_request_seconds", "每次 HTTP 请求（或浏览器加载页面）的耗时", ["host"])
+RESPONSES = counter("crawl_responses_total", "按状态码统计的响应数，连接错误与超时记为 error", ["host", "status"])
+RESPONSE_BYTES = counter("crawl_response_bytes_total", "下载的响应体字节数", ["host"])
+CACHE_LOOKUPS = counter("crawl_cache_total", "磁盘响应缓存的命中（hit）、重新验证（revalidated）与未命中（miss）",
+                        ["result"])
+PARSE_SECONDS = histogram("crawl_parse_seconds", "解析一个详情页的耗时", ["museum"], buckets=PARSE_BUCKETS)
+
+
+def observe_request(url, seconds, status, size=0):
+    """记录一次网络请求；status 为状态码，失败时传入 "error" """
+    host = urlsplit(url).netloc
+    REQUEST_SECONDS.labels(host).observe(seconds)
+    RESPONSES.labels(host, status).inc()
+    if size:
+        RESPONSE_BYTES.labels(host).inc(size)
+
+
+# ---------------- 数据库加载 ----------------
+
+LOAD_ROWS = counter("load_rows_total", "已写入的行数", ["target", "stage"])
+LOAD_BATCH_SECONDS = histogram("load_batch_seconds", "每批写入的耗时", ["target", "stage"])
+LOAD_ROWS_PER_SECOND = gauge("load_rows_per_second", "最近一批的写入速度（行/秒）", ["target", "stage"])
+LOAD_ERRORS = counter("load_errors_total", "写入失败的批次数（含重试）", ["target", "stage"])
+
+
+def observe_batch(target, stage, rows, seconds):
+    """记录一批成功写入；target 为 neo4j / mysql，stage 为具体的导入步骤"""
+    LOAD_ROWS.labels(target, stage).inc(rows)
+    LOAD_BATCH_SECONDS.labels(target, stage).observe(seconds)
+    LOAD_ROWS_PER_SECOND.labels(target, stage).set(rows / max(seconds, 1e-9))
+
+
+def observe_error(target, stage):
+    LOAD_ERRORS.labels(target, stage).inc()
+
+
+# ---------------- 输出 ----------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """在后台线程提供 /metrics，返回服务器对象（port 为 0 时由系统分配端口）"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def dump(path):
+    """把当前指标写入文件（先写临时文件再替换，读取方不会看到写了一半的内容）"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(tmp, path)
+
+
+def _dump_loop(path, interval):
+    while True:
+        time.sleep(interval)
+        dump(path)
+
+
+_started = False
+
+
+def start_from_env():
+    """按 METRICS_PORT / METRICS_FILE 启动输出，都没有设置时什么也不做；重复调用只生效一次"""
+    global _started
+    if _started:
+        return
+    _started = True
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        server = serve(int(port))
+        print(f"运行指标：http://127.0.0.1:{server.server_address[1]}/metrics")
+    path = os.environ.get("METRICS_FILE")
+    if path:
+        threading.Thread(target=_dump_loop, args=(path, DUMP_INTERVAL), daemon=True).start()
+        atexit.register(dump, path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查看 METRICS_FILE 写出的指标文件")
+    parser.add_argument("path")
+    parser.add_argument("--grep", help="只显示名称包含该字符串的指标")
+    args = parser.parse_args()
+    with open(args.path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or (args.grep and args.grep not in line.split("{")[0].split(" ")[0]):
+                continue
+            sys.stdout.write(line)
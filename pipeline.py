@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# pipeline.py
+# 端到端流水线：爬虫 -> combine.py -> dedup.py -> model.py -> Neo4j 加载 / MySQL 导入 -> 回填缩略图。
+# 每个阶段声明自己的命令、输入文件和输出文件，阶段之间的依赖由“谁生成了我的输入”推出，构成一个 DAG：
+#   - 增量：阶段的命令和全部输入文件的内容哈希与上次成功运行时相同、输出也没有被改动时跳过；
+#     文件哈希按 (大小, 修改时间) 缓存，未改动的大文件不会重新计算；
+#   - 并发：依赖都已完成的阶段同时运行（例如 MySQL 导入与 Neo4j 加载），--jobs 限制同时运行的数量；
+#   - 记录：每次运行各阶段的状态和耗时追加到 .pipeline/runs.jsonl，各阶段的输出写入 .pipeline/logs/，
+#     运行指标（metrics.py）写入 .pipeline/metrics/<阶段>.prom。
+# 爬虫阶段和图片检查（images）访问网络、耗时很长，只有加 --crawl 或直接点名时才运行，否则它们的输出文件当作现成的源数据；
+# 不存在的博物馆文件在合并时跳过。
+#
+# 用法：python pipeline.py                       （运行全部非爬虫阶段，已是最新的跳过）
+#       python pipeline.py model --dry-run         （只查看 model 及其上游哪些阶段需要运行）
+#       python pipeline.py --crawl --jobs 4        （先重新抓取四个博物馆）
+#       python pipeline.py mysql --force --mysql-host 127.0.0.1
+#       python pipeline.py --list
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.path.join(ROOT, ".pipeline")
+JOBS = 3
+
+# name：阶段名；cwd：运行目录（脚本按同目录导入模块、读写相对路径）；command：脚本及参数；
+# inputs / outputs：相对仓库根目录的文件；after：没有文件联系、但必须排在其后的阶段；
+# optional_inputs：输入文件不存在时跳过该文件而不是报错；crawl：爬虫阶段，默认不运行
+Stage = namedtuple("Stage", ["name", "cwd", "command", "inputs", "outputs", "after", "optional_inputs", "crawl"],
+                   defaults=[(), False, False])
+
+MUSEUM_FILES = {
+    "met": "Spider/metmuseum/metmuseum_final.csv",
+    "phila": "Spider/Philamuseum/Philamuseum_final.csv",
+    "nelson": "Spider/纳尔逊阿特金斯艺术博物馆/chinese_artifacts_1.csv",
+    "sdmart": "Spider/圣地亚哥艺术博物馆/museum_artifact_details.csv",
+}
+MUSEUM_SCRIPTS = {
+    "met": "Spider/metmuseum/metmuseum_final.py",
+    "phila": "Spider/Philamuseum/philamuseum_final.py",
+    "nelson": "Spider/纳尔逊阿特金斯艺术博物馆/纳尔逊-阿特金斯艺术博物馆.py",
+    "sdmart": "Spider/圣地亚哥艺术博物馆/圣地亚哥艺术博物馆.py",
+}
+MERGED = "DataModeling/merged_artifacts.csv"
+DEDUPED = "DataModeling/deduped_artifacts.csv"
+TRIPLE_DIR = "Neo4j"
+PROPERTY_TABLES = ["介绍", "图片链接", "年代", "文化"]
+IMAGE_INDEX = "Media/image_index.db"
+
+
+def path(rel):
+    return os.path.join(ROOT, rel)
+
+
+def build_stages(neo4j_uri=None, mysql_host=None, mysql_port=None):
+    """按执行顺序返回全部阶段；数据库地址会写进命令，换库时相关阶段自然会重新运行"""
+    neo4j = ["--uri", neo4j_uri] if neo4j_uri else []
+    mysql = (["--host", mysql_host] if mysql_host else []) + (["--port", str(mysql_port)] if mysql_port else [])
+    stages = []
+    for museum, output in MUSEUM_FILES.items():
+        # 统一抓取引擎按 combine.py 认识的文件名输出；重新抓取时清空旧的进度和文件
+        stages.append(Stage(f"crawl_{museum}", "Spider",
+                            ["crawl_engine.py", museum, "--output", path(output), "--restart"],
+                            ["Spider/crawl_engine.py", "Spider/adapters.py", MUSEUM_SCRIPTS[museum]], [output],
+                            crawl=True))
+    stages += [
+        Stage("combine", "DataModeling", ["combine.py", *map(path, MUSEUM_FILES.values()), "--output", path(MERGED)],
+              ["DataModeling/combine.py", *MUSEUM_FILES.values()], [MERGED], optional_inputs=True),
+        Stage("dedup", "DataModeling", ["dedup.py", "--input", path(MERGED), "--output", path(DEDUPED)],
+              ["DataModeling/dedup.py", MERGED], [DEDUPED]),
+        # 作者别名表 author_aliases.json 是 model.py 自己维护的缓存，不作为输入
+        Stage("model", "DataModeling", ["model.py", "--input", path(DEDUPED), "--out-dir", path(TRIPLE_DIR)],
+              ["DataModeling/model.py", "DataModeling/alias.py", DEDUPED],
+              [f"{TRIPLE_DIR}/{name}.csv" for name in ["作者", *PROPERTY_TABLES, "详情链接"]]),
+        Stage("neo4j_writers", "Neo4j", ["bulk_load.py", "--skip-props", *neo4j],
+              ["Neo4j/bulk_load.py", f"{TRIPLE_DIR}/作者.csv"], []),
+        # 属性与作者关系都会 MERGE 同一批 project 节点，并发写入容易互相等锁，因此排在作者关系之后
+        Stage("neo4j_props", "Neo4j", ["bulk_load.py", "--skip-writers", *neo4j],
+              ["Neo4j/bulk_load.py", "DataModeling/dating.py", *(f"{TRIPLE_DIR}/{name}.csv" for name in PROPERTY_TABLES)],
+              [], after=("neo4j_writers",), optional_inputs=True),
+        Stage("mysql", "MySQL", ["mysql.py", path(DEDUPED), *mysql], ["MySQL/mysql.py", DEDUPED], []),
+        # 图片检查要访问各博物馆的 CDN，与爬虫一样默认不运行；缩略图地址在属性和藏品行写入之后回填
+        Stage("images", "Media", ["image_store.py", "fetch", "--input", path(DEDUPED)],
+              ["Media/image_store.py", DEDUPED], [IMAGE_INDEX], crawl=True),
+        Stage("neo4j_images", "Media",
+              ["image_store.py", "apply", "neo4j", "--input", path(f"{TRIPLE_DIR}/图片链接.csv"), *neo4j],
+              ["Media/image_store.py", IMAGE_INDEX, f"{TRIPLE_DIR}/图片链接.csv"], [],
+              after=("neo4j_props",), optional_inputs=True),
+        Stage("mysql_images", "Media", ["image_store.py", "apply", "mysql", *mysql],
+              ["Media/image_store.py", IMAGE_INDEX, DEDUPED], [], after=("mysql",), optional_inputs=True),
+    ]
+    return stages
+
+
+class FileHashes:
+    """文件内容的 SHA1，按 (大小, 修改时间) 缓存在状态文件里"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def digest(self, rel):
+        full = path(rel)
+        if not os.path.exists(full):
+            return None
+        st = os.stat(full)
+        with self._lock:
+            cached = self.cache.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        sha = hashlib.sha1()
+        with open(full, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        with self._lock:
+            self.cache[rel] = [st.st_size, st.st_mtime_ns, sha.hexdigest()]
+        return sha.hexdigest()
+
+
+def load_state(state_dir):
+    state_path = os.path.join(state_dir, "state.json")
+    if not os.path.exists(state_path):
+        return {"files": {}, "stages": {}}
+    with open(state_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_dir, state):
+    os.makedirs(state_dir, exist_ok=True)
+    tmp = os.path.join(state_dir, "state.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(state_dir, "state.json"))
+
+
+def select(stages, targets, crawl):
+    """目标阶段及其全部上游；爬虫阶段只在 crawl 为真或被直接点名时纳入。返回 {阶段名: 依赖的阶段名}"""
+    by_name = {s.name: s for s in stages}
+    producers = {out: s.name for s in stages for out in s.outputs}
+    unknown = [t for t in targets if t not in by_name]
+    if unknown:
+        raise SystemExit(f"未知的阶段：{unknown}，可选：{list(by_name)}")
+    wanted = set(targets or [s.name for s in stages if crawl or not s.crawl])
+
+    def deps(stage):
+        found = {producers[i] for i in stage.inputs if i in producers}
+        return {d for d in found if crawl or not by_name[d].crawl or d in targets}
+
+    graph, todo = {}, list(wanted)
+    while todo:
+        name = todo.pop()
+        if name in graph:
+            continue
+        graph[name] = deps(by_name[name])
+        todo.extend(graph[name])
+    # after 只规定顺序，不会把未选中的阶段拉进来
+    return {name: graph[name] | {a for a in by_name[name].after if a in graph} for name in graph}
+
+
+class Pipeline:
+    def __init__(self, stages, graph, state_dir=STATE_DIR, jobs=JOBS, force=False, dry_run=False):
+        self.stages = {s.name: s for s in stages}
+        self.order = [s.name for s in stages if s.name in graph]
+        self.graph = graph
+        self.state_dir = state_dir
+        self.jobs = jobs
+        self.force = force
+        self.dry_run = dry_run
+        self.state = load_state(state_dir)
+        self.hashes = FileHashes(self.state["files"])
+        self.results = {}  # 阶段名 -> {"status", "seconds", "reason"}
+
+    def inputs_of(self, stage):
+        missing = [i for i in stage.inputs if not os.path.exists(path(i))]
+        if missing and not stage.optional_inputs:
+            return None, missing
+        return [i for i in stage.inputs if i not in missing], missing
+
+    def stage_key(self, stage, inputs):
+        digests = {i: self.hashes.digest(i) for i in inputs}
+        return hashlib.sha1(json.dumps([stage.command, digests], ensure_ascii=False, sort_keys=True)
+                            .encode("utf-8")).hexdigest()
+
+    def outputs_digest(self, stage):
+        return {o: self.hashes.digest(o) for o in stage.outputs}
+
+    def plan(self, stage):
+        """返回 (是否需要运行, 原因, 输入键)"""
+        inputs, missing = self.inputs_of(stage)
+        if inputs is None:
+            return None, f"缺少输入 {missing}", None
+        key = self.stage_key(stage, inputs)
+        last = self.state["stages"].get(stage.name)
+        if self.force:
+            return True, "--force", key
+        if last is None:
+            return True, "没有运行记录", key
+        if last["key"] != key:
+            return True, "输入或命令已改变", key
+        if last["outputs"] != self.outputs_digest(stage):
+            return True, "输出被改动或缺失", key
+        return False, "已是最新", key
+
+    def execute(self, stage, key):
+        log_dir = os.path.join(self.state_dir, "logs")
+        metrics_dir = os.path.join(self.state_dir, "metrics")
+        os.makedirs(log_dir, exist_ok=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+        env = {**os.environ, "METRICS_FILE": os.path.join(metrics_dir, f"{stage.name}.prom")}
+        inputs, _ = self.inputs_of(stage)
+        command = [sys.executable, *stage.command]
+        if stage.optional_inputs:
+            # 不存在的可选文件不传给脚本
+            absent = {path(i) for i in stage.inputs if i not in inputs}
+            command = [c for c in command if c not in absent]
+        start = time.perf_counter()
+        with open(os.path.join(log_dir, f"{stage.name}.log"), "w", encoding="utf-8") as log:
+            code = subprocess.call(command, cwd=path(stage.cwd), stdout=log, stderr=subprocess.STDOUT, env=env)
+        seconds = time.perf_counter() - start
+        if code == 0:
+            self.state["stages"][stage.name] = {"key": key, "outputs": self.outputs_digest(stage),
+                                                "finished_at": time.time(), "seconds": round(seconds, 3)}
+        return code, seconds
+
+    def run(self):
+        self.started = time.time()
+        pending = list(self.order)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = self.graph[name]
+                    if any(d not in self.results for d in deps):
+                        continue
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    if any(self.results[d]["status"] in ("failed", "blocked") for d in deps):
+                        self.finish(name, "blocked", 0, "上游阶段失败")
+                        continue
+                    if self.dry_run and any(self.results[d]["status"] == "would run" for d in deps):
+                        self.finish(name, "would run", 0, "上游阶段需要运行")
+                        continue
+                    needed, reason, key = self.plan(stage)
+                    if needed is None:
+                        self.finish(name, "failed", 0, reason)
+                    elif not needed:
+                        self.finish(name, "skipped", 0, reason)
+                    elif self.dry_run:
+                        self.finish(name, "would run", 0, reason)
+                    else:
+                        print(f"▶ {name}（{reason}）")
+                        running[executor.submit(self.execute, stage, key)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    code, seconds = future.result()
+                    if code == 0:
+                        self.finish(name, "done", seconds, "")
+                    else:
+                        self.finish(name, "failed", seconds, f"退出码 {code}，见 .pipeline/logs/{name}.log")
+                    save_state(self.state_dir, self.state)
+        if not self.dry_run:
+            save_state(self.state_dir, self.state)
+            self.record()
+        return all(r["status"] not in ("failed", "blocked") for r in self.results.values())
+
+    def finish(self, name, status, seconds, reason):
+        self.results[name] = {"status": status, "seconds": round(seconds, 3), "reason": reason}
+        print(f"{'✔' if status in ('done', 'skipped') else '·' if status == 'would run' else '✘'} "
+              f"{name}：{status} {seconds:.1f}s {reason}".rstrip())
+
+    def record(self):
+        with open(os.path.join(self.state_dir, "runs.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"started_at": self.started, "seconds": round(time.time() - self.started, 3),
+                                "stages": self.results}, ensure_ascii=False) + "\n")
+
+    def report(self):
+        print("\n阶段           状态        耗时(秒)")
+        for name in self.order:
+            r = self.results.get(name, {"status": "-", "seconds": 0})
+            print(f"{name:<14} {r['status']:<10} {r['seconds']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按依赖关系增量运行知识图谱构建流水线")
+    parser.add_argument("targets", nargs="*", help="要运行的阶段（连同其上游），默认全部非爬虫阶段")
+    parser.add_argument("--crawl", action="store_true", help="包括爬虫阶段")
+    parser.add_argument("--force", action="store_true", help="忽略哈希，选中的阶段全部重新运行")
+    parser.add_argument("--dry-run", action="store_true", help="只列出需要运行的阶段")
+    parser.add_argument("--jobs", type=int, default=JOBS, help="同时运行的阶段数")
+    parser.add_argument("--list", action="store_true", help="列出全部阶段及其依赖")
+    parser.add_argument("--neo4j-uri", help="传给 bulk_load.py 的 --uri")
+    parser.add_argument("--mysql-host", help="传给 mysql.py 的 --host")
+    parser.add_argument("--mysql-port", type=int, help="传给 mysql.py 的 --port")
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    args = parser.parse_args()
+
+    stages = build_stages(args.neo4j_uri, args.mysql_host, args.mysql_port)
+    if args.list:
+        graph = select(stages, [s.name for s in stages], crawl=True)
+        for s in stages:
+            print(f"{s.name:<14} 依赖 {sorted(graph[s.name]) or '-'}  输出 {s.outputs or '（数据库）'}")
+        sys.exit(0)
+    pipeline = Pipeline(stages, select(stages, args.targets, args.crawl), args.state_dir, args.jobs,
+                        args.force, args.dry_run)
+    ok = pipeline.run()
+    pipeline.report()
+    sys.exit(0 if ok else 1)